@@ -6,16 +6,35 @@ from flask_migrate import Migrate
 import bcrypt
 import pyotp
 from datetime import datetime, timedelta
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
 import uuid
-from functools import lru_cache
 from tenacity import retry, stop_after_attempt, wait_exponential
 import requests
 import logging
+import threading
+from collections import Counter
+from geo import geohash_encode, haversine_km, within_box_clause
+from keyset import (
+    paginate, page_size, order_query, decode_cursor, encode_cursor, InvalidCursor, EVENT_SORTS, DEFAULT_SORT, DEFAULT_PAGE_SIZE
+)
+from hot_set import UpcomingHotSet
+from event_filters import (
+    EventFilters, parse_filters, filter_clauses, mask_arguments, PRICE_BUCKETS, PRICE_FACETS, TIMEFRAME_DAYS
+)
+from listing_cache import ListingCache, normalize_listing_args
+from recommendation_cache import RecommendationCache
+from scoring import CandidateFeatures, UserProfile, score_candidates, scoring_weights, top_k
+from event_search import SearchIndex, highlight
+from embedding_index import IndexReader
+from serialization import FastJSONProvider, init_compression, register, serialize, serialize_all
+from werkzeug.datastructures import MultiDict
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'your_secret_key')  # Change in production
-CORS(app, supports_credentials=True)
+CORS(app, supports_credentials=True, expose_headers=['X-Next-Cursor', 'X-Cache', 'X-Recommendations-Source'])
+# jsonify and request.get_json go through orjson; large responses are compressed
+app.json = FastJSONProvider(app)
+init_compression(app)
 
 # Database configuration
 db_url = os.environ.get('DATABASE_URL', 'postgresql://postgres:postgres@db:5432/vegas_ai')
@@ -71,6 +90,16 @@ class Event(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     interactions = db.relationship('UserInteraction', backref='event', lazy=True)
     raw_data = db.Column(db.dialects.postgresql.JSONB)
+    content_hash = db.Column(db.String(64))  # fingerprint of the last ingested payload
+    raw_ref = db.Column(db.String(255))  # raw payload in the ingestion archive (see raw_archive.py)
+    # Derived from latitude/longitude on write; C collation keeps prefix ranges indexable
+    geohash = db.Column(db.String(12, collation='C'))
+    # Set on cross-source duplicates; NULL for canonical events (see event_dedup.py)
+    canonical_event_id = db.Column(db.Integer, db.ForeignKey('events.id', ondelete='SET NULL'), index=True)
+    # Weighted name/venue/casino/tags/description document for /api/events/search,
+    # generated by PostgreSQL from events_search_document()
+    search_vector = db.Column(TSVECTOR, db.Computed('events_search_document(name, description, venue, casino, tags)',
+                                                    persisted=True))
     
     # New Vegas-specific fields
     casino = db.Column(db.String(255))
@@ -87,10 +116,106 @@ class Event(db.Model):
     weather_dependent = db.Column(db.Boolean, default=False)
     popularity_score = db.Column(db.Float, default=0.0)
     affiliate_links = db.Column(db.dialects.postgresql.JSONB)
+
+    # Access paths of filter_events_query; every listing is restricted to
+    # canonical events, so the indexes skip duplicates entirely.
+    __table_args__ = (
+        db.Index('ix_events_upcoming_start_date', start_date, id,
+                 postgresql_where=canonical_event_id.is_(None)),
+        db.Index('ix_events_category_start_date', category, start_date,
+                 postgresql_where=canonical_event_id.is_(None)),
+        db.Index('ix_events_source_lower_start_date', db.func.lower(source), start_date,
+                 postgresql_where=canonical_event_id.is_(None)),
+        db.Index('ix_events_rating_start_date', rating, start_date,
+                 postgresql_where=canonical_event_id.is_(None)),
+        db.Index('ix_events_free_start_date', start_date,
+                 postgresql_where=db.and_(price_range_min == 0, canonical_event_id.is_(None))),
+        db.Index('ix_events_geohash', geohash,
+                 postgresql_where=canonical_event_id.is_(None)),
+        # Keyset pagination orders (see keyset.EVENT_SORTS)
+        db.Index('ix_events_price_id', price_range_min, id,
+                 postgresql_where=canonical_event_id.is_(None)),
+        db.Index('ix_events_price_desc_id', price_range_min.desc().nullslast(), id.desc(),
+                 postgresql_where=canonical_event_id.is_(None)),
+        db.Index('ix_events_rating_desc_id', rating.desc().nullslast(), id.desc(),
+                 postgresql_where=canonical_event_id.is_(None)),
+        # Text search: full-text matches, and trigram matches for typos
+        db.Index('ix_events_search_vector', search_vector, postgresql_using='gin',
+                 postgresql_where=canonical_event_id.is_(None)),
+        db.Index('ix_events_name_trgm', name, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+                 postgresql_where=canonical_event_id.is_(None)),
+    )
     
     def __repr__(self):
         return f"<Event {self.name}>"
 
+@db.event.listens_for(Event, 'before_insert')
+@db.event.listens_for(Event, 'before_update')
+def _set_event_geohash(mapper, connection, event):
+    if event.latitude is not None and event.longitude is not None:
+        event.geohash = geohash_encode(event.latitude, event.longitude)
+    else:
+        event.geohash = None
+
+class CacheVersion(db.Model):
+    """Counters bumped by every write that changes what a cached response shows."""
+    __tablename__ = 'cache_versions'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+def cache_version(name='events'):
+    return db.session.query(CacheVersion.version).filter_by(name=name).scalar() or 0
+
+def bump_cache_version(name='events'):
+    """Advance a cache version in the current transaction; the caller commits."""
+    updated = CacheVersion.query.filter_by(name=name).update(
+        {CacheVersion.version: CacheVersion.version + 1}, synchronize_session=False
+    )
+    if not updated:
+        db.session.add(CacheVersion(name=name, version=1))
+
+class EventChange(db.Model):
+    """Feed of written event ids, replayed by each worker's hot set (see hot_set.py)."""
+    __tablename__ = 'event_changes'
+    # SQLite only autoincrements INTEGER keys
+    seq = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    event_id = db.Column(db.Integer, nullable=False)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+def record_event_changes(event_ids):
+    """Append event ids to the change feed and bump the events cache version; the caller commits."""
+    if not event_ids:
+        return
+    # The version row stays locked until commit, so concurrent writers
+    # append in commit order and readers never skip a sequence number
+    bump_cache_version('events')
+    changed_at = datetime.utcnow()
+    db.session.execute(db.insert(EventChange), [
+        {'event_id': event_id, 'changed_at': changed_at} for event_id in event_ids
+    ])
+
+# cache_versions row holding the highest seq prune_event_changes deleted.
+# Seqs have gaps (rolled-back inserts, sequence caching), so a reader can
+# only tell it missed changes by comparing its position with this.
+PRUNED_EVENT_CHANGES = 'event_changes_pruned'
+
+def prune_event_changes(before):
+    """Delete feed entries older than before and record the last seq deleted; the caller commits."""
+    pruned = db.session.query(db.func.max(EventChange.seq)).filter(EventChange.changed_at < before).scalar()
+    if pruned is None:
+        return
+    EventChange.query.filter(EventChange.changed_at < before).delete(synchronize_session=False)
+    # Later prunes only delete later entries, so the recorded seq only grows
+    updated = CacheVersion.query.filter_by(name=PRUNED_EVENT_CHANGES).update(
+        {CacheVersion.version: pruned}, synchronize_session=False
+    )
+    if not updated:
+        db.session.add(CacheVersion(name=PRUNED_EVENT_CHANGES, version=pruned))
+
+def pruned_event_seq():
+    """The last seq pruned from the change feed; readers at an older position have missed changes."""
+    return cache_version(PRUNED_EVENT_CHANGES)
+
 class UserPreference(db.Model):
     __tablename__ = 'user_preferences'
     id = db.Column(db.Integer, primary_key=True)
@@ -105,7 +230,27 @@ class UserInteraction(db.Model):
     user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
     event_id = db.Column(db.Integer, db.ForeignKey('events.id'), nullable=False)
     interaction_type = db.Column(db.String(50), nullable=False)  # 'view', 'like', 'dislike'
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class UserRecommendation(db.Model):
+    """Top recommended events per user, precomputed by recommendation_job.py."""
+    __tablename__ = 'user_recommendations'
+    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    event_ids = db.Column(db.ARRAY(db.Integer).with_variant(db.JSON, 'sqlite'), nullable=False)
+    scores = db.Column(db.ARRAY(db.Float).with_variant(db.JSON, 'sqlite'), nullable=False)
+    # Start of the job run that computed the row; incremental runs pick up
+    # users with interactions since the latest one
+    computed_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class EventSimilarity(db.Model):
+    """Most similar events by shared user interactions, precomputed by recommendation_job.py."""
+    __tablename__ = 'event_similarities'
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id', ondelete='CASCADE'), primary_key=True)
+    neighbor_ids = db.Column(db.ARRAY(db.Integer).with_variant(db.JSON, 'sqlite'), nullable=False)
+    scores = db.Column(db.ARRAY(db.Float).with_variant(db.JSON, 'sqlite'), nullable=False)
+    # Start of the job run that computed the row; incremental runs pick up
+    # interactions since the latest one
+    computed_at = db.Column(db.DateTime, nullable=False, index=True)
 
 class Log(db.Model):
     __tablename__ = 'logs'
@@ -356,36 +501,260 @@ Casino.reviews = db.relationship('Review', backref='casino', lazy=True,
 OutdoorActivity.reviews = db.relationship('Review', backref='outdoor_activity', lazy=True,
                                         foreign_keys=[Review.outdoor_activity_id])
 
+# Columns each listing response is built from. Selecting just these returns
+# plain rows instead of hydrating Event objects with description-sized text,
+# raw_data and affiliate_links JSONB that the responses never show.
+EVENT_LIST_COLUMNS = (
+    Event.id, Event.name, Event.description, Event.category, Event.subcategory,
+    Event.price_range_min, Event.price_range_max, Event.venue, Event.start_date, Event.end_date,
+    Event.image_url, Event.source, Event.rating, Event.review_count, Event.latitude,
+    Event.longitude, Event.address, Event.tags, Event.url,
+)
+RECOMMENDATION_COLUMNS = (Event.id, Event.name, Event.category, Event.start_date, Event.image_url)
+# What the hot set keeps of each upcoming event: everything listings filter and sort on
+HOT_SET_COLUMNS = (
+    Event.id, Event.start_date, Event.price_range_min, Event.rating, Event.latitude, Event.longitude,
+    Event.category, Event.source,
+)
+
+# Response shapes (see serialization.py). Listing views take their fields
+# from the column projections they are built from.
+register(Event, [column.key for column in EVENT_LIST_COLUMNS], view='list')
+register(Event, [column.key for column in RECOMMENDATION_COLUMNS], view='recommendation')
+register(Event, [
+    'id', 'name', 'description', 'category', 'subcategory', 'price_range_min', 'price_range_max',
+    'venue', 'start_date', 'end_date', 'image_url', 'source',
+])
+register(Review, [
+    'id', 'rating', 'title', 'content', 'visit_date', 'photos', 'helpful_votes', 'verified_purchase',
+    'created_at',
+])
+register(Tip, ['id', 'category', 'title', 'content', 'tags', 'helpful_votes', 'created_at'])
+register(LocalGuide, ['id', 'title', 'content', 'category', 'featured_image', 'tags', 'views', 'likes', 'created_at'])
+register(VirtualTour, [
+    'id', 'title', 'description', 'venue_name', 'tour_type', 'media_url', 'thumbnail_url', 'duration', 'views',
+])
+register(Deal, [
+    'id', 'title', 'description', 'deal_type', 'venue', 'start_date', 'end_date', 'promo_code',
+    'discount_amount', 'discount_type', 'affiliate_link',
+])
+register(Itinerary, ['id', 'title', 'description', 'start_date', 'end_date', 'is_public', 'likes'])
+register(ItineraryItem, [
+    'day_number',
+    ('start_time', lambda item: item.start_time.strftime('%H:%M') if item.start_time else None),
+    'duration', 'notes', 'item_type', 'item_id',
+])
+register(WeatherForecast, [
+    'date', 'temperature_high', 'temperature_low', 'conditions', 'precipitation_chance', 'wind_speed',
+])
+register(SavedItem, ['id', 'item_type', 'item_id', 'notes', 'created_at'])
+
+def load_hot_set_events(ids=None):
+    query = Event.query.filter(
+        Event.start_date >= datetime.utcnow(), Event.canonical_event_id.is_(None)
+    ).with_entities(*HOT_SET_COLUMNS)
+    if ids is None:
+        return query.all()
+    ids = list(ids)
+    rows = []
+    for start in range(0, len(ids), 1000):
+        rows.extend(query.filter(Event.id.in_(ids[start:start + 1000])).all())
+    return rows
+
+def load_event_changes(after=None):
+    last_seq = db.session.query(db.func.max(EventChange.seq)).scalar() or 0
+    if after is None:
+        return [], last_seq
+    changes = EventChange.query.filter(EventChange.seq > after, EventChange.seq <= last_seq)
+    return {row.event_id for row in changes.with_entities(EventChange.event_id)}, last_seq
+
+# A failed refresh rolls the request's session back for the SQL fallback
+upcoming_hot_set = UpcomingHotSet.from_env(load_hot_set_events, load_event_changes, rollback=db.session.rollback)
+
+def upcoming_snapshot(version=None):
+    """This worker's hot set at the current events cache version, or None to use SQL."""
+    if upcoming_hot_set is None:
+        return None
+    return upcoming_hot_set.current(cache_version('events') if version is None else version)
+
+def rows_by_id(ids, columns):
+    """Rows of columns for ids, in the order of ids; ids no longer stored are skipped."""
+    if not ids:
+        return []
+    rows = {row.id: row for row in Event.query.with_entities(*columns).filter(Event.id.in_(ids))}
+    return [rows[event_id] for event_id in ids if event_id in rows]
+
+def upcoming_events(limit, filters=EventFilters(), columns=EVENT_LIST_COLUMNS):
+    """The next limit canonical events passing filters, by start date."""
+    now = datetime.utcnow()
+    snapshot = upcoming_snapshot()
+    if snapshot is not None:
+        ids, _ = snapshot.page(snapshot.mask(now, **mask_arguments(filters, now)), EVENT_SORTS['date'], limit=limit)
+        return rows_by_id(ids, columns)
+    query = Event.query.filter(*filter_clauses(filters, Event, now))
+    return order_query(query.with_entities(*columns), Event, 'date').limit(limit).all()
+
 # Recommendation Engine
+# Upcoming events scored per recommendation request, and the columns
+# scoring reads besides RECOMMENDATION_COLUMNS, which the response shows.
+# The start comes as epoch seconds too, so features need no datetime per row
+RECOMMENDATION_CANDIDATES = 500
+SCORING_COLUMNS = RECOMMENDATION_COLUMNS + (
+    Event.tags, Event.price_range_min, Event.rating, Event.latitude, Event.longitude, Event.popularity_score,
+    db.cast(db.extract('epoch', Event.start_date), db.Float).label('start_epoch'),
+)
+# e.g. RECOMMENDATION_WEIGHTS="tags=1,distance=0.5" (see scoring.ScoringWeights)
+recommendation_weights = scoring_weights(os.environ.get('RECOMMENDATION_WEIGHTS'))
+
+def load_user_profiles(user_ids):
+    """{user_id: UserProfile} of the users' stated interests, liked events, those events' tags
+    and their precomputed neighbours."""
+    user_ids = list(user_ids)
+    category_weights = {user_id: {} for user_id in user_ids}
+    liked_ids = {user_id: set() for user_id in user_ids}
+    for pref in UserPreference.query.filter(UserPreference.user_id.in_(user_ids)):
+        category_weights[pref.user_id][pref.interest] = pref.weight if pref.weight is not None else 1
+    likes = UserInteraction.query.filter(
+        UserInteraction.user_id.in_(user_ids), UserInteraction.interaction_type == 'like'
+    ).with_entities(UserInteraction.user_id, UserInteraction.event_id)
+    for row in likes:
+        liked_ids[row.user_id].add(row.event_id)
+    all_liked = set().union(*liked_ids.values())
+    event_tags, neighbors = {}, {}
+    if all_liked:
+        event_tags = {row.id: row.tags or () for row in
+                      Event.query.filter(Event.id.in_(all_liked)).with_entities(Event.id, Event.tags)}
+        similarities = EventSimilarity.query.filter(EventSimilarity.event_id.in_(all_liked)).with_entities(
+            EventSimilarity.event_id, EventSimilarity.neighbor_ids, EventSimilarity.scores)
+        neighbors = {row.event_id: list(zip(row.neighbor_ids, row.scores)) for row in similarities}
+    profiles = {}
+    for user_id in user_ids:
+        tag_weights = Counter()
+        neighbor_scores = Counter()
+        for event_id in liked_ids[user_id]:
+            tag_weights.update(event_tags.get(event_id, ()))
+            for neighbor_id, score in neighbors.get(event_id, ()):
+                neighbor_scores[neighbor_id] += score
+        profiles[user_id] = UserProfile(category_weights[user_id], dict(tag_weights), liked_ids[user_id],
+                                        dict(neighbor_scores))
+    return profiles
+
 class RecommendationEngine:
-    def get_personalized_recommendations(self, user_id):
+    def __init__(self, weights=None):
+        self.weights = weights or recommendation_weights
+
+    def user_profile(self, user):
+        """UserProfile of a user's stated interests and the tags of the events they liked."""
+        return load_user_profiles([user.id])[user.id]
+
+    def rank(self, profile, candidates, limit, location=None):
+        """Up to limit (candidate row, score) pairs for profile, best first.
+
+        candidates are SCORING_COLUMNS rows; location is the user's
+        (latitude, longitude) when known, for the distance term.
+        """
+        features = CandidateFeatures.from_rows(candidates, datetime.utcnow(), location,
+                                               tag_names=list(profile.tag_weights))
+        best = top_k(features.ids, score_candidates(features, profile, self.weights), limit)
+        rows = dict(zip(features.ids.tolist(), candidates))
+        return [(rows[event_id], score) for event_id, score in best]
+
+    def get_personalized_recommendations(self, user_id, limit=20, location=None):
+        """Up to limit (SCORING_COLUMNS row, score) pairs for user_id, best first."""
         user = User.query.get(user_id)
         if not user:
             return []
 
-        preferences = {pref.interest: pref.weight for pref in user.preferences}
-        interactions = UserInteraction.query.filter_by(user_id=user_id).all()
-        liked_events = [interaction.event_id for interaction in interactions if interaction.interaction_type == 'like']
+        profile = self.user_profile(user)
+        candidates = upcoming_events(RECOMMENDATION_CANDIDATES,
+                                     EventFilters(categories=tuple(profile.category_weights)),
+                                     columns=SCORING_COLUMNS)
+        return self.rank(profile, candidates, limit, location)
+
+# Per-user ids and scores; recording a scored interaction evicts the user's entry
+recommendation_cache = RecommendationCache.from_env()
+
+RECOMMENDATIONS_PER_RESPONSE = 20
+# Interactions that change what the engine recommends; recommendation_job.py
+# recomputes users with these since its latest run
+SCORED_INTERACTIONS = ('like', 'dislike')
+
+def add_interaction(user_id, event_id, interaction_type):
+    """Add an interaction to the session; returns whether it made the user's recommendations stale.
+
+    A scored interaction also drops the user's precomputed row, so the online
+    engine serves them until the job recomputes it. The caller commits, then
+    evicts the user's cache entry when this returns True.
+    """
+    db.session.add(UserInteraction(user_id=user_id, event_id=event_id, interaction_type=interaction_type))
+    if interaction_type not in SCORED_INTERACTIONS:
+        return False
+    UserRecommendation.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    return True
 
-        query = Event.query.filter(Event.start_date >= datetime.utcnow())
-        if preferences:
-            query = query.filter(Event.category.in_(preferences.keys()))
-        events = query.order_by(Event.start_date).limit(100).all()
+def evict_recommendations(user_id):
+    if recommendation_cache:
+        recommendation_cache.evict(user_id)
 
-        scored_events = []
-        for event in events:
-            score = preferences.get(event.category, 1)
-            if event.id in liked_events:
-                score *= 2
-            scored_events.append((event, score))
+def not_started(rows):
+    """rows without the events that have started by now."""
+    now = datetime.utcnow()
+    return [row for row in rows if row.start_date is None or row.start_date >= now]
 
-        scored_events.sort(key=lambda x: x[1], reverse=True)
-        return [event for event, score in scored_events[:20]]
+def precomputed_recommendations(user_id):
+    """Rows with RECOMMENDATION_COLUMNS from user_id's precomputed list, or None without one.
+
+    Events that have started since the list was computed are skipped.
+    """
+    stored = UserRecommendation.query.filter_by(user_id=user_id).with_entities(UserRecommendation.event_ids).first()
+    if stored is None:
+        return None
+    return not_started(rows_by_id(stored.event_ids, RECOMMENDATION_COLUMNS))[:RECOMMENDATIONS_PER_RESPONSE]
 
-@lru_cache(maxsize=100)
 def get_cached_recommendations(user_id):
-    engine = RecommendationEngine()
-    return engine.get_personalized_recommendations(user_id)
+    """(rows with RECOMMENDATION_COLUMNS best first, where they came from) for user_id.
+
+    The source is 'precomputed' (the recommendation job's table), 'cache'
+    or 'computed' by the online engine, which serves users the job has
+    not covered yet.
+    """
+    rows = precomputed_recommendations(user_id)
+    if rows is not None:
+        return rows, 'precomputed'
+    scored = recommendation_cache.get(user_id) if recommendation_cache else None
+    if scored is not None:
+        # Events in a cached list may have started since it was scored
+        return not_started(rows_by_id([event_id for event_id, _ in scored], RECOMMENDATION_COLUMNS)), 'cache'
+    scored_events = RecommendationEngine().get_personalized_recommendations(user_id, RECOMMENDATIONS_PER_RESPONSE)
+    if recommendation_cache:
+        recommendation_cache.put(user_id, [(event.id, score) for event, score in scored_events])
+    return [event for event, _ in scored_events], 'computed'
+
+def upcoming_matches(scored, limit):
+    """Up to limit (EVENT_LIST_COLUMNS row, similarity) pairs from (event_id, similarity) pairs,
+    best first, skipping events that have started."""
+    now = datetime.utcnow()
+    scores = dict(scored)
+    rows = rows_by_id([event_id for event_id, _ in scored], EVENT_LIST_COLUMNS)
+    return [(row, scores[row.id]) for row in rows if row.start_date is None or row.start_date >= now][:limit]
+
+# "People who liked this also liked" on event detail pages
+SIMILAR_EVENTS_PER_RESPONSE = 10
+SIMILAR_EVENTS_MAX = 50
+
+def similar_events(event_id, limit=SIMILAR_EVENTS_PER_RESPONSE):
+    """Up to limit (EVENT_LIST_COLUMNS row, similarity) pairs of upcoming events like event_id, best first."""
+    stored = EventSimilarity.query.filter_by(event_id=event_id).with_entities(
+        EventSimilarity.neighbor_ids, EventSimilarity.scores).first()
+    if stored is None:
+        return []
+    return upcoming_matches(list(zip(stored.neighbor_ids, stored.scores)), limit)
+
+# "Events like this one" and free-text matching over content embeddings
+# (embedding_index.py); None when EVENT_EMBEDDINGS=0
+event_embeddings = IndexReader.from_env()
+# Neighbours fetched per requested event, since started ones are dropped
+CONTENT_MATCH_OVERFETCH = 4
 
 # Authentication Routes
 @app.route("/api/auth/login", methods=["POST"])
@@ -411,117 +780,357 @@ def logout():
     return jsonify({"success": True, "message": "Logged out successfully."})
 
 # Event Routes
+def filter_events_query(args):
+    """Upcoming canonical events narrowed by the /api/events query parameters.
+
+    check_query_plans.py runs every filter combination through this to make
+    sure each one is served by an index.
+    """
+    return Event.query.filter(*filter_clauses(parse_filters(args), Event, datetime.utcnow()))
+
+def event_facets(query):
+    """Event counts per category, priceRange, timeframe and source value within query.
+
+    All four facets come from one GROUPING SETS aggregate (one GROUP BY over
+    their combinations, rolled up here, on databases without it). Counts
+    apply every current filter, including the facet's own. Timeframes are
+    cumulative like the filter: 'week' includes 'today'.
+    """
+    now = datetime.utcnow()
+    price = Event.price_range_min
+    # Buckets are checked in ascending order; NULL prices fall in none
+    price_bucket = db.case(
+        (price == 0, 'free'),
+        *((price < PRICE_BUCKETS[name][1], name) for name in PRICE_FACETS)
+    )
+    # Smallest timeframe (in days) that includes the event, NULL beyond a month
+    within_days = db.case(
+        *((Event.start_date <= now + timedelta(days=days), days) for days in sorted(TIMEFRAME_DAYS.values()))
+    )
+    dimensions = {
+        'category': Event.category,
+        'priceRange': price_bucket,
+        'timeframe': within_days,
+        'source': db.func.lower(Event.source),
+    }
+    columns = [expression.label(name) for name, expression in dimensions.items()]
+    count = db.func.count(Event.id).label('count')
+
+    facets = {name: {} for name in dimensions}
+    total = 0
+    def add(name, value, row_count):
+        if value is not None:
+            facets[name][value] = facets[name].get(value, 0) + row_count
+
+    if db.engine.dialect.name == 'postgresql':
+        # GROUPING() sets a facet's bit when the row is not grouped by it
+        grouping = db.func.grouping(*dimensions.values()).label('grouping')
+        grouping_sets = db.func.grouping_sets(*(db.tuple_(expression) for expression in dimensions.values()),
+                                              db.tuple_())
+        rows = query.with_entities(*columns, grouping, count).group_by(grouping_sets).all()
+        all_bits = (1 << len(dimensions)) - 1
+        for row in rows:
+            if row.grouping == all_bits:
+                total = row.count
+                continue
+            for position, name in enumerate(dimensions):
+                if not row.grouping & (1 << (len(dimensions) - 1 - position)):
+                    add(name, getattr(row, name), row.count)
+    else:
+        for row in query.with_entities(*columns, count).group_by(*dimensions.values()).all():
+            total += row.count
+            for name in dimensions:
+                add(name, getattr(row, name), row.count)
+
+    timeframes = facets['timeframe']
+    facets['timeframe'] = {
+        name: sum(row_count for bucket_days, row_count in timeframes.items() if bucket_days <= days)
+        for name, days in TIMEFRAME_DAYS.items()
+    }
+    return {"total": total, "facets": facets}
+
+# Nearest-N search starts with a small circle and doubles it until enough
+# events are inside, so only nearby rows are ever fetched.
+NEAREST_START_RADIUS_KM = 2.0
+NEAREST_MAX_RADIUS_KM = 128.0
+
+def nearest_events(query, latitude, longitude, limit, max_radius_km=NEAREST_MAX_RADIUS_KM,
+                   columns=EVENT_LIST_COLUMNS):
+    """Up to limit rows of columns closest to a point, as (row, distance_km) pairs.
+
+    Every event within the final radius is a candidate, so once limit
+    candidates lie inside the circle they are exactly the nearest ones.
+    """
+    radius = min(NEAREST_START_RADIUS_KM, max_radius_km)
+    while True:
+        candidates = query.filter(
+            within_box_clause(Event.geohash, Event.latitude, Event.longitude, latitude, longitude, radius)
+        ).with_entities(Event.id, Event.latitude, Event.longitude).all()
+        distances = sorted(
+            (haversine_km(latitude, longitude, row.latitude, row.longitude), row.id) for row in candidates
+        )
+        distances = [pair for pair in distances if pair[0] <= radius]
+        if len(distances) >= limit or radius >= max_radius_km:
+            break
+        radius = min(radius * 2, max_radius_km)
+    distances = distances[:limit]
+    ids = [event_id for _, event_id in distances]
+    events = {event.id: event for event in Event.query.with_entities(*columns).filter(Event.id.in_(ids))}
+    return [(events[event_id], distance) for distance, event_id in distances if event_id in events]
+
+def event_list_item(event, distance=None):
+    """/api/events item from an EVENT_LIST_COLUMNS row (or an Event)."""
+    return serialize(event, Event, 'list', distance_km=round(distance, 3) if distance is not None else None)
+
+# Listing responses do not depend on the session, so every caller shares
+# one cache; entries are dropped as soon as an ingest bumps the version.
+listing_cache = ListingCache.from_env()
+
+def hot_set_page(snapshot, filters, sort, cursor, limit):
+    """paginate() over the hot set: the same order, page sizes and cursors."""
+    if sort not in EVENT_SORTS:
+        raise InvalidCursor(f"Unknown sort order '{sort}'")
+    key = EVENT_SORTS[sort]
+    now = datetime.utcnow()
+    after = decode_cursor(cursor, sort) if cursor else None
+    mask = snapshot.mask(now, **mask_arguments(filters, now))
+    ids, has_more = snapshot.page(mask, key, after, page_size(limit))
+    events = rows_by_id(ids, EVENT_LIST_COLUMNS)
+    next_cursor = None
+    if has_more and events:
+        last = events[-1]
+        next_cursor = encode_cursor(sort, getattr(last, key.column), last.id)
+    return events, next_cursor
+
+def hot_set_nearest(snapshot, filters, latitude, longitude, limit, max_radius_km):
+    """nearest_events() over the hot set."""
+    now = datetime.utcnow()
+    nearest = snapshot.nearest(snapshot.mask(now, **mask_arguments(filters, now)), latitude, longitude,
+                               limit, max_radius_km)
+    distances = dict(nearest)
+    return [(row, distances[row.id]) for row in rows_by_id([event_id for event_id, _ in nearest], EVENT_LIST_COLUMNS)]
+
+# Full-text search: websearch_to_tsquery syntax ("quoted phrases", -exclusions)
+# against search_vector, with pg_trgm word similarity on names as the
+# fallback when nothing matches as typed.
+SEARCH_CONFIG = 'english'
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+SEARCH_HEADLINE_OPTIONS = 'MaxWords=20, MinWords=8, MaxFragments=1'
+
+def fulltext_search_query(query, text, limit):
+    """Up to limit rows of EVENT_LIST_COLUMNS matching text, with rank and highlight, best first.
+
+    Ranks and limits on ids first, so ts_headline only runs for the rows returned.
+    """
+    tsquery = db.func.websearch_to_tsquery(SEARCH_CONFIG, text)
+    rank = db.func.ts_rank(Event.search_vector, tsquery)
+    ranked = (query.filter(Event.search_vector.op('@@')(tsquery))
+              .with_entities(Event.id.label('id'), rank.label('rank'))
+              .order_by(rank.desc(), Event.id).limit(limit).subquery())
+    snippet = db.func.ts_headline(SEARCH_CONFIG, db.func.coalesce(Event.description, Event.name), tsquery,
+                                  SEARCH_HEADLINE_OPTIONS)
+    return (db.session.query(*EVENT_LIST_COLUMNS, ranked.c.rank, snippet.label('highlight'))
+            .join(ranked, Event.id == ranked.c.id)
+            .order_by(ranked.c.rank.desc(), Event.id))
+
+def fuzzy_search_query(query, text, limit):
+    """Up to limit rows of EVENT_LIST_COLUMNS whose names resemble text, closest first."""
+    similarity = db.func.word_similarity(text, Event.name)
+    return (query.filter(db.literal(text).op('<%')(Event.name))
+            .with_entities(*EVENT_LIST_COLUMNS, similarity.label('rank'))
+            .order_by(similarity.desc(), Event.id).limit(limit))
+
+def search_events_postgresql(query, text, limit):
+    rows = fulltext_search_query(query, text, limit).all()
+    if rows:
+        return [(row, row.rank, row.highlight) for row in rows]
+    return [(row, row.rank, None) for row in fuzzy_search_query(query, text, limit).all()]
+
+# Databases without tsvector search an in-memory index of canonical events,
+# rebuilt whenever an ingest bumps the events cache version.
+_search_index = {'version': None, 'index': None}
+_search_index_lock = threading.Lock()
+
+def event_search_index():
+    version = cache_version('events')
+    with _search_index_lock:
+        if _search_index['index'] is None or _search_index['version'] != version:
+            index = SearchIndex()
+            rows = Event.query.filter(Event.canonical_event_id.is_(None)).with_entities(
+                Event.id, Event.name, Event.description, Event.venue, Event.casino, Event.tags
+            )
+            for row in rows.yield_per(1000):
+                index.add(row.id, row.name, row.description, row.venue, row.casino, row.tags)
+            _search_index.update(version=version, index=index)
+        return _search_index['index']
+
+def search_events_in_memory(query, text, limit):
+    ranked, terms = event_search_index().search(text)
+    results = []
+    # Walk the ranking in slices, keeping the events that pass query's filters
+    for start in range(0, len(ranked), 500):
+        chunk = ranked[start:start + 500]
+        rows = query.with_entities(*EVENT_LIST_COLUMNS).filter(Event.id.in_([event_id for event_id, _ in chunk]))
+        rows = {row.id: row for row in rows}
+        for event_id, score in chunk:
+            row = rows.get(event_id)
+            if row is None:
+                continue
+            results.append((row, score, highlight(row.description, terms) or highlight(row.name, terms)))
+            if len(results) == limit:
+                return results
+    return results
+
 @app.route("/api/events", methods=["GET"])
 def get_events():
     try:
-        category = request.args.get('category')
-        price_range = request.args.get('priceRange')
-        timeframe = request.args.get('timeframe')
-        source = request.args.get('source')
-        min_rating = request.args.get('min_rating', type=float)
-        latitude = request.args.get('latitude', type=float)
-        longitude = request.args.get('longitude', type=float)
-        radius = request.args.get('radius', type=float)  # in kilometers
-
-        query = Event.query.filter(Event.start_date >= datetime.utcnow())
-
-        if category:
-            query = query.filter(Event.category == category)
-        if price_range == 'free':
-            query = query.filter(Event.price_range_min == 0)
-        elif price_range == 'paid':
-            query = query.filter(Event.price_range_min > 0)
-        if timeframe == 'today':
-            end_date = datetime.utcnow() + timedelta(days=1)
-            query = query.filter(Event.start_date <= end_date)
-        elif timeframe == 'week':
-            end_date = datetime.utcnow() + timedelta(days=7)
-            query = query.filter(Event.start_date <= end_date)
-        elif timeframe == 'month':
-            end_date = datetime.utcnow() + timedelta(days=30)
-            query = query.filter(Event.start_date <= end_date)
-        if source:
-            query = query.filter(Event.source.ilike(source))
-        if min_rating:
-            query = query.filter(Event.rating >= min_rating)
-
-        # Location-based filtering using Haversine formula
-        if latitude is not None and longitude is not None and radius is not None:
-            # Convert radius from kilometers to degrees (approximate)
-            radius_degrees = radius / 111.0  # 1 degree ≈ 111 km
-            query = query.filter(
-                db.and_(
-                    Event.latitude.isnot(None),
-                    Event.longitude.isnot(None),
-                    db.func.acos(
-                        db.func.sin(db.func.radians(latitude)) *
-                        db.func.sin(db.func.radians(Event.latitude)) +
-                        db.func.cos(db.func.radians(latitude)) *
-                        db.func.cos(db.func.radians(Event.latitude)) *
-                        db.func.cos(db.func.radians(longitude) - db.func.radians(Event.longitude))
-                    ) * 6371 <= radius  # 6371 is Earth's radius in kilometers
-                )
-            )
+        # Normalized parameters build both the cache key and the query
+        key = normalize_listing_args(request.args)
+        args = MultiDict(key)
+        version = cache_version('events')
+        if listing_cache:
+            cached = listing_cache.get(key, version)
+            if cached:
+                result = app.response_class(cached.body, mimetype='application/json')
+                if cached.next_cursor:
+                    result.headers['X-Next-Cursor'] = cached.next_cursor
+                result.headers['X-Cache'] = 'HIT'
+                return result
+
+        filters = parse_filters(args)
+        query = Event.query.filter(*filter_clauses(filters, Event, datetime.utcnow()))
+        if args.get('facets'):
+            # Facets mode: counts for the filter sidebar instead of events
+            result = jsonify(event_facets(query))
+            if listing_cache:
+                listing_cache.put(key, version, result.get_data())
+                result.headers['X-Cache'] = 'MISS'
+            return result
 
-        events = query.order_by(Event.start_date).limit(100).all()
-        response = []
-        for event in events:
-            response.append({
-                "id": event.id,
-                "name": event.name,
-                "description": event.description,
-                "category": event.category,
-                "subcategory": event.subcategory,
-                "price_range_min": float(event.price_range_min) if event.price_range_min else None,
-                "price_range_max": float(event.price_range_max) if event.price_range_max else None,
-                "venue": event.venue,
-                "start_date": event.start_date.isoformat() if event.start_date else None,
-                "end_date": event.end_date.isoformat() if event.end_date else None,
-                "image_url": event.image_url,
-                "source": event.source,
-                "rating": float(event.rating) if event.rating else None,
-                "review_count": event.review_count,
-                "latitude": event.latitude,
-                "longitude": event.longitude,
-                "address": event.address,
-                "tags": event.tags,
-                "url": event.url
-            })
-        return jsonify(response)
+        latitude = args.get('latitude', type=float)
+        longitude = args.get('longitude', type=float)
+        nearest = args.get('nearest', type=int)
+        next_cursor = None
+        # Filters and sorts run on this worker's in-memory hot set when it is
+        # loaded; SQL only fetches the page's rows then
+        snapshot = upcoming_snapshot(version)
+        if nearest and latitude is not None and longitude is not None:
+            # Distance-sorted nearest N, within radius when one is given
+            max_radius_km = args.get('radius', NEAREST_MAX_RADIUS_KM, type=float)
+            if snapshot is not None:
+                results = hot_set_nearest(snapshot, filters, latitude, longitude, min(nearest, 100), max_radius_km)
+            else:
+                results = nearest_events(query, latitude, longitude, min(nearest, 100), max_radius_km=max_radius_km)
+        else:
+            # Keyset pages; the cursor for the next page is in X-Next-Cursor
+            sort = args.get('sortBy', DEFAULT_SORT)
+            cursor = args.get('cursor')
+            limit = args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+            try:
+                if snapshot is not None:
+                    events, next_cursor = hot_set_page(snapshot, filters, sort, cursor, limit)
+                else:
+                    events, next_cursor = paginate(query.with_entities(*EVENT_LIST_COLUMNS), Event,
+                                                   sort=sort, cursor=cursor, limit=limit)
+            except InvalidCursor as e:
+                return jsonify({"error": str(e)}), 400
+            results = [(event, None) for event in events]
+        response = [event_list_item(event, distance) for event, distance in results]
+        result = jsonify(response)
+        if next_cursor:
+            result.headers['X-Next-Cursor'] = next_cursor
+        if listing_cache:
+            listing_cache.put(key, version, result.get_data(), next_cursor)
+            result.headers['X-Cache'] = 'MISS'
+        return result
     except Exception as e:
         print(f"Error fetching events: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route("/api/events/search", methods=["GET"])
+def search_events():
+    text = request.args.get('q', '').strip()
+    if not text:
+        return jsonify({"error": "Missing search text 'q'"}), 400
+    try:
+        # The /api/events filters narrow the search too
+        query = filter_events_query(request.args)
+        limit = max(1, min(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), SEARCH_MAX_PAGE_SIZE))
+        if db.engine.dialect.name == 'postgresql':
+            results = search_events_postgresql(query, text, limit)
+        else:
+            results = search_events_in_memory(query, text, limit)
+        return jsonify([
+            dict(event_list_item(event), rank=round(float(rank), 4), highlight=snippet)
+            for event, rank, snippet in results
+        ])
+    except Exception as e:
+        print(f"Error searching events: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route("/api/events/match", methods=["GET"])
+def match_events():
+    # Matches by content embedding rather than keywords, so wording may differ
+    text = request.args.get('q', '').strip()
+    if not text:
+        return jsonify({"error": "Missing text 'q'"}), 400
+    index = event_embeddings.current() if event_embeddings else None
+    if index is None:
+        return jsonify({"error": "Content matching is unavailable"}), 503
+    try:
+        limit = max(1, min(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), SEARCH_MAX_PAGE_SIZE))
+        scored = index.match(text, limit * CONTENT_MATCH_OVERFETCH)
+        return jsonify([
+            serialize(event, Event, 'list', similarity=round(score, 4))
+            for event, score in upcoming_matches(scored, limit)
+        ])
+    except Exception as e:
+        print(f"Error matching events: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
 @app.route("/api/events/<int:event_id>", methods=["GET"])
 def get_event_details(event_id):
     try:
         event = Event.query.get_or_404(event_id)
         if "user_id" in session:
-            interaction = UserInteraction(
-                user_id=session["user_id"],
-                event_id=event.id,
-                interaction_type='view'
-            )
-            db.session.add(interaction)
+            stale = add_interaction(session["user_id"], event.id, 'view')
             db.session.commit()
-        return jsonify({
-            "id": event.id,
-            "name": event.name,
-            "description": event.description,
-            "category": event.category,
-            "subcategory": event.subcategory,
-            "price_range_min": float(event.price_range_min) if event.price_range_min else None,
-            "price_range_max": float(event.price_range_max) if event.price_range_max else None,
-            "venue": event.venue,
-            "start_date": event.start_date.isoformat() if event.start_date else None,
-            "end_date": event.end_date.isoformat() if event.end_date else None,
-            "image_url": event.image_url,
-            "source": event.source
-        })
+            if stale:
+                evict_recommendations(session["user_id"])
+        return jsonify(serialize(event))
     except Exception as e:
         print(f"Error fetching event details: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route("/api/events/<int:event_id>/similar", methods=["GET"])
+def get_similar_events(event_id):
+    try:
+        limit = max(1, min(request.args.get('limit', SIMILAR_EVENTS_PER_RESPONSE, type=int), SIMILAR_EVENTS_MAX))
+        return jsonify([
+            serialize(event, Event, 'list', similarity=round(score, 4))
+            for event, score in similar_events(event_id, limit)
+        ])
+    except Exception as e:
+        print(f"Error fetching similar events: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route("/api/events/<int:event_id>/related", methods=["GET"])
+def get_related_events(event_id):
+    index = event_embeddings.current() if event_embeddings else None
+    if index is None:
+        return jsonify({"error": "Content matching is unavailable"}), 503
+    try:
+        limit = max(1, min(request.args.get('limit', SIMILAR_EVENTS_PER_RESPONSE, type=int), SIMILAR_EVENTS_MAX))
+        scored = index.similar(event_id, limit * CONTENT_MATCH_OVERFETCH)
+        return jsonify([
+            serialize(event, Event, 'list', similarity=round(score, 4))
+            for event, score in upcoming_matches(scored, limit)
+        ])
+    except Exception as e:
+        print(f"Error fetching related events: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
 @app.route("/api/events/<int:event_id>/interact", methods=["POST"])
 def record_event_interaction(event_id):
     if "user_id" not in session:
@@ -530,13 +1139,10 @@ def record_event_interaction(event_id):
         interaction_type = request.json.get('type', 'view')
         if interaction_type not in ['view', 'like', 'dislike']:
             return jsonify({"error": "Invalid interaction type"}), 400
-        interaction = UserInteraction(
-            user_id=session["user_id"],
-            event_id=event_id,
-            interaction_type=interaction_type
-        )
-        db.session.add(interaction)
+        stale = add_interaction(session["user_id"], event_id, interaction_type)
         db.session.commit()
+        if stale:
+            evict_recommendations(session["user_id"])
         return jsonify({"success": True})
     except Exception as e:
         print(f"Error recording interaction: {str(e)}")
@@ -547,18 +1153,14 @@ def record_event_interaction(event_id):
 def get_recommendations():
     if "user_id" not in session:
         return jsonify({"error": "User not logged in"}), 401
-    recommendations = get_cached_recommendations(session["user_id"])
-    return jsonify([{
-        "id": event.id,
-        "name": event.name,
-        "category": event.category,
-        "start_date": event.start_date.isoformat() if event.start_date else None,
-        "image_url": event.image_url
-    } for event in recommendations])
+    recommendations, source = get_cached_recommendations(session["user_id"])
+    result = jsonify(serialize_all(recommendations, Event, 'recommendation'))
+    result.headers['X-Recommendations-Source'] = source
+    return result
 
 @app.route("/view-recommendations")
 def view_recommendations():
-    events = Event.query.filter(Event.start_date >= datetime.utcnow()).order_by(Event.start_date).limit(50).all()
+    events = upcoming_events(50)
     return render_template("recommendations.html", recommendations=events)
 
 @app.route('/')
@@ -0,0 +1,146 @@
+"""Benchmark the projection read path of the listing endpoints against full ORM loads.
+
+Seeds a temporary copy of the events table with realistically heavy rows
+(long descriptions, raw_data and affiliate_links JSONB) inside a rolled-back
+transaction, then builds the /api/events and /api/recommendations payloads
+both from full Event objects and from the endpoints' column sets, reporting
+CPU time and peak Python memory per request.
+
+    DATABASE_URL=postgresql://... python bench_event_queries.py [--rows N] [--page-size N]
+"""
+import argparse
+import gc
+import logging
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from sqlalchemy import text
+from app import app, db, Event, EVENT_LIST_COLUMNS, RECOMMENDATION_COLUMNS, event_list_item
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+CREATE_SQL = "CREATE TEMPORARY TABLE events (LIKE public.events INCLUDING DEFAULTS INCLUDING INDEXES) ON COMMIT DROP"
+
+# Roughly the size of a Ticketmaster listing: ~1 KB of description, a
+# ~4 KB raw payload and a handful of affiliate links.
+SEED_SQL = """
+INSERT INTO events (id, external_id, name, description, category, source, start_date, end_date,
+                    price_range_min, price_range_max, rating, review_count, venue, address,
+                    latitude, longitude, tags, url, image_url, raw_data, affiliate_links)
+SELECT g,
+       'bench-' || g,
+       'Benchmark event ' || g,
+       repeat('An evening of music and lights on the Strip. ', 22),
+       (ARRAY['Music', 'Sports', 'Arts & Theatre', 'Comedy'])[1 + g % 4],
+       (ARRAY['ticketmaster', 'eventbrite'])[1 + g % 2],
+       (now() AT TIME ZONE 'utc') + g * interval '1 minute',
+       (now() AT TIME ZONE 'utc') + g * interval '1 minute' + interval '2 hours',
+       20, 150, 4.5, 120,
+       'Venue ' || (g % 200),
+       (g % 9000) || ' S Las Vegas Blvd, Las Vegas, NV',
+       36.1 + (g % 100) * 0.001, -115.17 + (g % 100) * 0.001,
+       ARRAY['music', 'nightlife', 'vegas'],
+       'https://example.com/events/' || g,
+       'https://example.com/images/' || g || '.jpg',
+       jsonb_build_object('id', g, 'payload', repeat('x', 4000)),
+       jsonb_build_object('tickets', 'https://example.com/buy/' || g, 'hotel', 'https://example.com/stay/' || g)
+FROM generate_series(1, :rows) AS g
+"""
+
+
+def upcoming():
+    query = Event.query.filter(Event.start_date >= datetime.utcnow(), Event.canonical_event_id.is_(None))
+    return query.order_by(Event.start_date, Event.id)
+
+
+def orm_events(page_size):
+    return [event_list_item(event) for event in upcoming().limit(page_size).all()]
+
+
+def projected_events(page_size):
+    return [event_list_item(row) for row in upcoming().with_entities(*EVENT_LIST_COLUMNS).limit(page_size).all()]
+
+
+def recommendation_item(event):
+    return {
+        "id": event.id,
+        "name": event.name,
+        "category": event.category,
+        "start_date": event.start_date.isoformat() if event.start_date else None,
+        "image_url": event.image_url
+    }
+
+
+def orm_recommendations(page_size):
+    return [recommendation_item(event) for event in upcoming().limit(page_size).all()]
+
+
+def projected_recommendations(page_size):
+    rows = upcoming().with_entities(*RECOMMENDATION_COLUMNS).limit(page_size).all()
+    return [recommendation_item(row) for row in rows]
+
+
+def measure(build, page_size, repeat):
+    """Mean CPU seconds of one request, and its peak traced bytes.
+
+    Memory is traced in a separate run since tracemalloc slows down the
+    allocation-heavy ORM path far more than the projection path.
+    """
+    build(page_size)  # warm up statement and type caches
+    db.session.expunge_all()
+    gc.collect()
+    cpu_started = time.process_time()
+    for _ in range(repeat):
+        build(page_size)
+        # A request starts with an empty identity map
+        db.session.expunge_all()
+    cpu = (time.process_time() - cpu_started) / repeat
+
+    gc.collect()
+    tracemalloc.start()
+    build(page_size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.session.expunge_all()
+    return cpu, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ORM and projection read paths of the listing endpoints")
+    parser.add_argument('--rows', type=int, default=100_000, help="rows to seed (default: %(default)s)")
+    parser.add_argument('--page-size', type=int, default=1000, help="rows per request (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=20, help="requests per path (default: %(default)s)")
+    args = parser.parse_args()
+
+    cases = [
+        ('/api/events', orm_events, projected_events),
+        ('/api/recommendations', orm_recommendations, projected_recommendations),
+    ]
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            logger.error("The benchmark seeds PostgreSQL tables; set DATABASE_URL.")
+            return 2
+        connection = db.session.connection()
+        try:
+            connection.execute(text(CREATE_SQL))
+            logger.info(f"Seeding {args.rows} events...")
+            connection.execute(text(SEED_SQL), {'rows': args.rows})
+            connection.execute(text("ANALYZE events"))
+            logger.info(f"{args.page_size} rows per request, {args.repeat} requests per path\n")
+            logger.info(f"{'endpoint':<22} {'path':<11} {'cpu ms':>9} {'peak KiB':>10}")
+            for endpoint, orm_path, lean_path in cases:
+                orm_cpu, orm_peak = measure(orm_path, args.page_size, args.repeat)
+                lean_cpu, lean_peak = measure(lean_path, args.page_size, args.repeat)
+                logger.info(f"{endpoint:<22} {'orm':<11} {orm_cpu * 1000:>9.2f} {orm_peak / 1024:>10.0f}")
+                logger.info(f"{endpoint:<22} {'projection':<11} {lean_cpu * 1000:>9.2f} {lean_peak / 1024:>10.0f}")
+                logger.info(f"{endpoint:<22} {'saved':<11} {100 * (1 - lean_cpu / orm_cpu):>8.0f}% "
+                            f"{100 * (1 - lean_peak / orm_peak):>9.0f}%")
+        finally:
+            db.session.rollback()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Benchmark vectorized recommendation scoring against the per-event Python loop.
+
+Builds synthetic candidate rows shaped like SCORING_COLUMNS and times, per
+request, the loop RecommendationEngine used before (category weight, liked
+events doubled, full sort) against scoring.py's feature matrices (building
+them, then scoring every term and taking the top k). No database needed.
+
+    python bench_recommendation_scoring.py [--candidates 100,500,1000,10000,100000] [--top 20]
+"""
+import argparse
+import logging
+import random
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from scoring import EPOCH, CandidateFeatures, ScoringWeights, UserProfile, score_candidates, top_k
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ['Music', 'Sports', 'Arts & Theatre', 'Film', 'Comedy', 'Nightlife', 'Food', 'Miscellaneous']
+TAGS = ['music', 'nightlife', 'vegas', 'family', 'outdoor', 'show', 'club', 'dining', 'sports', 'comedy',
+        'live', 'free', 'strip', 'downtown', 'pool', 'magic']
+
+Row = namedtuple('Row', ['id', 'name', 'category', 'start_date', 'image_url', 'tags', 'price_range_min',
+                         'rating', 'latitude', 'longitude', 'popularity_score', 'start_epoch'])
+
+
+def candidate_rows(count, now, seed=1):
+    rng = random.Random(seed)
+    rows = []
+    for event_id in range(1, count + 1):
+        start = now + timedelta(hours=rng.uniform(0, 24 * 60))
+        rows.append(Row(event_id, f'Event {event_id}', rng.choice(CATEGORIES), start, None,
+                        rng.sample(TAGS, rng.randint(0, 4)), rng.choice([None, 0, 25, 60, 150, 300]),
+                        rng.choice([None, 3.5, 4.0, 4.5, 5.0]), 36.1 + rng.random() * 0.2,
+                        -115.3 + rng.random() * 0.2, rng.random() * 100, (start - EPOCH).total_seconds()))
+    return rows
+
+
+def user_profile(rows, seed=2):
+    rng = random.Random(seed)
+    return UserProfile(
+        category_weights={name: rng.randint(1, 5) for name in rng.sample(CATEGORIES, 3)},
+        tag_weights={name: rng.randint(1, 4) for name in rng.sample(TAGS, 5)},
+        liked_ids={row.id for row in rng.sample(rows, min(50, len(rows)))},
+    )
+
+
+def loop_scores(rows, profile, top):
+    """The scoring RecommendationEngine did per event before scoring.py."""
+    scored_events = []
+    for event in rows:
+        score = profile.category_weights.get(event.category, 1)
+        if event.id in profile.liked_ids:
+            score *= 2
+        scored_events.append((event, score))
+    scored_events.sort(key=lambda x: x[1], reverse=True)
+    return scored_events[:top]
+
+
+def vectorized_scores(rows, profile, top, now, weights):
+    features = CandidateFeatures.from_rows(rows, now, (36.17, -115.14), tag_names=list(profile.tag_weights))
+    return top_k(features.ids, score_candidates(features, profile, weights), top)
+
+
+def measure(run, repeat):
+    """Mean wall-clock milliseconds of run()."""
+    run()  # warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the per-event scoring loop with vectorized scoring")
+    parser.add_argument('--candidates', default='100,500,1000,10000,100000',
+                        help="comma-separated candidate counts (default: %(default)s)")
+    parser.add_argument('--top', type=int, default=20, help="recommendations per request (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=20, help="requests per measurement (default: %(default)s)")
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    weights = ScoringWeights()
+    logger.info(f"{'candidates':>10} {'loop ms':>9} {'features ms':>12} {'score ms':>9} {'vectorized ms':>14}")
+    for count in (int(value) for value in args.candidates.split(',')):
+        rows = candidate_rows(count, now)
+        profile = user_profile(rows)
+        features = CandidateFeatures.from_rows(rows, now, (36.17, -115.14), tag_names=list(profile.tag_weights))
+        loop_ms = measure(lambda: loop_scores(rows, profile, args.top), args.repeat)
+        features_ms = measure(lambda: CandidateFeatures.from_rows(rows, now, (36.17, -115.14),
+                                                                  tag_names=list(profile.tag_weights)), args.repeat)
+        score_ms = measure(lambda: top_k(features.ids, score_candidates(features, profile, weights), args.top),
+                           args.repeat)
+        total_ms = measure(lambda: vectorized_scores(rows, profile, args.top, now, weights), args.repeat)
+        logger.info(f"{count:>10} {loop_ms:>9.2f} {features_ms:>12.2f} {score_ms:>9.2f} {total_ms:>14.2f}")
+    logger.info("\nThe loop scores category and likes only; vectorized scoring adds tags, price, rating, "
+                "distance, recency and popularity.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import logging
+from datetime import date
+from sqlalchemy import literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app import db, Event
+from geo import geohash_encode
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL caps a statement at 65535 bind parameters; ~20 columns per event
+# keeps a 1000-row statement comfortably below that.
+POSTGRES_MAX_ROWS_PER_STATEMENT = 1000
+# Keeps the IN (...) list of the batched path under SQLite's variable limit.
+BATCH_SIZE = 500
+# Columns left out of the fingerprint: the hash itself, and the archive
+# pointer, which is new on every fetch even when the event is unchanged.
+FINGERPRINT_IGNORED = {'content_hash', 'raw_ref'}
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _fingerprint_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def event_fingerprint(processed_event):
+    """Stable SHA-256 of a normalized event dict, ignoring bookkeeping columns."""
+    payload = {key: value for key, value in processed_event.items() if key not in FINGERPRINT_IGNORED}
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=_fingerprint_default)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def _prepare_rows(processed_events):
+    """Fingerprint rows, drop those without an external_id and keep the last copy of each id.
+
+    ON CONFLICT cannot touch the same row twice in one statement, and
+    providers occasionally repeat an event across a page.
+    """
+    rows = {}
+    for processed_event in processed_events:
+        if processed_event and processed_event.get('external_id'):
+            row = dict(processed_event, content_hash=event_fingerprint(processed_event))
+            # The ORM hook that keeps geohash in sync does not run for bulk statements
+            latitude, longitude = row.get('latitude'), row.get('longitude')
+            row['geohash'] = None
+            if latitude is not None and longitude is not None:
+                row['geohash'] = geohash_encode(latitude, longitude)
+            rows[row['external_id']] = row
+    return list(rows.values())
+
+
+def _upsert_postgresql(rows, changed_ids):
+    table = Event.__table__
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    for chunk in _chunks(rows, POSTGRES_MAX_ROWS_PER_STATEMENT):
+        columns = list(chunk[0].keys())
+        update_columns = [c for c in columns if c != 'external_id']
+        stmt = pg_insert(table).values(chunk)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.external_id],
+            set_={c: excluded[c] for c in update_columns},
+            # Skip the write entirely when the content is unchanged; rows
+            # stored before fingerprints existed have a NULL hash and are
+            # rewritten once.
+            where=table.c.content_hash.is_distinct_from(excluded.content_hash)
+        ).returning(table.c.id, literal_column('(xmax = 0)').label('inserted'))
+        # Rows held back by the WHERE clause are not returned at all
+        written = db.session.execute(stmt).all()
+        changed_ids.extend(row.id for row in written)
+        inserted = sum(1 for row in written if row.inserted)
+        counts['inserted'] += inserted
+        counts['updated'] += len(written) - inserted
+        counts['unchanged'] += len(chunk) - len(written)
+    return counts
+
+
+def _upsert_batched(rows, changed_ids):
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    written = []
+    for chunk in _chunks(rows, BATCH_SIZE):
+        external_ids = [row['external_id'] for row in chunk]
+        existing = {
+            event.external_id: event
+            for event in Event.query.filter(Event.external_id.in_(external_ids)).all()
+        }
+        for row in chunk:
+            event = existing.get(row['external_id'])
+            if event is None:
+                event = Event(**row)
+                db.session.add(event)
+                written.append(event)
+                counts['inserted'] += 1
+                continue
+            if event.content_hash == row['content_hash']:
+                counts['unchanged'] += 1
+                continue
+            for key, value in row.items():
+                setattr(event, key, value)
+            written.append(event)
+            counts['updated'] += 1
+    if written:
+        # New events have no id until flushed
+        db.session.flush()
+        changed_ids.extend(event.id for event in written)
+    return counts
+
+
+def bulk_upsert_events(processed_events, changed_ids=None):
+    """Insert or update a page of processed events keyed on external_id.
+
+    Uses a single INSERT ... ON CONFLICT (external_id) DO UPDATE per page on
+    PostgreSQL and a select-then-write batch on other dialects (SQLite in
+    tests). Each row is stored with its content_hash, and rows whose hash
+    matches the stored one are not written at all. The caller owns the
+    transaction. Returns a dict with inserted/updated/unchanged counts, and
+    appends the ids of inserted and updated events to changed_ids if given.
+    """
+    if changed_ids is None:
+        changed_ids = []
+    rows = _prepare_rows(processed_events)
+    if not rows:
+        return {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    if db.engine.dialect.name == 'postgresql':
+        return _upsert_postgresql(rows, changed_ids)
+    return _upsert_batched(rows, changed_ids)
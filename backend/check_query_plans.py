@@ -0,0 +1,149 @@
+"""Query-plan regression check for the /api/events filters.
+
+Seeds a temporary copy of the events table (1M rows by default) inside a
+transaction that is rolled back afterwards, EXPLAINs every supported filter
+combination built by filter_events_query in every keyset sort order, and
+exits non-zero if any plan falls back to a sequential scan of events.
+/api/events/search queries, full-text and fuzzy, are checked the same way.
+
+    DATABASE_URL=postgresql://... python check_query_plans.py [--rows N]
+
+test_query_plans.py runs the same check under pytest, skipped when no
+PostgreSQL database is reachable.
+
+The location filter is left out because the seed has no coordinates; its
+candidates come from geohash ranges on ix_events_geohash (see geo.py).
+"""
+import argparse
+import itertools
+import json
+import logging
+import sys
+from werkzeug.datastructures import MultiDict
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from app import app, db, Event, filter_events_query, fulltext_search_query, fuzzy_search_query
+from keyset import EVENT_SORTS, order_query
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROWS = 1_000_000
+
+# Every value filter_events_query treats differently, None meaning "not set"
+FILTER_VALUES = {
+    'category': [None, 'Music'],
+    'priceRange': [None, 'free', 'paid', '50-100'],
+    'timeframe': [None, 'today', 'week', 'month'],
+    'source': [None, 'Ticketmaster'],
+    'min_rating': [None, '4.5'],
+}
+
+# Search texts matching a handful of seeded names, as typed and misspelled
+SEARCH_TEXTS = ['event 123456', 'evnt 123456']
+
+# Temporary tables shadow public.events for this session, and
+# INCLUDING INDEXES copies the indexes under test. INCLUDING GENERATED
+# keeps search_vector computed from the seeded names.
+CREATE_SQL = ("CREATE TEMPORARY TABLE events "
+              "(LIKE public.events INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING INDEXES) ON COMMIT DROP")
+
+# A year of past and a year of upcoming events over 8 categories and the
+# three providers; every fifth event is free and every tenth a duplicate.
+SEED_SQL = """
+INSERT INTO events (id, external_id, name, category, source, start_date, rating, price_range_min, canonical_event_id)
+SELECT g,
+       'plan-check-' || g,
+       'Event ' || g,
+       (ARRAY['Music', 'Sports', 'Arts & Theatre', 'Film', 'Comedy', 'Nightlife', 'Food', 'Miscellaneous'])[1 + g % 8],
+       (ARRAY['ticketmaster', 'eventbrite', 'google_places'])[1 + g % 3],
+       (now() AT TIME ZONE 'utc') + (random() * 730 - 365) * interval '1 day',
+       round((random() * 5)::numeric, 2),
+       CASE WHEN g % 5 = 0 THEN 0 ELSE round((random() * 300)::numeric, 2) END,
+       CASE WHEN g % 10 = 0 THEN g - 1 END
+FROM generate_series(1, :rows) AS g
+"""
+
+
+def filter_combinations():
+    names = list(FILTER_VALUES)
+    for values in itertools.product(*(FILTER_VALUES[name] for name in names)):
+        for sort in EVENT_SORTS:
+            filters = {name: value for name, value in zip(names, values) if value is not None}
+            yield sort, MultiDict(filters)
+
+
+def search_queries():
+    for search_text in SEARCH_TEXTS:
+        query = filter_events_query(MultiDict())
+        yield f"full-text search for '{search_text}'", fulltext_search_query(query, search_text, 20)
+        yield f"fuzzy search for '{search_text}'", fuzzy_search_query(query, search_text, 20)
+
+
+def sequential_scans(plan):
+    """Relations that a JSON EXPLAIN plan node or its children scan sequentially."""
+    scans = []
+    if plan.get('Node Type') == 'Seq Scan':
+        scans.append(plan.get('Relation Name'))
+    for child in plan.get('Plans', []):
+        scans.extend(sequential_scans(child))
+    return scans
+
+
+def explain(connection, query):
+    compiled = query.statement.compile(dialect=postgresql.dialect())
+    result = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params)
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']
+
+
+def plan_failures(rows=DEFAULT_ROWS):
+    """(queries planned with a sequential scan of events, number of queries checked).
+
+    Needs an app context on PostgreSQL; the seeded table is rolled back.
+    """
+    failures = []
+    connection = db.session.connection()
+    try:
+        connection.execute(text(CREATE_SQL))
+        logger.info(f"Seeding {rows} events...")
+        connection.execute(text(SEED_SQL), {'rows': rows})
+        connection.execute(text("ANALYZE events"))
+        combinations = list(filter_combinations())
+        for sort, filters in combinations:
+            query = order_query(filter_events_query(filters), Event, sort).limit(100)
+            scans = [name for name in sequential_scans(explain(connection, query)) if name == 'events']
+            if scans:
+                failures.append(f"sortBy={sort} and filters {filters.to_dict()}")
+                logger.error(f"Sequential scan for sortBy={sort} and filters {filters.to_dict()}")
+        searches = list(search_queries())
+        for description, query in searches:
+            if 'events' in sequential_scans(explain(connection, query)):
+                failures.append(description)
+                logger.error(f"Sequential scan for {description}")
+    finally:
+        db.session.rollback()
+    return failures, len(combinations) + len(searches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if an /api/events filter combination needs a sequential scan")
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help="rows to seed (default: %(default)s)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            logger.error("Query plans can only be checked against PostgreSQL; set DATABASE_URL.")
+            return 2
+        failures, checked = plan_failures(args.rows)
+    if failures:
+        logger.error(f"{len(failures)} of {checked} queries scan events sequentially")
+        return 1
+    logger.info(f"All {checked} queries use an index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
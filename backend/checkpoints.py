@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+class CheckpointStore:
+    """Resumable ingestion progress, persisted atomically as JSON.
+
+    Besides the run-level new_start_date, the store keeps one entry per
+    provider and date window with the last committed page, the cursor needed
+    to fetch the page after it, and whether the window is finished:
+
+        {"new_start_date": "...",
+         "max_event_date": "...",
+         "windows": {"ticketmaster@2025-12-15T03:00:00Z/2025-12-31T23:59:59Z":
+                         {"last_page": 12, "cursor": null, "completed": false}}}
+
+    The file is rewritten after every committed batch, so a restarted run
+    resumes each provider right after its last committed page.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+        self.data.setdefault('windows', {})
+
+    @staticmethod
+    def window_key(provider, window=None):
+        if not window:
+            return provider
+        start, end = window
+        return f"{provider}@{start.strftime(DATE_FORMAT)}/{end.strftime(DATE_FORMAT)}"
+
+    def _read_date(self, key):
+        value = self.data.get(key)
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, DATE_FORMAT)
+        except ValueError:
+            return None
+
+    def start_date(self):
+        """The start of the next ingestion window, or None without a checkpoint."""
+        return self._read_date('new_start_date')
+
+    def max_event_date(self):
+        """Latest event start committed by an interrupted run of this window."""
+        return self._read_date('max_event_date')
+
+    def window_state(self, provider, window=None):
+        return dict(self.data['windows'].get(self.window_key(provider, window), {}))
+
+    def resume_point(self, provider, window=None):
+        """Return (completed, next_page, cursor) for a provider's window."""
+        state = self.window_state(provider, window)
+        if state.get('completed'):
+            return True, None, None
+        if 'last_page' in state:
+            return False, state['last_page'] + 1, state.get('cursor')
+        return False, None, None
+
+    def begin_window(self, provider, window=None):
+        """Mark a provider's window as in progress until its final page is committed."""
+        with self._lock:
+            self.data['windows'].setdefault(self.window_key(provider, window), {})['completed'] = False
+            self._save()
+
+    def complete_window(self, provider, window=None):
+        with self._lock:
+            self.data['windows'].setdefault(self.window_key(provider, window), {})['completed'] = True
+            self._save()
+
+    def shard_plan(self, provider, window):
+        """The [(start, end, total), ...] shards stored for a provider's window, or None."""
+        shards = self.window_state(provider, window).get('shards')
+        if shards is None:
+            return None
+        return [(datetime.strptime(start, DATE_FORMAT), datetime.strptime(end, DATE_FORMAT), total)
+                for start, end, total in shards]
+
+    def save_shard_plan(self, provider, window, shards):
+        """Store how a provider's window was split, so a resumed run visits the same shard windows.
+
+        Other windows of the provider, left over from an earlier plan, are
+        dropped: no run would visit them again.
+        """
+        with self._lock:
+            windows = self.data['windows']
+            keep = {self.window_key(provider, window)}
+            keep.update(self.window_key(provider, (start, end)) for start, end, _ in shards)
+            for key in [key for key in windows if key.startswith(f"{provider}@") and key not in keep]:
+                del windows[key]
+            windows.setdefault(self.window_key(provider, window), {})['shards'] = [
+                [start.strftime(DATE_FORMAT), end.strftime(DATE_FORMAT), total] for start, end, total in shards
+            ]
+            self._save()
+
+    def pending_windows(self):
+        """Window keys that were started but whose provider has not finished."""
+        return sorted(key for key, state in self.data['windows'].items() if not state.get('completed'))
+
+    def record_pages(self, pages, max_event_date=None):
+        """Record committed pages (objects with provider, window, number, cursor and done)."""
+        with self._lock:
+            windows = self.data['windows']
+            for page in pages:
+                state = windows.setdefault(self.window_key(page.provider, page.window), {})
+                if page.done:
+                    state['completed'] = True
+                else:
+                    state['last_page'] = page.number
+                    state['cursor'] = page.cursor
+            if max_event_date:
+                self.data['max_event_date'] = max_event_date.strftime(DATE_FORMAT)
+            self._save()
+
+    def finish_run(self, new_start_date):
+        """Close out a fully ingested window and move the start date forward."""
+        with self._lock:
+            self.data = {'new_start_date': new_start_date.strftime(DATE_FORMAT), 'windows': {}}
+            self._save()
+        logger.info(f"Checkpoint saved: new_start_date={self.data['new_start_date']}")
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.checkpoint-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.data, f, indent=2, sort_keys=True)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,46 @@
+import logging
+from ingest_pipeline import merge
+
+logger = logging.getLogger(__name__)
+
+# Per-provider fetch parallelism. Request rates are enforced separately by
+# the shared throttles in rate_limiter, and Google Places page tokens have
+# to be followed one at a time.
+PROVIDER_LIMITS = {
+    'ticketmaster': {'max_workers': 4, 'prefetch_pages': 8},
+    'eventbrite': {'max_workers': 2, 'prefetch_pages': 4},
+    'google_places': {'max_workers': 1, 'prefetch_pages': 1},
+}
+
+# Pages fetched but not yet written; producers block once this many are waiting.
+WRITE_QUEUE_SIZE = 16
+
+
+class ConcurrentIngestion:
+    """Fetches every provider in parallel and funnels pages into one writer.
+
+    Each provider's page source gets its own bounded thread pool and runs in
+    its own thread; request rates are held by the provider throttles every
+    fetch goes through. Pages meet in a bounded queue that the calling
+    thread drains through the normal pipeline, so only it touches the
+    database session.
+    """
+
+    def __init__(self, service, limits=None, queue_size=WRITE_QUEUE_SIZE):
+        self.service = service
+        self.limits = limits or PROVIDER_LIMITS
+        self.queue_size = queue_size
+
+    def pool_options(self):
+        return {
+            provider: {
+                'max_workers': limits['max_workers'],
+                'prefetch_pages': limits['prefetch_pages'],
+            }
+            for provider, limits in self.limits.items()
+        }
+
+    def run(self, start_date, end_date, totals, checkpoints=None):
+        """Ingest all providers concurrently; returns (total_processed, max_event_date)."""
+        sources = self.service.page_sources(start_date, end_date, self.pool_options(), checkpoints)
+        return self.service.run_pipeline(merge(sources, depth=self.queue_size), start_date, totals, checkpoints)
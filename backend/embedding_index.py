@@ -0,0 +1,450 @@
+"""Content embeddings of events and an approximate nearest-neighbour index over them.
+
+TextEncoder turns an event's name, description, tags and category into a
+fixed-size vector: words are hashed into HASH_FEATURES buckets, weighted by
+TF-IDF and projected onto the top singular vectors of a sample of the
+catalogue (latent semantic analysis), so events sharing vocabulary end up
+close together. Free-text queries are encoded the same way.
+
+EmbeddingIndex keeps the unit-length vectors in memory-mapped files and
+finds neighbours with an inverted-file (IVF) index: k-means centroids split
+the vectors into lists, and a query only scores the lists of its NPROBE
+nearest centroids. New and changed events are written into the same files
+in place; only a rebuild refits the encoder and the centroids.
+
+    <directory>/CURRENT                  name of the build being served
+    <directory>/<build>/meta.json        row count, capacity, dim, last event change applied
+    <directory>/<build>/idf.npy, projection.npy, centroids.npy
+    <directory>/<build>/vectors.f32      capacity x dim float32 rows
+    <directory>/<build>/ids.i64          event id per row (-1 once removed)
+    <directory>/<build>/lists.i32        IVF list per row (-1 for events without text)
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unicodedata
+import uuid
+import zlib
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+import numpy as np
+from scoring import top_k
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(__file__), '.event_embeddings')
+
+HASH_FEATURES = 1 << 16
+EMBEDDING_DIM = 64
+# Randomized SVD: extra sampled directions and power iterations for accuracy
+SVD_OVERSAMPLES = 8
+SVD_POWER_ITERATIONS = 2
+# Rows multiplied at a time, bounding the memory of the gathered projection rows
+SPARSE_CHUNK_ROWS = 4096
+
+# A word in the name counts twice as much as one in the description
+FIELD_WEIGHTS = {'name': 2.0, 'description': 1.0, 'tags': 1.5, 'category': 1.5}
+STOPWORDS = {'the', 'a', 'an', 'and', 'or', 'of', 'at', 'in', 'on', 'for', 'to', 'with', 'by', 'from', 'is',
+             'are', 'be', 'this', 'that', 'your', 'you', 'our', 'we', 'it', 'as', 'will'}
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# About sqrt(n) lists; a query scores NPROBE of them
+MAX_LISTS = 4096
+NPROBE = 16
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE = 100000
+
+
+def index_directory():
+    """Directory of the index from EVENT_EMBEDDINGS_DIR, or None when EVENT_EMBEDDINGS=0."""
+    if os.environ.get('EVENT_EMBEDDINGS', '1') == '0':
+        return None
+    return os.environ.get('EVENT_EMBEDDINGS_DIR', DEFAULT_INDEX_DIR)
+
+
+def _words(text):
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii').lower()
+    return [word for word in TOKEN_PATTERN.findall(text) if len(word) > 1 and word not in STOPWORDS]
+
+
+def event_terms(name=None, description=None, tags=None, category=None):
+    """Weighted word counts of an event's text fields."""
+    terms = Counter()
+    for field, text in (('name', name), ('description', description), ('tags', ' '.join(tags or ())),
+                        ('category', category)):
+        for word in _words(text):
+            terms[word] += FIELD_WEIGHTS[field]
+    return terms
+
+
+def query_terms(text):
+    """Word counts of a free-text query."""
+    return Counter(_words(text))
+
+
+@lru_cache(maxsize=1 << 18)
+def _bucket(term):
+    return zlib.crc32(term.encode('utf-8')) % HASH_FEATURES
+
+
+def _hashed(documents):
+    """(indptr, buckets, counts) of documents' terms hashed into HASH_FEATURES, as in CSR."""
+    indptr, indices, counts = [0], [], []
+    for terms in documents:
+        buckets = Counter()
+        for term, count in terms.items():
+            buckets[_bucket(term)] += count
+        indices.extend(buckets)
+        counts.extend(buckets.values())
+        indptr.append(len(indices))
+    return np.array(indptr, dtype=np.int64), np.array(indices, dtype=np.int64), np.array(counts, dtype=np.float32)
+
+
+def _row_ids(indptr):
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+
+def _tfidf(indptr, indices, counts, idf):
+    """Log-scaled term frequency times idf, each row scaled to unit length."""
+    data = (1.0 + np.log(counts)) * idf[indices]
+    rows = _row_ids(indptr)
+    norms = np.sqrt(np.bincount(rows, weights=data ** 2, minlength=len(indptr) - 1))
+    return (data / norms[rows]).astype(np.float32)
+
+
+def _sparse_dot(indptr, indices, data, dense):
+    """(sparse rows) @ dense, with dense indexed by bucket."""
+    out = np.zeros((len(indptr) - 1, dense.shape[1]), dtype=np.float32)
+    lengths = np.diff(indptr)
+    for start in range(0, len(out), SPARSE_CHUNK_ROWS):
+        end = min(start + SPARSE_CHUNK_ROWS, len(out))
+        nonempty = lengths[start:end] > 0
+        if not nonempty.any():
+            continue
+        first, last = indptr[start], indptr[end]
+        block = dense[indices[first:last]] * data[first:last, None]
+        out[start:end][nonempty] = np.add.reduceat(block, indptr[start:end][nonempty] - first, axis=0)
+    return out
+
+
+def _sparse_t_dot(indptr, indices, data, dense):
+    """(sparse rows).T @ dense, one row per bucket."""
+    rows = _row_ids(indptr)
+    out = np.empty((HASH_FEATURES, dense.shape[1]), dtype=np.float32)
+    for column in range(dense.shape[1]):
+        out[:, column] = np.bincount(indices, weights=data * dense[rows, column], minlength=HASH_FEATURES)
+    return out
+
+
+def _normalized(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class TextEncoder:
+    """Hashed TF-IDF followed by a truncated SVD projection."""
+
+    def __init__(self, idf, projection):
+        self.idf = idf
+        self.projection = projection
+
+    @property
+    def dim(self):
+        return self.projection.shape[1]
+
+    @classmethod
+    def fit(cls, documents, dim=EMBEDDING_DIM, seed=0):
+        """Encoder fitted on a sample of documents (event_terms() counters)."""
+        indptr, indices, counts = _hashed(documents)
+        n = len(indptr) - 1
+        document_frequency = np.bincount(indices, minlength=HASH_FEATURES)
+        idf = (np.log((1 + n) / (1 + document_frequency)) + 1).astype(np.float32)
+        data = _tfidf(indptr, indices, counts, idf)
+        # Randomized SVD (Halko et al.): an orthonormal basis of the sampled
+        # range, sharpened by power iterations, then an exact SVD of the
+        # small projected matrix
+        rank = max(1, min(dim + SVD_OVERSAMPLES, n))
+        rng = np.random.default_rng(seed)
+        sample = _sparse_dot(indptr, indices, data, rng.standard_normal((HASH_FEATURES, rank), dtype=np.float32))
+        for _ in range(SVD_POWER_ITERATIONS):
+            basis = np.linalg.qr(_sparse_t_dot(indptr, indices, data, np.linalg.qr(sample)[0]))[0]
+            sample = _sparse_dot(indptr, indices, data, basis)
+        projected = _sparse_t_dot(indptr, indices, data, np.linalg.qr(sample)[0])
+        components = np.linalg.svd(projected, full_matrices=False)[0]
+        return cls(idf, np.ascontiguousarray(components[:, :min(dim, rank)], dtype=np.float32))
+
+    def encode(self, documents):
+        """(len(documents), dim) unit vectors; documents without known words get zero rows."""
+        indptr, indices, counts = _hashed(documents)
+        return _normalized(_sparse_dot(indptr, indices, _tfidf(indptr, indices, counts, self.idf), self.projection))
+
+    def save(self, path):
+        np.save(os.path.join(path, 'idf.npy'), self.idf)
+        np.save(os.path.join(path, 'projection.npy'), self.projection)
+
+    @classmethod
+    def load(cls, path):
+        return cls(np.load(os.path.join(path, 'idf.npy')), np.load(os.path.join(path, 'projection.npy'), mmap_mode='r'))
+
+
+def _nearest(vectors, centroids, chunk_rows=65536):
+    """Index of each vector's most similar centroid."""
+    nearest = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk_rows):
+        nearest[start:start + chunk_rows] = np.argmax(vectors[start:start + chunk_rows] @ centroids.T, axis=1)
+    return nearest
+
+
+def _train_centroids(vectors, count, seed=0):
+    """Spherical k-means centroids of a sample of vectors."""
+    rng = np.random.default_rng(seed)
+    sample = vectors[np.sort(rng.choice(len(vectors), min(len(vectors), KMEANS_SAMPLE), replace=False))]
+    centroids = sample[rng.choice(len(sample), min(count, len(sample)), replace=False)]
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = _nearest(sample, centroids)
+        sums = np.stack([np.bincount(assignment, weights=sample[:, d], minlength=len(centroids))
+                         for d in range(sample.shape[1])], axis=1).astype(np.float32)
+        # An empty list keeps its centroid
+        filled = np.bincount(assignment, minlength=len(centroids)) > 0
+        centroids[filled] = _normalized(sums[filled])
+    return centroids
+
+
+def _write_json(path, value):
+    """Write JSON atomically, so readers never see a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class EmbeddingIndex:
+    """One build of the index: encoder, memory-mapped vectors and IVF lists.
+
+    Readers open the CURRENT build read-only; the embedding job opens it
+    writable to add and remove events, or creates a new build.
+    """
+
+    def __init__(self, path, writable=False):
+        self.path = path
+        self.writable = writable
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.count = meta['count']
+        self.dim = meta['dim']
+        self.last_seq = meta['last_seq']
+        self.encoder = TextEncoder.load(path)
+        centroids_path = os.path.join(path, 'centroids.npy')
+        self.centroids = np.load(centroids_path) if os.path.exists(centroids_path) else None
+        self._map(meta['capacity'])
+        self._index_rows()
+
+    @classmethod
+    def open(cls, directory, writable=False):
+        """The CURRENT build in directory, or None when nothing has been built."""
+        try:
+            with open(os.path.join(directory, 'CURRENT')) as f:
+                build = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return cls(os.path.join(directory, build), writable)
+
+    @classmethod
+    def create(cls, directory, encoder):
+        """A new, empty build in directory; served once publish() is called."""
+        build = f"build-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        path = os.path.join(directory, build)
+        os.makedirs(path)
+        encoder.save(path)
+        for name in ('vectors.f32', 'ids.i64', 'lists.i32'):
+            open(os.path.join(path, name), 'wb').close()
+        _write_json(os.path.join(path, 'meta.json'), {'count': 0, 'capacity': 0, 'dim': encoder.dim, 'last_seq': 0})
+        return cls(path, writable=True)
+
+    def __len__(self):
+        return self.count
+
+    def _map(self, capacity):
+        self.capacity = capacity
+        mode = 'r+' if self.writable else 'r'
+        if capacity == 0:
+            self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+            self.ids = np.zeros(0, dtype=np.int64)
+            self.lists = np.zeros(0, dtype=np.int32)
+            return
+        self.vectors = np.memmap(os.path.join(self.path, 'vectors.f32'), np.float32, mode, shape=(capacity, self.dim))
+        self.ids = np.memmap(os.path.join(self.path, 'ids.i64'), np.int64, mode, shape=(capacity,))
+        self.lists = np.memmap(os.path.join(self.path, 'lists.i32'), np.int32, mode, shape=(capacity,))
+
+    def _index_rows(self):
+        """Sorted id lookup and list offsets over the first count rows."""
+        ids = np.asarray(self.ids[:self.count])
+        self.id_order = np.argsort(ids, kind='stable')
+        self.sorted_ids = ids[self.id_order]
+        lists = np.asarray(self.lists[:self.count])
+        # Rows of list c are list_rows[list_ptr[c]:list_ptr[c + 1]]; rows
+        # without a list sort first and are never probed
+        self.list_rows = np.argsort(lists, kind='stable')
+        list_count = len(self.centroids) if self.centroids is not None else 1
+        self.list_ptr = np.searchsorted(lists[self.list_rows], np.arange(list_count + 1))
+
+    def _rows_of(self, event_ids):
+        """Row of each event id, -1 for ids not stored."""
+        event_ids = np.asarray(event_ids, dtype=np.int64)
+        if not len(self.sorted_ids):
+            return np.full(len(event_ids), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.sorted_ids, event_ids), len(self.sorted_ids) - 1)
+        return np.where(self.sorted_ids[positions] == event_ids, self.id_order[positions], -1)
+
+    def _grow(self, capacity):
+        for name, itemsize in (('vectors.f32', 4 * self.dim), ('ids.i64', 8), ('lists.i32', 4)):
+            with open(os.path.join(self.path, name), 'r+b') as f:
+                f.truncate(capacity * itemsize)
+        self._map(capacity)
+
+    def _assign(self, vectors):
+        if self.centroids is None:
+            lists = np.zeros(len(vectors), dtype=np.int32)
+        else:
+            lists = _nearest(vectors, self.centroids)
+        # Events without known words match nothing
+        lists[~vectors.any(axis=1)] = -1
+        return lists
+
+    def upsert(self, event_ids, vectors):
+        """Store vectors of event_ids (unique), replacing their previous vectors."""
+        rows = self._rows_of(event_ids)
+        new = rows < 0
+        added = int(new.sum())
+        if self.count + added > self.capacity:
+            self._grow(max(self.count + added, 2 * self.capacity, 1024))
+        rows[new] = np.arange(self.count, self.count + added)
+        self.vectors[rows] = vectors
+        self.ids[rows] = event_ids
+        self.lists[rows] = self._assign(vectors)
+        self.count += added
+        self._index_rows()
+
+    def remove(self, event_ids):
+        """Drop event_ids from results; their rows stay allocated until the next rebuild."""
+        rows = self._rows_of(event_ids)
+        rows = rows[rows >= 0]
+        self.ids[rows] = -1
+        self.lists[rows] = -1
+        self._index_rows()
+
+    def train_lists(self, seed=0):
+        """Fit centroids to the stored vectors and reassign every row."""
+        vectors = np.asarray(self.vectors[:self.count])
+        searchable = vectors[vectors.any(axis=1)]
+        if not len(searchable):
+            return
+        list_count = int(min(MAX_LISTS, max(1, np.sqrt(len(searchable)))))
+        self.centroids = _train_centroids(searchable, list_count, seed)
+        np.save(os.path.join(self.path, 'centroids.npy'), self.centroids)
+        for start in range(0, self.count, KMEANS_SAMPLE):
+            end = min(start + KMEANS_SAMPLE, self.count)
+            self.lists[start:end] = self._assign(vectors[start:end])
+        self.lists[np.flatnonzero(self.ids[:self.count] < 0)] = -1
+        self._index_rows()
+
+    def save(self, last_seq):
+        """Flush the files and record the last event change applied; readers reload then."""
+        if self.capacity:
+            for array in (self.vectors, self.ids, self.lists):
+                array.flush()
+        self.last_seq = last_seq
+        _write_json(os.path.join(self.path, 'meta.json'), {
+            'count': self.count, 'capacity': self.capacity, 'dim': self.dim, 'last_seq': last_seq
+        })
+
+    def publish(self, last_seq):
+        """Save this build, make it CURRENT and delete older builds."""
+        self.save(last_seq)
+        directory, build = os.path.split(self.path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(build)
+        os.replace(tmp_path, os.path.join(directory, 'CURRENT'))
+        # Readers still mapping an old build keep their files until they reload
+        for name in os.listdir(directory):
+            if name.startswith('build-') and name != build:
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+    def search(self, vector, k, exclude=None, nprobe=NPROBE):
+        """(event_id, cosine similarity) of up to k stored events nearest vector, best first."""
+        if self.centroids is None or not self.count or not vector.any():
+            return []
+        centroid_scores = self.centroids @ vector
+        probes = np.argpartition(-centroid_scores, min(nprobe, len(centroid_scores)) - 1)[:nprobe]
+        rows = np.concatenate([self.list_rows[self.list_ptr[c]:self.list_ptr[c + 1]] for c in probes])
+        if not len(rows):
+            return []
+        # Reading rows in file order keeps memory-mapped reads sequential
+        rows.sort()
+        ids = np.asarray(self.ids[rows])
+        scores = np.asarray(self.vectors[rows]) @ vector
+        if exclude is not None:
+            keep = ids != exclude
+            ids, scores = ids[keep], scores[keep]
+        return top_k(ids, scores.astype(np.float64), k)
+
+    def similar(self, event_id, k):
+        """Events whose text is most like event_id's; empty when it is not indexed."""
+        row = self._rows_of([event_id])[0]
+        if row < 0:
+            return []
+        return self.search(np.asarray(self.vectors[row]), k, exclude=event_id)
+
+    def match(self, text, k):
+        """Events whose text best matches a free-text query."""
+        return self.search(self.encoder.encode([query_terms(text)])[0], k)
+
+
+class IndexReader:
+    """This worker's read-only view of the CURRENT build, reopened when the job changes it."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self.index = None
+        self.stamp = None
+
+    @classmethod
+    def from_env(cls):
+        """Reader of the index configured by EVENT_EMBEDDINGS*, or None when EVENT_EMBEDDINGS=0."""
+        directory = index_directory()
+        return cls(directory) if directory else None
+
+    def _stamp(self):
+        # The build name and its meta.json change whenever readers should reload
+        try:
+            with open(os.path.join(self.directory, 'CURRENT')) as f:
+                build = f.read().strip()
+            return build, os.stat(os.path.join(self.directory, build, 'meta.json')).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def current(self):
+        """The served EmbeddingIndex, or None when nothing has been built or it cannot be opened."""
+        stamp = self._stamp()
+        if stamp == self.stamp:
+            return self.index
+        with self._lock:
+            if stamp != self.stamp:
+                try:
+                    self.index = EmbeddingIndex(os.path.join(self.directory, stamp[0])) if stamp else None
+                except Exception as e:
+                    logger.warning(f"Opening the event embedding index failed: {e}")
+                    self.index = None
+                self.stamp = stamp
+            return self.index
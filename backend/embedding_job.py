@@ -0,0 +1,109 @@
+"""Build and update the event embedding index (embedding_index.py).
+
+A rebuild refits the encoder on a random sample of the catalogue,
+re-encodes every canonical event into a new build and swaps it in. An
+update, after each ingestion, re-encodes only the events in the
+event_changes feed since the index's last applied change, and drops those
+deleted or linked as duplicates since. An update rebuilds instead when
+nothing is built yet or the feed has been pruned past the index.
+
+    python embedding_job.py [--rebuild]
+"""
+import argparse
+import logging
+import sys
+from datetime import datetime
+from app import app, db, Event, load_event_changes, pruned_event_seq
+from embedding_index import EmbeddingIndex, TextEncoder, event_terms, index_directory
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_COLUMNS = (Event.id, Event.name, Event.description, Event.tags, Event.category)
+# Events the encoder's vocabulary and SVD are fitted on
+FIT_SAMPLE = 50000
+# Events read and encoded per query
+ENCODE_BATCH_SIZE = 5000
+
+
+def _documents(rows):
+    return [event_terms(row.name, row.description, row.tags, row.category) for row in rows]
+
+
+def canonical_events():
+    return Event.query.filter(Event.canonical_event_id.is_(None)).with_entities(*EMBEDDING_COLUMNS)
+
+
+def rebuild_event_embeddings(directory=None):
+    """Fit a new encoder, encode every canonical event and serve the new build; returns the event count."""
+    directory = directory or index_directory()
+    started = datetime.utcnow()
+    # Read the feed position first: changes committed while encoding are
+    # applied again by the next update, which is harmless
+    _, last_seq = load_event_changes()
+    sample = canonical_events().order_by(db.func.random()).limit(FIT_SAMPLE).all()
+    if not sample:
+        logger.info("No events to embed")
+        return 0
+    encoder = TextEncoder.fit(_documents(sample))
+    index = EmbeddingIndex.create(directory, encoder)
+    last_id = 0
+    while True:
+        rows = canonical_events().filter(Event.id > last_id).order_by(Event.id).limit(ENCODE_BATCH_SIZE).all()
+        if not rows:
+            break
+        index.upsert([row.id for row in rows], encoder.encode(_documents(rows)))
+        last_id = rows[-1].id
+    index.train_lists()
+    index.publish(last_seq)
+    # No lists are trained when no event has a known word
+    list_count = len(index.centroids) if index.centroids is not None else 0
+    logger.info(f"Embedded {len(index)} events into {list_count} lists in "
+                f"{(datetime.utcnow() - started).total_seconds():.1f}s")
+    return len(index)
+
+
+def update_event_embeddings(directory=None):
+    """Apply the event changes since the index's last one; returns the number of events changed."""
+    directory = directory or index_directory()
+    if directory is None:
+        return 0
+    index = EmbeddingIndex.open(directory, writable=True)
+    if index is None:
+        return rebuild_event_embeddings(directory)
+    if pruned_event_seq() > index.last_seq:
+        logger.warning("The event change feed was pruned past the embedding index; rebuilding it")
+        return rebuild_event_embeddings(directory)
+
+    changed, last_seq = load_event_changes(after=index.last_seq)
+    changed = sorted(changed)
+    stored = set()
+    for start in range(0, len(changed), ENCODE_BATCH_SIZE):
+        rows = canonical_events().filter(Event.id.in_(changed[start:start + ENCODE_BATCH_SIZE])).all()
+        if rows:
+            index.upsert([row.id for row in rows], index.encoder.encode(_documents(rows)))
+            stored.update(row.id for row in rows)
+    index.remove([event_id for event_id in changed if event_id not in stored])
+    index.save(last_seq)
+    logger.info(f"Updated {len(stored)} and removed {len(changed) - len(stored)} embedded events")
+    return len(changed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or update the event embedding index")
+    parser.add_argument('--rebuild', action='store_true', help="refit the encoder and re-encode every event")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+    directory = index_directory()
+    if directory is None:
+        logger.error("Event embeddings are disabled (EVENT_EMBEDDINGS=0)")
+        return 1
+    with app.app_context():
+        if args.rebuild:
+            rebuild_event_embeddings(directory)
+        else:
+            update_event_embeddings(directory)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
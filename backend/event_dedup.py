@@ -0,0 +1,220 @@
+import logging
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+from app import db, Event, record_event_changes
+
+logger = logging.getLogger(__name__)
+
+# Blocking: candidates must share (or neighbour) a ~1 km geo cell or have the
+# same normalized venue, and start within DEDUP_TIME_BUCKET_HOURS buckets of
+# each other. Providers geocode the same venue a few hundred metres apart.
+GEO_CELL_DEGREES = 0.01
+DEDUP_TIME_BUCKET_HOURS = 2
+DEDUP_MAX_START_DELTA_HOURS = 2
+
+# MinHash LSH over name trigrams: 8 bands of 4 rows catch pairs with a
+# Jaccard similarity of roughly 0.6 and up, which are then verified exactly.
+MINHASH_BANDS = 8
+MINHASH_ROWS = 4
+NAME_SIMILARITY_THRESHOLD = 0.5
+
+# Which copy becomes canonical when the same event comes from several sources
+SOURCE_PRIORITY = {'ticketmaster': 0, 'eventbrite': 1, 'google_places': 2}
+
+# Words that vary between listings of the same show without changing it
+NAME_STOPWORDS = {'the', 'a', 'an', 'at', 'in', 'and', 'live', 'tickets', 'presents', 'las', 'vegas'}
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    ((i * 0x9E3779B97F4A7C15 + 1) % _MERSENNE_PRIME, (i * 0xC2B2AE3D27D4EB4F + 7) % _MERSENNE_PRIME)
+    for i in range(1, MINHASH_BANDS * MINHASH_ROWS + 1)
+]
+
+
+def normalize_name(name):
+    text = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode('ascii').lower()
+    words = [word for word in re.findall(r'[a-z0-9]+', text) if word not in NAME_STOPWORDS]
+    return ' '.join(words)
+
+
+def name_trigrams(name):
+    padded = f"  {normalize_name(name)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def minhash(shingles):
+    hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles] or [0]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        self.parent.setdefault(item, item)
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a, b):
+        self.parent[self.find(a)] = self.find(b)
+
+
+class DedupIndex:
+    """Incremental duplicate finder for events from different providers.
+
+    Each added event is compared only against events in neighbouring
+    blocks (geo cell or venue, start-time bucket) whose name MinHash shares
+    an LSH band, so a catalogue of n events costs O(n) lookups instead of
+    O(n^2) comparisons. Matches are merged into clusters, at most one
+    event per source each: matching is not transitive, and two showtimes
+    from one provider must not merge through a third listing like both.
+    """
+
+    def __init__(self):
+        self.buckets = defaultdict(list)
+        self.events = {}
+        self.clusters = _UnionFind()
+        # Sources of the events in each cluster, by cluster root
+        self.cluster_sources = {}
+
+    @staticmethod
+    def _time_bucket(start_date):
+        return int(start_date.timestamp() // (DEDUP_TIME_BUCKET_HOURS * 3600))
+
+    @staticmethod
+    def _places(latitude, longitude, venue):
+        places = []
+        if latitude is not None and longitude is not None:
+            places.append(('geo', int(latitude // GEO_CELL_DEGREES), int(longitude // GEO_CELL_DEGREES)))
+        venue_key = normalize_name(venue)
+        if venue_key:
+            places.append(('venue', venue_key))
+        return places
+
+    @staticmethod
+    def _neighbours(place):
+        if place[0] != 'geo':
+            return [place]
+        _, lat, lon = place
+        return [('geo', lat + dlat, lon + dlon) for dlat in (-1, 0, 1) for dlon in (-1, 0, 1)]
+
+    def _bands(self, signature):
+        return [
+            (band, hash(tuple(signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS])))
+            for band in range(MINHASH_BANDS)
+        ]
+
+    def _is_match(self, event, other):
+        if event['source'] == other['source']:
+            # Providers already dedupe their own listings by external_id
+            return False
+        if abs((event['start_date'] - other['start_date']).total_seconds()) > DEDUP_MAX_START_DELTA_HOURS * 3600:
+            return False
+        return jaccard(event['trigrams'], other['trigrams']) >= NAME_SIMILARITY_THRESHOLD
+
+    def _link(self, event_id, other_id):
+        """Merge two clusters unless they already hold events from the same source."""
+        root, other_root = self.clusters.find(event_id), self.clusters.find(other_id)
+        if root == other_root or self.cluster_sources[root] & self.cluster_sources[other_root]:
+            return
+        self.clusters.union(root, other_root)
+        self.cluster_sources[other_root] |= self.cluster_sources.pop(root)
+
+    def add(self, event_id, name, start_date, source, venue=None, latitude=None, longitude=None):
+        """Index an event and link it to any duplicates already indexed.
+
+        Events without a start date or a location cannot be blocked and are
+        left on their own.
+        """
+        places = self._places(latitude, longitude, venue)
+        if start_date is None or not places:
+            return
+        trigrams = name_trigrams(name)
+        event = {'id': event_id, 'start_date': start_date, 'source': source, 'trigrams': trigrams}
+        self.events[event_id] = event
+        self.clusters.find(event_id)
+        self.cluster_sources[event_id] = {source}
+
+        time_bucket = self._time_bucket(start_date)
+        bands = self._bands(minhash(trigrams))
+        seen = set()
+        for place in places:
+            for neighbour in self._neighbours(place):
+                for bucket in (time_bucket - 1, time_bucket, time_bucket + 1):
+                    for band in bands:
+                        for other_id in self.buckets.get((neighbour, bucket, band), ()):
+                            if other_id in seen:
+                                continue
+                            seen.add(other_id)
+                            if self._is_match(event, self.events[other_id]):
+                                self._link(event_id, other_id)
+            for band in bands:
+                self.buckets[(place, time_bucket, band)].append(event_id)
+
+    def groups(self):
+        """Clusters of two or more event ids."""
+        members = defaultdict(list)
+        for event_id in self.events:
+            members[self.clusters.find(event_id)].append(event_id)
+        return [ids for ids in members.values() if len(ids) > 1]
+
+
+def canonical_choice(rows):
+    """Pick the record the others point at: preferred source, then oldest id."""
+    return min(rows, key=lambda row: (SOURCE_PRIORITY.get(row.source, len(SOURCE_PRIORITY)), row.id))
+
+
+def link_duplicate_events(since=None):
+    """Rebuild canonical_event_id links over the catalogue, or over events
+    starting at or after since.
+
+    Canonical events keep canonical_event_id NULL and every duplicate points
+    at its canonical event. Only rows whose link changed are written.
+    Returns {'clusters', 'duplicates', 'updated'}.
+    """
+    query = db.session.query(
+        Event.id, Event.name, Event.start_date, Event.source, Event.venue,
+        Event.latitude, Event.longitude, Event.canonical_event_id
+    ).filter(Event.start_date.isnot(None))
+    if since:
+        query = query.filter(Event.start_date >= since)
+    rows = {row.id: row for row in query.order_by(Event.id)}
+
+    index = DedupIndex()
+    for row in rows.values():
+        index.add(row.id, row.name, row.start_date, row.source,
+                  venue=row.venue, latitude=row.latitude, longitude=row.longitude)
+
+    wanted = {}
+    groups = index.groups()
+    for ids in groups:
+        canonical = canonical_choice([rows[event_id] for event_id in ids])
+        for event_id in ids:
+            wanted[event_id] = None if event_id == canonical.id else canonical.id
+
+    changes = [
+        {'id': row.id, 'canonical_event_id': wanted.get(row.id)}
+        for row in rows.values()
+        if row.canonical_event_id != wanted.get(row.id)
+    ]
+    if changes:
+        db.session.bulk_update_mappings(Event, changes)
+        record_event_changes([change['id'] for change in changes])
+        db.session.commit()
+    duplicates = sum(1 for canonical_id in wanted.values() if canonical_id is not None)
+    logger.info(f"Dedup: {len(groups)} cross-source clusters, {duplicates} duplicates, "
+                f"{len(changes)} links updated")
+    return {'clusters': len(groups), 'duplicates': duplicates, 'updated': len(changes)}
@@ -0,0 +1,160 @@
+"""Declarative filters for event listings.
+
+/api/events, the routes.py blueprint and the recommendation queries all
+parse their parameters into an EventFilters and compile it here, either to
+SQL clauses or to arguments for the in-memory hot set. Each filter compiles
+to the same SQL whatever its values, which are bound parameters, so every
+filter combination has exactly one statement shape: SQLAlchemy's statement
+cache and PostgreSQL's plan cache see one entry per combination, and the
+indexes check_query_plans.py verifies serve every caller.
+"""
+import operator
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+from sqlalchemy import func
+from geo import EARTH_RADIUS_KM, within_box_clause
+
+KM_PER_MILE = 1.609344
+
+# Paid price buckets on price_range_min: name -> [low, high). The ceiling is
+# beyond Numeric(10, 2), so every bucket compiles to the same two
+# comparisons; 'free' is price 0. All bounds are Decimal since bound
+# parameter types are part of the statement's cache key.
+MIN_PAID_PRICE = Decimal('0.01')
+PRICE_CEILING = Decimal('100000000')
+PRICE_BUCKETS = {
+    'paid': (MIN_PAID_PRICE, PRICE_CEILING),
+    'under-50': (MIN_PAID_PRICE, Decimal('50')),
+    '50-100': (Decimal('50'), Decimal('100')),
+    '100-200': (Decimal('100'), Decimal('200')),
+    '200-plus': (Decimal('200'), PRICE_CEILING),
+}
+# The buckets the priceRange facet counts, ascending
+PRICE_FACETS = ('under-50', '50-100', '100-200', '200-plus')
+TIMEFRAME_DAYS = {'today': 1, 'week': 7, 'month': 30}
+
+# Spellings used by the routes.py blueprint and older clients
+PARAM_ALIASES = {'lat': 'latitude', 'lng': 'longitude'}
+VALUE_ALIASES = {
+    'timeframe': {'this-week': 'week', 'this-month': 'month'},
+    'priceRange': {'over-200': '200-plus'},
+}
+# Legacy "no filter" value
+ANY_VALUE = 'all'
+
+FILTER_PARAMS = ('category', 'priceRange', 'timeframe', 'source', 'min_rating', 'latitude', 'longitude', 'radius')
+
+EventFilters = namedtuple(
+    'EventFilters',
+    ['categories', 'price_range', 'timeframe', 'source', 'min_rating', 'latitude', 'longitude', 'radius_km'],
+    defaults=(None,) * 8
+)
+
+
+def canonical_value(name, value):
+    """A parameter value with aliases resolved, or None for 'all' and empty values."""
+    if value in (None, '', ANY_VALUE):
+        return None
+    return VALUE_ALIASES.get(name, {}).get(value, value)
+
+
+def canonical_args(args):
+    """{canonical name: value} of the filter parameters in args, aliases resolved."""
+    values = {}
+    for name, value in args.items():
+        name = PARAM_ALIASES.get(name, name)
+        if name in FILTER_PARAMS:
+            value = canonical_value(name, value)
+            if value is not None:
+                values[name] = value
+    return values
+
+
+def _number(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_filters(args, radius_unit='km', default_radius=None):
+    """EventFilters from request parameters; unknown or malformed values are ignored.
+
+    radius is in radius_unit ('km' or 'mi'); default_radius applies when a
+    location is given without one.
+    """
+    values = canonical_args(args)
+    price_range = values.get('priceRange')
+    timeframe = values.get('timeframe')
+    latitude = _number(values.get('latitude'))
+    longitude = _number(values.get('longitude'))
+    radius = _number(values.get('radius', default_radius))
+    if latitude is None or longitude is None or radius is None:
+        latitude = longitude = radius = None
+    elif radius_unit == 'mi':
+        radius *= KM_PER_MILE
+    return EventFilters(
+        categories=(values['category'],) if 'category' in values else None,
+        price_range=price_range if price_range == 'free' or price_range in PRICE_BUCKETS else None,
+        timeframe=timeframe if timeframe in TIMEFRAME_DAYS else None,
+        source=values.get('source'),
+        min_rating=_number(values.get('min_rating')) or None,
+        latitude=latitude,
+        longitude=longitude,
+        radius_km=radius,
+    )
+
+
+def filter_clauses(filters, model, now):
+    """SQL clauses selecting model's upcoming canonical events that pass filters."""
+    clauses = [model.start_date >= now, model.canonical_event_id.is_(None)]
+    if filters.categories:
+        clauses.append(model.category.in_(filters.categories))
+    if filters.price_range == 'free':
+        clauses.append(model.price_range_min == 0)
+    elif filters.price_range:
+        low, high = PRICE_BUCKETS[filters.price_range]
+        clauses.extend([model.price_range_min >= low, model.price_range_min < high])
+    if filters.timeframe:
+        clauses.append(model.start_date <= now + timedelta(days=TIMEFRAME_DAYS[filters.timeframe]))
+    if filters.source:
+        # Case-folded equality rather than ilike, so the lower(source) index applies
+        clauses.append(func.lower(model.source) == filters.source.lower())
+    if filters.min_rating:
+        clauses.append(model.rating >= filters.min_rating)
+    if filters.radius_km is not None:
+        latitude, longitude = filters.latitude, filters.longitude
+        # Geohash cells and bounding box narrow the candidates through
+        # ix_events_geohash; the great-circle distance refines them
+        clauses.append(within_box_clause(model.geohash, model.latitude, model.longitude,
+                                         latitude, longitude, filters.radius_km))
+        clauses.append(func.acos(func.least(1.0,
+            func.sin(func.radians(latitude)) * func.sin(func.radians(model.latitude)) +
+            func.cos(func.radians(latitude)) * func.cos(func.radians(model.latitude)) *
+            func.cos(func.radians(longitude) - func.radians(model.longitude))
+        )) * EARTH_RADIUS_KM <= filters.radius_km)
+    return clauses
+
+
+def mask_arguments(filters, now):
+    """The same filters as keyword arguments of hot_set.EventArrays.mask."""
+    conditions = []
+    if filters.price_range == 'free':
+        conditions.append(('price_range_min', operator.eq, 0))
+    elif filters.price_range:
+        low, high = PRICE_BUCKETS[filters.price_range]
+        conditions.extend([('price_range_min', operator.ge, low), ('price_range_min', operator.lt, high)])
+    if filters.timeframe:
+        conditions.append(('start_date', operator.le, now + timedelta(days=TIMEFRAME_DAYS[filters.timeframe])))
+    if filters.min_rating:
+        conditions.append(('rating', operator.ge, filters.min_rating))
+    near = None
+    if filters.radius_km is not None:
+        near = (filters.latitude, filters.longitude, filters.radius_km)
+    return {
+        'conditions': conditions,
+        'categories': list(filters.categories) if filters.categories else None,
+        'source': filters.source,
+        'near': near,
+    }
@@ -0,0 +1,177 @@
+"""In-memory full-text search over events, for databases without tsvector.
+
+PostgreSQL serves /api/events/search from the generated search_vector
+column and pg_trgm (see app.search_events_postgresql). SearchIndex mirrors
+that behaviour for SQLite and test environments: the same fields and
+weights, every query term required, and a trigram fallback over the
+vocabulary when a term matches nothing as typed.
+"""
+import math
+import re
+import unicodedata
+from collections import defaultdict
+
+# Field weights follow ts_rank's defaults for the labels the search_vector
+# column assigns: A (name) 1.0, B (venue, casino, tags) 0.4, C (description) 0.2.
+FIELD_WEIGHTS = {
+    'name': 1.0,
+    'venue': 0.4,
+    'casino': 0.4,
+    'tags': 0.4,
+    'description': 0.2,
+}
+# Same cut-off as pg_trgm's similarity_threshold.
+FUZZY_THRESHOLD = 0.3
+# Expansions kept per misspelled term, best first.
+MAX_FUZZY_TERMS = 5
+HIGHLIGHT_WORDS = 20
+HIGHLIGHT_START, HIGHLIGHT_STOP = '<b>', '</b>'
+
+# A short English stop list, roughly what to_tsvector('english') drops
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'it',
+    'of', 'on', 'or', 'the', 'this', 'to', 'with',
+}
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def _fold(text):
+    return unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii').lower()
+
+
+def stem(word):
+    """Strip common English inflections so "shows" and "show" share a term.
+
+    A much smaller rule set than the Snowball stemmer behind the english
+    configuration, but applied identically to documents and queries.
+    """
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 5 and word.endswith('ing'):
+        return word[:-3]
+    if len(word) > 4 and word.endswith('ed'):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    return [stem(word) for word in _WORD.findall(_fold(text)) if word not in STOPWORDS]
+
+
+def term_trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigram_similarity(a, b):
+    a, b = term_trigrams(a), term_trigrams(b)
+    return len(a & b) / len(a | b)
+
+
+def highlight(text, terms, max_words=HIGHLIGHT_WORDS):
+    """Snippet of text around the first matching word, matches wrapped in <b> tags.
+
+    terms are index terms (as produced by tokenize). Returns None when text
+    contains none of them.
+    """
+    words = (text or '').split()
+    matches = [i for i, word in enumerate(words) if set(tokenize(word)) & terms]
+    if not matches:
+        return None
+    start = max(0, min(matches[0] - max_words // 4, len(words) - max_words))
+    snippet = words[start:start + max_words]
+    return ' '.join(
+        f"{HIGHLIGHT_START}{word}{HIGHLIGHT_STOP}" if set(tokenize(word)) & terms else word
+        for word in snippet
+    )
+
+
+class SearchIndex:
+    """Inverted index of weighted term frequencies per event.
+
+    Queries match events containing every query term; when that finds
+    nothing, terms are widened to trigram-similar vocabulary (typos), the
+    way the PostgreSQL path falls back to pg_trgm.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)  # term -> {event_id: weighted term frequency}
+        self.trigrams = defaultdict(set)  # trigram -> terms, for fuzzy expansion
+        self.documents = {}  # event_id -> (name, description) for highlights
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add(self, event_id, name, description=None, venue=None, casino=None, tags=None):
+        fields = {
+            'name': name,
+            'venue': venue,
+            'casino': casino,
+            'tags': ' '.join(tags or ()),
+            'description': description,
+        }
+        for field, text in fields.items():
+            for term in tokenize(text):
+                postings = self.postings[term]
+                if not postings:
+                    for trigram in term_trigrams(term):
+                        self.trigrams[trigram].add(term)
+                postings[event_id] = postings.get(event_id, 0.0) + FIELD_WEIGHTS[field]
+        self.documents[event_id] = (name, description)
+
+    def expand(self, term):
+        """Vocabulary terms similar to term, as (term, similarity), best first."""
+        candidates = set()
+        for trigram in term_trigrams(term):
+            candidates |= self.trigrams.get(trigram, set())
+        scored = [(other, trigram_similarity(term, other)) for other in candidates]
+        scored = [pair for pair in scored if pair[1] >= FUZZY_THRESHOLD]
+        scored.sort(key=lambda pair: (-pair[1], pair[0]))
+        return scored[:MAX_FUZZY_TERMS]
+
+    def _idf(self, term):
+        return math.log(1 + len(self.documents) / len(self.postings[term]))
+
+    def _score(self, alternatives):
+        """Scores of events matching every group of (term, weight) alternatives."""
+        scores = None
+        for group in alternatives:
+            group_scores = defaultdict(float)
+            for term, weight in group:
+                idf = self._idf(term)
+                for event_id, frequency in self.postings[term].items():
+                    group_scores[event_id] = max(group_scores[event_id], weight * idf * frequency)
+            if scores is None:
+                scores = dict(group_scores)
+            else:
+                scores = {event_id: score + group_scores[event_id]
+                          for event_id, score in scores.items() if event_id in group_scores}
+            if not scores:
+                return {}
+        return scores or {}
+
+    def search(self, query):
+        """(ranked, matched_terms) for a query.
+
+        ranked is a list of (event_id, score), best first; matched_terms is
+        the set of index terms the results were matched on, for highlight().
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return [], set()
+        scores = {}
+        if all(term in self.postings for term in terms):
+            alternatives = [[(term, 1.0)] for term in terms]
+            scores = self._score(alternatives)
+        if not scores:
+            alternatives = [
+                [(term, 1.0)] if term in self.postings else self.expand(term)
+                for term in terms
+            ]
+            scores = self._score(alternatives)
+        matched = {term for group in alternatives for term, _ in group}
+        ranked = sorted(scores.items(), key=lambda pair: (-pair[1], pair[0]))
+        return ranked, matched
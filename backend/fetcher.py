@@ -2,22 +2,25 @@ import requests
 import time
 from database import get_db_connection
 from alerts import log_event
+from rate_limiter import get_throttle, bearer_key, RATE_LIMITED_STATUSES
 
 API_KEYS = ["API_KEY_1", "API_KEY_2"]
-API_INDEX = 0
 
 def fetch_data(api_url):
-    global API_INDEX
-    headers = {"Authorization": f"Bearer {API_KEYS[API_INDEX]}"}
+    # Keys rotate and cool down inside the shared throttle instead of a
+    # global index and a fixed one-minute sleep.
+    throttle = get_throttle("fetcher", keys=API_KEYS, apply_key=bearer_key)
 
     for attempt in range(3):
         try:
+            key = throttle.acquire()
+            _, headers = throttle.sign(key)
             response = requests.get(api_url, headers=headers, timeout=5)
+            throttle.observe(key, response)
 
-            if response.status_code == 403:
-                log_event("CRITICAL", "API Blocked", "403 Forbidden")
-                API_INDEX = (API_INDEX + 1) % len(API_KEYS)
-                time.sleep(60)
+            if response.status_code in RATE_LIMITED_STATUSES:
+                log_event("CRITICAL", "API Blocked", f"{response.status_code} rate limited", response.status_code)
+                continue
 
             if response.status_code == 200:
                 log_event("INFO", "API Fetch", f"Successful request to {api_url}")
@@ -30,4 +33,4 @@ def fetch_data(api_url):
             log_event("ERROR", "API Fetch", f"Network error: {e}")
 
     log_event("CRITICAL", "API Fetch", "Max retries reached.")
-    return None
\ No newline at end of file
+    return None
@@ -0,0 +1,107 @@
+import math
+from sqlalchemy import and_, or_
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LATITUDE = 111.32
+
+# Precision stored on events: 7 characters is a ~150 m x 150 m cell.
+GEOHASH_PRECISION = 7
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# covering_prefixes returns at most this many cells (the centre and its neighbours)
+COVER_CELLS = 9
+# Sorts after every geohash character, so [prefix, prefix + '~') is the
+# range of hashes starting with prefix (under the column's C collation).
+_PREFIX_END = '~'
+
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, bounds = (longitude, lon_range) if even else (latitude, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size_degrees(precision):
+    """(height, width) in degrees of a geohash cell at precision."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(min_lat, max_lat, min_lon, max_lon) enclosing a circle."""
+    lat_delta = radius_km / KM_PER_DEGREE_LATITUDE
+    lon_delta = radius_km / (KM_PER_DEGREE_LATITUDE * max(math.cos(math.radians(latitude)), 0.01))
+    return latitude - lat_delta, latitude + lat_delta, longitude - lon_delta, longitude + lon_delta
+
+
+def covering_prefixes(latitude, longitude, radius_km):
+    """Geohash prefixes whose cells together cover a circle.
+
+    Uses the finest precision whose cells are at least as large as the
+    radius, so the cell holding the centre and its eight neighbours always
+    contain the whole circle.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+    lat_delta, lon_delta = max_lat - latitude, max_lon - longitude
+    precision = GEOHASH_PRECISION
+    while precision > 1:
+        height, width = cell_size_degrees(precision)
+        if height >= lat_delta and width >= lon_delta:
+            break
+        precision -= 1
+    height, width = cell_size_degrees(precision)
+    prefixes = set()
+    for dlat in (-height, 0, height):
+        for dlon in (-width, 0, width):
+            cell_lat = min(max(latitude + dlat, -90.0), 90.0)
+            cell_lon = (longitude + dlon + 180.0) % 360.0 - 180.0
+            prefixes.add(geohash_encode(cell_lat, cell_lon, precision))
+    return sorted(prefixes)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def within_box_clause(geohash_column, latitude_column, longitude_column, latitude, longitude, radius_km):
+    """SQL prefilter for a radius search: geohash cell ranges, then the bounding box.
+
+    The geohash ranges are what an index on the geohash column serves;
+    callers refine the candidates to the exact radius. The cell list is
+    padded to COVER_CELLS ranges so the clause has the same shape at every
+    location.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+    prefixes = covering_prefixes(latitude, longitude, radius_km)
+    prefixes += prefixes[-1:] * (COVER_CELLS - len(prefixes))
+    cells = [
+        and_(geohash_column >= prefix, geohash_column < prefix + _PREFIX_END)
+        for prefix in prefixes
+    ]
+    return and_(
+        or_(*cells),
+        latitude_column.between(min_lat, max_lat),
+        longitude_column.between(min_lon, max_lon),
+    )
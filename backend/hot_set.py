@@ -0,0 +1,259 @@
+"""In-process snapshot of upcoming canonical events for listing queries.
+
+The upcoming window is tens of thousands of rows, so each API worker keeps
+the columns listings filter and sort on as parallel NumPy arrays and answers
+filters, keyset sorts and radius checks with vectorized masks. PostgreSQL is
+then only asked for the rows of the page, by primary key.
+
+The snapshot follows the event_changes feed the ingester appends to: a new
+events cache version means new changes, so a worker replays them before
+serving the next listing. Full rebuilds every REBUILD_SECONDS drop events
+that have started and keep the feed prunable.
+"""
+import logging
+import os
+import threading
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Full reload interval; ingest prunes feed entries older than a day, so any
+# worker idle for longer than this rebuilds rather than replays.
+REBUILD_SECONDS = 3600
+EARTH_RADIUS_KM = 6371.0
+_NO_CODE = -1
+
+# Arrays are named after the Event columns they are loaded from. Missing
+# numbers are NaN, which like NULL fails every comparison.
+FLOAT_COLUMNS = ('price_range_min', 'rating', 'latitude', 'longitude')
+
+
+def _microseconds(value):
+    return np.datetime64(value, 'us').astype(np.int64)
+
+
+def _array_value(column, value):
+    """A cursor or filter value in the units of the column's array."""
+    if value is None:
+        return None
+    if column == 'start_date':
+        return _microseconds(value)
+    return float(value)
+
+
+class EventArrays:
+    """Immutable struct-of-arrays of upcoming canonical events.
+
+    category and source are int32 codes into the categories and sources
+    lists (source lowercased, as the filter compares it).
+    """
+
+    def __init__(self, ids, start_date, floats, category, source, categories, sources):
+        self.ids = ids
+        self.start_date = start_date
+        for column in FLOAT_COLUMNS:
+            setattr(self, column, floats[column])
+        self.category = category
+        self.source = source
+        self.categories = categories
+        self.sources = sources
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows, categories=None, sources=None):
+        """Arrays from rows with id, start_date, price_range_min, rating,
+        latitude, longitude, category and source attributes."""
+        categories = list(categories or [])
+        sources = list(sources or [])
+        category_codes = {name: code for code, name in enumerate(categories)}
+        source_codes = {name: code for code, name in enumerate(sources)}
+
+        def code(codes, names, value):
+            if value is None:
+                return _NO_CODE
+            if value not in codes:
+                codes[value] = len(names)
+                names.append(value)
+            return codes[value]
+
+        rows = list(rows)
+        floats = {
+            column: np.array([np.nan if getattr(row, column) is None else float(getattr(row, column))
+                              for row in rows], dtype=np.float64)
+            for column in FLOAT_COLUMNS
+        }
+        return cls(
+            np.array([row.id for row in rows], dtype=np.int64),
+            np.array([row.start_date for row in rows], dtype='datetime64[us]').astype(np.int64),
+            floats,
+            np.array([code(category_codes, categories, row.category) for row in rows], dtype=np.int32),
+            np.array([code(source_codes, sources, row.source and row.source.lower()) for row in rows],
+                     dtype=np.int32),
+            categories,
+            sources,
+        )
+
+    def merged(self, rows, changed_ids):
+        """A new snapshot with changed_ids replaced by rows (ids absent from rows are dropped)."""
+        fresh = EventArrays.from_rows(rows, self.categories, self.sources)
+        keep = ~np.isin(self.ids, np.fromiter(changed_ids, dtype=np.int64))
+        return EventArrays(
+            np.concatenate([self.ids[keep], fresh.ids]),
+            np.concatenate([self.start_date[keep], fresh.start_date]),
+            {column: np.concatenate([getattr(self, column)[keep], getattr(fresh, column)])
+             for column in FLOAT_COLUMNS},
+            np.concatenate([self.category[keep], fresh.category]),
+            np.concatenate([self.source[keep], fresh.source]),
+            fresh.categories,
+            fresh.sources,
+        )
+
+    def _codes(self, names, values):
+        return [names.index(value) for value in values if value in names]
+
+    def mask(self, now, conditions=(), categories=None, source=None, near=None):
+        """Boolean mask of events starting at or after now that pass every filter.
+
+        conditions are (column, operator, value) triples such as
+        ('rating', operator.ge, 4.5); categories is a list of category
+        names; near is (latitude, longitude, radius_km).
+        """
+        mask = self.start_date >= _microseconds(now)
+        for column, compare, value in conditions:
+            mask &= compare(getattr(self, column), _array_value(column, value))
+        if categories is not None:
+            mask &= np.isin(self.category, self._codes(self.categories, categories))
+        if source is not None:
+            mask &= np.isin(self.source, self._codes(self.sources, [source.lower()]))
+        if near is not None:
+            latitude, longitude, radius_km = near
+            with np.errstate(invalid='ignore'):
+                mask &= self.distances_km(latitude, longitude) <= radius_km
+        return mask
+
+    def distances_km(self, latitude, longitude):
+        """Haversine distance from a point to every event (NaN without coordinates)."""
+        lat1, lon1 = np.radians(latitude), np.radians(longitude)
+        lat2, lon2 = np.radians(self.latitude), np.radians(self.longitude)
+        a = (np.sin((lat2 - lat1) / 2) ** 2 +
+             np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def page(self, mask, key, after=None, limit=100):
+        """(ids, has_more) for one keyset page of the masked events.
+
+        key is a keyset.SortKey; after is the (value, id) cursor position as
+        decoded by keyset.decode_cursor. Orders exactly like
+        keyset.order_query: NULLs last, id breaking ties in the same direction.
+        """
+        values = getattr(self, key.column)
+        nulls = np.isnan(values) if values.dtype.kind == 'f' else np.zeros(len(values), dtype=bool)
+        if after is not None:
+            value, row_id = after
+            after_id = self.ids < row_id if key.descending else self.ids > row_id
+            if value is None:
+                mask = mask & nulls & after_id
+            else:
+                value = _array_value(key.column, value)
+                with np.errstate(invalid='ignore'):
+                    beyond = values < value if key.descending else values > value
+                    mask = mask & (beyond | ((values == value) & after_id) | nulls)
+
+        selected = np.flatnonzero(mask)
+        sign = -1 if key.descending else 1
+        keys = sign * values[selected]
+        if values.dtype.kind == 'f':
+            keys[nulls[selected]] = np.inf
+        if len(selected) > limit + 1:
+            # Only rows up to the (limit + 1)th key, ties included, can make the page
+            keep = keys <= np.partition(keys, limit)[limit]
+            selected, keys = selected[keep], keys[keep]
+        order = np.lexsort((sign * self.ids[selected], keys))
+        page = selected[order[:limit + 1]]
+        return self.ids[page[:limit]].tolist(), len(page) > limit
+
+    def nearest(self, mask, latitude, longitude, limit, max_radius_km):
+        """(id, distance_km) of up to limit masked events within max_radius_km, closest first."""
+        distances = self.distances_km(latitude, longitude)
+        with np.errstate(invalid='ignore'):
+            selected = np.flatnonzero(mask & (distances <= max_radius_km))
+        order = np.lexsort((self.ids[selected], distances[selected]))[:limit]
+        return [(int(self.ids[i]), float(distances[i])) for i in selected[order]]
+
+
+class UpcomingHotSet:
+    """Per-worker EventArrays kept current from the event_changes feed.
+
+    load_events(ids=None) returns snapshot rows of upcoming canonical
+    events, restricted to ids when given; load_changes(after) returns
+    (changed_ids, last_seq) for feed entries after seq after, or only the
+    feed's last seq when after is None. rollback, when given, is called
+    after a failed refresh so the caller's SQL fallback does not run in an
+    aborted transaction.
+    """
+
+    def __init__(self, load_events, load_changes, rebuild_seconds=REBUILD_SECONDS, rollback=None):
+        self.load_events = load_events
+        self.load_changes = load_changes
+        self.rollback = rollback
+        self.rebuild_seconds = rebuild_seconds
+        self._lock = threading.Lock()
+        self.snapshot = None
+        self.version = None
+        self.last_seq = None
+        self.built_at = 0.0
+
+    @classmethod
+    def from_env(cls, load_events, load_changes, rollback=None):
+        """Hot set for this worker, or None when HOT_SET=0."""
+        if os.environ.get('HOT_SET', '1') == '0':
+            return None
+        rebuild_seconds = float(os.environ.get('HOT_SET_REBUILD_SECONDS', REBUILD_SECONDS))
+        return cls(load_events, load_changes, rebuild_seconds, rollback)
+
+    def _fresh(self, version):
+        return (self.snapshot is not None and self.version == version and
+                time.monotonic() - self.built_at < self.rebuild_seconds)
+
+    def current(self, version):
+        """The snapshot as of events cache version, or None if it cannot be loaded.
+
+        Callers fall back to SQL on None.
+        """
+        if self._fresh(version):
+            return self.snapshot
+        with self._lock:
+            if self._fresh(version):
+                return self.snapshot
+            try:
+                if self.snapshot is None or time.monotonic() - self.built_at >= self.rebuild_seconds:
+                    self._rebuild()
+                else:
+                    self._replay()
+                self.version = version
+            except Exception as e:
+                logger.warning(f"Upcoming events hot set refresh failed: {e}")
+                self.snapshot = None
+                if self.rollback:
+                    self.rollback()
+            return self.snapshot
+
+    def _rebuild(self):
+        # Read the feed position first: changes committed during the load
+        # are replayed on the next refresh, which is harmless.
+        _, last_seq = self.load_changes(None)
+        started = time.monotonic()
+        self.snapshot = EventArrays.from_rows(self.load_events())
+        self.last_seq = last_seq
+        self.built_at = started
+        logger.info(f"Loaded {len(self.snapshot)} upcoming events into the hot set "
+                    f"in {time.monotonic() - started:.2f}s")
+
+    def _replay(self):
+        changed_ids, last_seq = self.load_changes(self.last_seq)
+        if changed_ids:
+            self.snapshot = self.snapshot.merged(self.load_events(changed_ids), changed_ids)
+        self.last_seq = last_seq
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), '.http_cache')
+# Long enough for a run restarted after a crash to reuse the pages it
+# already fetched; a scheduled re-ingest finds them stale and revalidates,
+# so it never serves listings from the previous run unchecked
+DEFAULT_TTL_SECONDS = 10 * 60
+DEFAULT_MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+# Credentials are left out of cache keys so rotating a key does not
+# invalidate everything that was already downloaded.
+SECRET_PARAMS = {'apikey', 'key'}
+
+
+class ReplayMiss(requests.RequestException):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+class ResponseCache:
+    """Size-bounded on-disk cache of successful GET responses.
+
+    Entries are JSON files named by a hash of the URL and non-secret params.
+    Least recently used entries are evicted once the directory grows beyond
+    max_bytes.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sizes = OrderedDict()
+        self._total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                stat = os.stat(os.path.join(directory, name))
+                entries.append((stat.st_mtime, name[:-5], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._sizes[key] = size
+            self._total_bytes += size
+
+    @staticmethod
+    def key_for(url, params=None):
+        params = {k: v for k, v in (params or {}).items() if k not in SECRET_PARAMS}
+        raw = json.dumps([url, sorted((str(k), str(v)) for k, v in params.items())])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            if key in self._sizes:
+                self._sizes.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key, entry):
+        data = json.dumps(entry).encode('utf-8')
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._total_bytes += len(data) - self._sizes.pop(key, 0)
+            self._sizes[key] = len(data)
+            while self._total_bytes > self.max_bytes and len(self._sizes) > 1:
+                evicted, size = self._sizes.popitem(last=False)
+                self._total_bytes -= size
+                try:
+                    os.remove(self._path(evicted))
+                except OSError:
+                    pass
+
+
+class CachedHttpClient:
+    """Keep-alive HTTP client with a conditional, TTL-bounded response cache.
+
+    Fresh cache entries are served without touching the network. Stale ones
+    are revalidated with If-None-Match / If-Modified-Since when the provider
+    sent an ETag or Last-Modified header. In replay mode only recorded
+    responses are served, which lets tests run with no network at all.
+    """
+
+    def __init__(self, cache=None, ttl_seconds=DEFAULT_TTL_SECONDS, replay=False, pool_maxsize=10):
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+        self.replay = replay
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @classmethod
+    def from_env(cls):
+        """Build a client configured by the INGEST_HTTP_* environment variables."""
+        cache_dir = os.environ.get('INGEST_HTTP_CACHE_DIR', DEFAULT_CACHE_DIR)
+        cache = None
+        if os.environ.get('INGEST_HTTP_CACHE', '1') != '0':
+            cache = ResponseCache(
+                cache_dir,
+                max_bytes=int(os.environ.get('INGEST_HTTP_CACHE_MAX_BYTES', DEFAULT_MAX_CACHE_BYTES))
+            )
+        return cls(
+            cache=cache,
+            ttl_seconds=int(os.environ.get('INGEST_HTTP_CACHE_TTL', DEFAULT_TTL_SECONDS)),
+            replay=os.environ.get('INGEST_HTTP_REPLAY') == '1'
+        )
+
+    @staticmethod
+    def _response_from_entry(entry, url):
+        response = requests.Response()
+        response.status_code = entry['status_code']
+        response._content = entry['body'].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.headers = CaseInsensitiveDict(entry.get('headers', {}))
+        response.url = url
+        return response
+
+    def _send(self, url, params, headers, timeout, throttle):
+        if throttle is None:
+            return self.session.get(url, params=params, headers=headers, timeout=timeout)
+        key = throttle.acquire()
+        params, headers = throttle.sign(key, params, headers)
+        response = self.session.get(url, params=params, headers=headers, timeout=timeout)
+        throttle.observe(key, response)
+        return response
+
+    def get(self, url, params=None, headers=None, timeout=10, throttle=None):
+        """GET through the cache. Only requests that reach the network go
+        through throttle (a rate_limiter.ProviderThrottle), which also
+        supplies the API key."""
+        if not self.cache:
+            if self.replay:
+                raise ReplayMiss(f"No response cache configured for replay of {url}")
+            return self._send(url, params, headers, timeout, throttle)
+
+        key = self.cache.key_for(url, params)
+        entry = self.cache.get(key)
+        if self.replay:
+            if entry is None:
+                raise ReplayMiss(f"No recorded response for {url}")
+            return self._response_from_entry(entry, url)
+        if entry and time.time() - entry['stored_at'] < self.ttl_seconds:
+            logger.debug(f"HTTP cache hit for {url}")
+            return self._response_from_entry(entry, url)
+
+        request_headers = dict(headers or {})
+        if entry:
+            if entry['headers'].get('ETag'):
+                request_headers['If-None-Match'] = entry['headers']['ETag']
+            if entry['headers'].get('Last-Modified'):
+                request_headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+        response = self._send(url, params, request_headers, timeout, throttle)
+
+        if response.status_code == 304 and entry:
+            logger.debug(f"HTTP cache revalidated for {url}")
+            entry['stored_at'] = time.time()
+            self.cache.put(key, entry)
+            return self._response_from_entry(entry, url)
+        if response.status_code == 200:
+            validators = {
+                name: response.headers[name]
+                for name in ('ETag', 'Last-Modified', 'Content-Type')
+                if name in response.headers
+            }
+            self.cache.put(key, {
+                'status_code': response.status_code,
+                'headers': validators,
+                'body': response.text,
+                'stored_at': time.time(),
+            })
+        return response
@@ -1,11 +1,27 @@
 import os
 import json
+import argparse
+import itertools
 import logging
-import time
 from datetime import datetime, timedelta
 import requests
-from tenacity import retry, stop_after_attempt, wait_exponential, RetryError
-from app import app, db, Event
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, RetryError
+from app import app, db, record_event_changes, prune_event_changes
+from bulk_upsert import bulk_upsert_events
+from concurrent_ingest import ConcurrentIngestion
+from http_client import CachedHttpClient, ReplayMiss
+from checkpoints import CheckpointStore
+from event_dedup import link_duplicate_events
+from raw_archive import RawArchive
+from recommendation_job import refresh_recommendations
+from embedding_job import update_event_embeddings
+from rate_limiter import (
+    get_throttle, keys_from_env, query_param_key, bearer_key, throttled_wait, throttle_metrics
+)
+from ingest_pipeline import (
+    numbered_pages, planned_pages, token_pages, archived_pages, prefetch, archive_raw, normalize,
+    track_latest_start, write_batches
+)
 from dotenv import load_dotenv
 
 # Configure logger
@@ -16,9 +32,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# File to store checkpoint data
+# File to store checkpoint data (see checkpoints.CheckpointStore)
 CHECKPOINT_FILE = os.path.join(os.path.dirname(__file__), 'checkpoint.json')
 
+# Ticketmaster's discovery API refuses to page past size * page >= 1000, so
+# a date window is split until each shard holds at most this many events.
+TICKETMASTER_PAGE_SIZE = 100
+TICKETMASTER_DEEP_PAGING_LIMIT = 1000
+# Windows are not split below this span, even if they are still too big.
+TICKETMASTER_MIN_SHARD_SPAN = timedelta(hours=1)
+# event_changes entries older than this are deleted after each run; API
+# workers rebuild their hot set well before (see hot_set.REBUILD_SECONDS).
+EVENT_CHANGES_RETENTION = timedelta(days=1)
+# Google Places next_page_tokens expire within minutes, so an interrupted
+# run restarts these providers from their first page instead of resuming.
+RESTART_PROVIDERS = {'google_places'}
+
 # Category normalization mapping (if needed)
 CATEGORY_MAPPING = {
     "Music": "Concert",
@@ -27,42 +56,58 @@ CATEGORY_MAPPING = {
 }
 
 class EventIngestionService:
-    def __init__(self):
+    def __init__(self, http_client=None, archive=None):
         load_dotenv()  # Ensure environment variables are loaded
-        self.ticketmaster_api_key = os.environ.get("TICKETMASTER_API_KEY")
-        if not self.ticketmaster_api_key:
+        # Each provider takes a single *_API_KEY or a comma separated
+        # *_API_KEYS pool that its throttle rotates through.
+        ticketmaster_api_keys = keys_from_env("TICKETMASTER")
+        if not ticketmaster_api_keys:
             raise ValueError("TICKETMASTER_API_KEY is required in .env file")
-        self.eventbrite_api_key = os.environ.get("EVENTBRITE_API_KEY")
-        if not self.eventbrite_api_key:
+        eventbrite_api_keys = keys_from_env("EVENTBRITE")
+        if not eventbrite_api_keys:
             raise ValueError("EVENTBRITE_API_KEY is required in .env file")
         # Google Places API key is optional; if not provided, we skip that integration.
-        self.google_places_api_key = os.environ.get("GOOGLE_PLACES_API_KEY")
+        google_places_api_keys = keys_from_env("GOOGLE_PLACES")
+        self.ticketmaster_api_key = ticketmaster_api_keys[0]
+        self.eventbrite_api_key = eventbrite_api_keys[0]
+        self.google_places_api_key = google_places_api_keys[0] if google_places_api_keys else None
+        # Shared per-provider rate limits, key rotation and 429/403 backoff
+        self.throttles = {
+            'ticketmaster': get_throttle('ticketmaster', ticketmaster_api_keys, query_param_key('apikey')),
+            'eventbrite': get_throttle('eventbrite', eventbrite_api_keys, bearer_key),
+            'google_places': get_throttle('google_places', google_places_api_keys, query_param_key('key')),
+        }
         
         self.ticketmaster_base_url = "https://app.ticketmaster.com/discovery/v2/events.json"
         # Remove trailing slash to avoid 404 issues
         self.eventbrite_base_url = "https://www.eventbriteapi.com/v3/events/search"
         self.checkpoint_file = CHECKPOINT_FILE
+        # Pooled keep-alive session with an on-disk response cache
+        self.http = http_client or CachedHttpClient.from_env()
+        # Raw payloads go to compressed batches on disk; rows keep a raw_ref
+        self.archive = archive or RawArchive.from_env()
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    def fetch_ticketmaster_events(self, page: int, start_date: datetime, end_date: datetime):
+    @retry(stop=stop_after_attempt(3), wait=throttled_wait,
+           retry=retry_if_not_exception_type(ReplayMiss))
+    def fetch_ticketmaster_events(self, page: int, start_date: datetime, end_date: datetime, size: int = TICKETMASTER_PAGE_SIZE):
         params = {
-            'apikey': self.ticketmaster_api_key,
             'city': 'Las Vegas',
             'stateCode': 'NV',
-            'size': 100,
+            'size': size,
             'page': page,
             'sort': 'date,asc',
             'startDateTime': start_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
             'endDateTime': end_date.strftime('%Y-%m-%dT%H:%M:%SZ')
         }
         logger.info(f"Ticketmaster: Requesting {self.ticketmaster_base_url} with params: {params}")
-        response = requests.get(self.ticketmaster_base_url, params=params, timeout=10)
+        response = self.http.get(self.ticketmaster_base_url, params=params, timeout=10,
+                                 throttle=self.throttles['ticketmaster'])
         response.raise_for_status()
         return response.json()
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    @retry(stop=stop_after_attempt(3), wait=throttled_wait,
+           retry=retry_if_not_exception_type(ReplayMiss))
     def fetch_eventbrite_events(self, page: int, start_date: datetime, end_date: datetime):
-        headers = {"Authorization": f"Bearer {self.eventbrite_api_key}"}
         params = {
             "location.address": "Las Vegas",
             "sort_by": "date",
@@ -71,7 +116,8 @@ class EventIngestionService:
             "start_date.range_end": end_date.strftime('%Y-%m-%dT%H:%M:%SZ')
         }
         logger.info(f"Eventbrite: Requesting {self.eventbrite_base_url} with params: {params}")
-        response = requests.get(self.eventbrite_base_url, headers=headers, params=params, timeout=10)
+        response = self.http.get(self.eventbrite_base_url, params=params, timeout=10,
+                                 throttle=self.throttles['eventbrite'])
         try:
             response.raise_for_status()
         except requests.HTTPError as he:
@@ -81,20 +127,21 @@ class EventIngestionService:
         logger.info(f"Eventbrite: Received response: {json.dumps(data)[:500]}...")
         return data
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    @retry(stop=stop_after_attempt(3), wait=throttled_wait,
+           retry=retry_if_not_exception_type(ReplayMiss))
     def fetch_google_places_events(self, next_page_token=None):
         if not self.google_places_api_key:
             logger.info("No Google Places API key provided; skipping Google Places ingestion.")
             return None
         base_url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
         params = {
-            "query": "events in Las Vegas",
-            "key": self.google_places_api_key
+            "query": "events in Las Vegas"
         }
         if next_page_token:
             params["pagetoken"] = next_page_token
         logger.info(f"Google Places: Requesting {base_url} with params: {params}")
-        response = requests.get(base_url, params=params, timeout=10)
+        response = self.http.get(base_url, params=params, timeout=10,
+                                 throttle=self.throttles['google_places'])
         response.raise_for_status()
         data = response.json()
         logger.info(f"Google Places: Received response: {json.dumps(data)[:500]}...")
@@ -332,149 +379,296 @@ class EventIngestionService:
             logger.error(f"Error processing Google Places event {place_data.get('place_id')}: {e}")
             return None
 
-    def ingest_data(self):
+    def write_page(self, page_events, totals):
+        changed_ids = []
+        counts = bulk_upsert_events(page_events, changed_ids)
+        # Same transaction as the rows, so cached listings expire and hot
+        # sets catch up exactly when they land
+        record_event_changes(changed_ids)
+        db.session.commit()
+        for key, value in counts.items():
+            totals[key] += value
+        return counts
+
+    def count_ticketmaster_events(self, start_date: datetime, end_date: datetime):
+        tm_response = self.fetch_ticketmaster_events(page=0, start_date=start_date, end_date=end_date, size=1)
+        return (tm_response or {}).get('page', {}).get('totalElements', 0)
+
+    def ticketmaster_shards(self, start_date: datetime, end_date: datetime):
+        """Split a date window into shards Ticketmaster can page through completely.
+
+        Each window is probed with a one-event request for its total and
+        halved until it fits under TICKETMASTER_DEEP_PAGING_LIMIT. Returns
+        (start, end, total_events) tuples in chronological order.
+        """
+        pending = [(start_date, end_date)]
+        shards = []
+        while pending:
+            shard_start, shard_end = pending.pop()
+            total = self.count_ticketmaster_events(shard_start, shard_end)
+            if total > TICKETMASTER_DEEP_PAGING_LIMIT:
+                if shard_end - shard_start > TICKETMASTER_MIN_SHARD_SPAN:
+                    middle = (shard_start + (shard_end - shard_start) / 2).replace(microsecond=0)
+                    # Both bounds are inclusive, so the halves must not share a second
+                    pending.append((middle + timedelta(seconds=1), shard_end))
+                    pending.append((shard_start, middle))
+                    continue
+                logger.warning(f"Ticketmaster: {total} events between {shard_start} and {shard_end} "
+                               f"exceed the deep-paging limit; only the first {TICKETMASTER_DEEP_PAGING_LIMIT} are reachable.")
+            shards.append((shard_start, shard_end, total))
+        logger.info(f"Ticketmaster: Split {start_date} - {end_date} into {len(shards)} shards")
+        return shards
+
+    def ticketmaster_pages(self, start_date: datetime, end_date: datetime, checkpoints=None,
+                           max_workers=1, prefetch_pages=1):
+        """Page source over every shard of the window, fetched through one bounded pool.
+
+        Runs lazily, so the shard probes happen on the source's own thread.
+        A resumed run reuses the shards planned by the interrupted one: totals
+        probed again may split the window differently, and shards of the old
+        plan would never be finished.
+        """
+        shards = None
+        if checkpoints:
+            checkpoints.begin_window('ticketmaster', (start_date, end_date))
+            shards = checkpoints.shard_plan('ticketmaster', (start_date, end_date))
+            if shards is not None:
+                logger.info(f"Ticketmaster: Resuming the {len(shards)} shards planned for this window")
+        if shards is None:
+            try:
+                shards = self.ticketmaster_shards(start_date, end_date)
+            except RetryError:
+                logger.warning("Ticketmaster: Could not size the date window; it will be retried on the next run.")
+                return
+            if checkpoints:
+                checkpoints.save_shard_plan('ticketmaster', (start_date, end_date), shards)
+
+        tasks = []
+        max_pages = TICKETMASTER_DEEP_PAGING_LIMIT // TICKETMASTER_PAGE_SIZE
+        for shard_start, shard_end, total in shards:
+            window = (shard_start, shard_end)
+            first_page = 0
+            if checkpoints:
+                completed, next_page, _ = checkpoints.resume_point('ticketmaster', window)
+                if completed:
+                    continue
+                if next_page is not None:
+                    logger.info(f"Ticketmaster: Resuming shard {shard_start} - {shard_end} at page {next_page}")
+                    first_page = next_page
+                checkpoints.begin_window('ticketmaster', window)
+            page_count = min(-(-total // TICKETMASTER_PAGE_SIZE), max_pages)
+            if first_page >= page_count:
+                tasks.append((window, None, True))
+                continue
+            tasks.extend((window, page, page == page_count - 1) for page in range(first_page, page_count))
+        if checkpoints:
+            # From here on each shard tracks its own progress
+            checkpoints.complete_window('ticketmaster', (start_date, end_date))
+
+        def fetch_page(window, page):
+            tm_response = self.fetch_ticketmaster_events(page=page, start_date=window[0], end_date=window[1])
+            if not tm_response or '_embedded' not in tm_response:
+                return []
+            return tm_response['_embedded'].get('events', [])
+
+        yield from planned_pages('ticketmaster', tasks, fetch_page, max_workers=max_workers,
+                                 prefetch_pages=prefetch_pages)
+
+    def eventbrite_pages(self, start_date: datetime, end_date: datetime, first_page=1, **pool_options):
+        def fetch_page(page):
+            eb_response = self.fetch_eventbrite_events(page=page, start_date=start_date, end_date=end_date) or {}
+            page_count = eb_response.get('pagination', {}).get('page_count')
+            return eb_response.get('events', []), page_count or None
+        return numbered_pages('eventbrite', fetch_page, first_page=first_page,
+                              window=(start_date, end_date), **pool_options)
+
+    def google_places_pages(self, start_token=None, first_page=0, **pool_options):
+        def fetch_page(next_page_token):
+            gp_response = self.fetch_google_places_events(next_page_token)
+            if not gp_response:
+                return [], None
+            return gp_response.get('results', []), gp_response.get('next_page_token')
+        return token_pages('google_places', fetch_page, start_token=start_token,
+                           first_page=first_page)
+
+    def page_sources(self, start_date: datetime, end_date: datetime, pool_options=None, checkpoints=None):
+        """One page source generator per configured provider.
+
+        pool_options maps provider name to keyword arguments for its source
+        (max_workers, prefetch_pages); the default fetches one page at a
+        time. Request rates are enforced by the shared provider throttles.
+        With a CheckpointStore, providers that already finished this window
+        are skipped and the rest resume after their last committed page.
+        """
+        pool_options = pool_options or {}
+        window = (start_date, end_date)
+        # Ticketmaster shards its window and checkpoints each shard itself
+        sources = [
+            self.ticketmaster_pages(start_date, end_date, checkpoints=checkpoints,
+                                    **pool_options.get('ticketmaster', {}))
+        ]
+        providers = [
+            ('eventbrite', window, lambda **options: self.eventbrite_pages(start_date, end_date, **options)),
+        ]
+        if self.google_places_api_key:
+            providers.append(('google_places', None, self.google_places_pages))
+        else:
+            logger.info("No Google Places API key provided; skipping Google Places ingestion.")
+
+        for provider, provider_window, make_source in providers:
+            options = dict(pool_options.get(provider, {}))
+            if checkpoints:
+                completed, next_page, cursor = checkpoints.resume_point(provider, provider_window)
+                if completed:
+                    logger.info(f"{provider}: Already completed for this window; skipping.")
+                    continue
+                if next_page is not None and provider in RESTART_PROVIDERS:
+                    logger.info(f"{provider}: Page cursors do not outlive a run; restarting from the first page")
+                elif next_page is not None:
+                    logger.info(f"{provider}: Resuming from checkpoint at page {next_page}")
+                    options['first_page'] = next_page
+                    if cursor:
+                        options['start_token'] = cursor
+                checkpoints.begin_window(provider, provider_window)
+            sources.append(make_source(**options))
+        return sources
+
+    def run_pipeline(self, pages, start_date: datetime, totals, checkpoints=None):
+        """Normalize and write pages; returns (total_processed, max_event_date).
+
+        With a CheckpointStore, progress is recorded after every committed
+        batch. Pages that are not archived yet are written to the raw archive
+        first.
+        """
+        processors = {
+            'ticketmaster': self.process_ticketmaster_event,
+            'eventbrite': self.process_eventbrite_event,
+            'google_places': self.process_google_places_event,
+        }
+        summary = {'max_event_date': start_date}
+        on_commit = None
+        if checkpoints:
+            resumed_max = checkpoints.max_event_date()
+            if resumed_max and resumed_max > start_date:
+                summary['max_event_date'] = resumed_max
+
+            def on_commit(committed_pages):
+                checkpoints.record_pages(committed_pages, summary['max_event_date'])
+        try:
+            raw_pages = archive_raw(pages, self.archive) if self.archive else pages
+            processed = track_latest_start(normalize(raw_pages, processors), summary)
+            total_processed = write_batches(processed, lambda events: self.write_page(events, totals),
+                                            on_commit=on_commit)
+        finally:
+            close = getattr(pages, 'close', None)
+            if close:
+                close()
+        return total_processed, summary['max_event_date']
+
+    def ingest_data(self, concurrent=False):
         with app.app_context():
             try:
                 logger.info("Starting event ingestion process")
                 now = datetime.utcnow()
-                try:
-                    with open(self.checkpoint_file, 'r') as f:
-                        checkpoint = json.load(f)
-                    start_date = datetime.strptime(
-                        checkpoint.get('new_start_date', now.strftime('%Y-%m-%dT%H:%M:%SZ')),
-                        '%Y-%m-%dT%H:%M:%SZ'
-                    )
+                checkpoints = CheckpointStore(self.checkpoint_file)
+                start_date = checkpoints.start_date()
+                if start_date:
                     logger.info(f"Loaded checkpoint: {start_date}")
-                except Exception as e:
+                else:
                     start_date = now
                     logger.info("No valid checkpoint found; using current time as start_date.")
                 end_of_year = datetime(now.year, 12, 31, 23, 59, 59)
                 logger.info(f"Starting ingestion from {start_date} until {end_of_year}")
-                overall_max_event_date = start_date
-                total_processed = 0
-
-                # --- Ticketmaster Ingestion ---
-                page = 0
-                while True:
-                    logger.info(f"Ticketmaster: Fetching page {page} with startDateTime={start_date} and endDateTime={end_of_year}")
-                    try:
-                        tm_response = self.fetch_ticketmaster_events(page=page, start_date=start_date, end_date=end_of_year)
-                    except RetryError as re:
-                        logger.info(f"Ticketmaster: No more events available (error on page {page}). Breaking loop.")
-                        break
-                    if not tm_response or '_embedded' not in tm_response:
-                        logger.info(f"Ticketmaster: No more data returned on page {page}.")
-                        break
-                    tm_events = tm_response['_embedded'].get('events', [])
-                    if not tm_events:
-                        logger.info(f"Ticketmaster: No events on page {page}.")
-                        break
-                    logger.info(f"Ticketmaster: Fetched {len(tm_events)} events on page {page}")
-                    for event_data in tm_events:
-                        processed_event = self.process_ticketmaster_event(event_data)
-                        if not processed_event:
-                            continue
-                        event_start = processed_event.get('start_date')
-                        if event_start:
-                            event_start_naive = event_start.replace(tzinfo=None)
-                            if event_start_naive > overall_max_event_date:
-                                overall_max_event_date = event_start_naive
-                        event = Event.query.filter_by(external_id=processed_event['external_id']).first()
-                        if event:
-                            for key, value in processed_event.items():
-                                setattr(event, key, value)
-                        else:
-                            event = Event(**processed_event)
-                            db.session.add(event)
-                        total_processed += 1
-                    db.session.commit()
-                    logger.info(f"Ticketmaster: Processed {len(tm_events)} events on page {page}")
-                    page += 1
-
-                # --- Eventbrite Ingestion ---
-                page = 1
-                while True:
-                    logger.info(f"Eventbrite: Fetching page {page} with start_date.range_start={start_date} and start_date.range_end={end_of_year}")
-                    try:
-                        eb_response = self.fetch_eventbrite_events(page=page, start_date=start_date, end_date=end_of_year)
-                    except RetryError as re:
-                        logger.info(f"Eventbrite: No more events available (error on page {page}). Breaking loop.")
-                        break
-                    eb_events = eb_response.get("events", [])
-                    if not eb_events:
-                        logger.info(f"Eventbrite: No events on page {page}.")
-                        break
-                    logger.info(f"Eventbrite: Fetched {len(eb_events)} events on page {page}")
-                    for event_data in eb_events:
-                        processed_event = self.process_eventbrite_event(event_data)
-                        if not processed_event:
-                            continue
-                        event_start = processed_event.get("start_date")
-                        if event_start:
-                            event_start_naive = event_start.replace(tzinfo=None)
-                            if event_start_naive > overall_max_event_date:
-                                overall_max_event_date = event_start_naive
-                        event = Event.query.filter_by(external_id=processed_event["external_id"]).first()
-                        if event:
-                            for key, value in processed_event.items():
-                                setattr(event, key, value)
-                        else:
-                            event = Event(**processed_event)
-                            db.session.add(event)
-                        total_processed += 1
-                    db.session.commit()
-                    logger.info(f"Eventbrite: Processed {len(eb_events)} events on page {page}")
-                    page += 1
-
-                # --- Google Places Ingestion (Optional) ---
-                if self.google_places_api_key:
-                    next_page_token = None
-                    while True:
-                        try:
-                            gp_response = self.fetch_google_places_events(next_page_token)
-                        except RetryError as re:
-                            logger.info("Google Places: No more events available (error retrieving page). Breaking loop.")
-                            break
-                        if not gp_response:
-                            break
-                        gp_events = gp_response.get("results", [])
-                        if not gp_events:
-                            logger.info("Google Places: No events found.")
-                            break
-                        logger.info(f"Google Places: Fetched {len(gp_events)} events")
-                        for event_data in gp_events:
-                            processed_event = self.process_google_places_event(event_data)
-                            if not processed_event:
-                                continue
-                            event = Event.query.filter_by(external_id=processed_event["external_id"]).first()
-                            if event:
-                                for key, value in processed_event.items():
-                                    setattr(event, key, value)
-                            else:
-                                event = Event(**processed_event)
-                                db.session.add(event)
-                            total_processed += 1
-                        db.session.commit()
-                        next_page_token = gp_response.get("next_page_token")
-                        if not next_page_token:
-                            break
-                        logger.info("Google Places: Waiting for next_page_token to become valid...")
-                        time.sleep(2)
-                
+                totals = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+                if concurrent:
+                    total_processed, overall_max_event_date = ConcurrentIngestion(self).run(
+                        start_date, end_of_year, totals, checkpoints
+                    )
+                else:
+                    # Providers are read one after another, but fetching still
+                    # runs ahead of the writer in a background thread.
+                    sources = self.page_sources(start_date, end_of_year, checkpoints=checkpoints)
+                    pages = prefetch(itertools.chain(*sources))
+                    total_processed, overall_max_event_date = self.run_pipeline(
+                        pages, start_date, totals, checkpoints
+                    )
+
                 logger.info(f"✅ Successfully processed a total of {total_processed} events")
+                logger.info(
+                    f"Inserted {totals['inserted']}, modified {totals['updated']}, "
+                    f"skipped {totals['unchanged']} unchanged events"
+                )
                 logger.info(f"Latest event start date found: {overall_max_event_date}")
-                new_checkpoint = {'new_start_date': overall_max_event_date.strftime('%Y-%m-%dT%H:%M:%SZ')}
-                with open(self.checkpoint_file, 'w') as f:
-                    json.dump(new_checkpoint, f)
-                logger.info(f"Checkpoint saved: {new_checkpoint}")
+                logger.info(f"Provider throttling: {throttle_metrics()}")
+                # Link copies of the same upcoming event from different providers
+                link_duplicate_events(since=now)
+                prune_event_changes(now - EVENT_CHANGES_RETENTION)
+                db.session.commit()
+                pending = checkpoints.pending_windows()
+                if pending:
+                    # Keep the window open so the next run resumes these providers
+                    logger.warning(f"Providers stopped before finishing: {pending}; checkpoint kept for resume.")
+                else:
+                    checkpoints.finish_run(overall_max_event_date)
             except Exception as e:
                 db.session.rollback()
                 logger.error(f"Error during ingestion: {e}")
                 raise e
+            try:
+                # New and changed events change everyone's lists
+                refresh_recommendations()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Precomputing recommendations failed; the API computes them online: {e}")
+            try:
+                # New and changed events join the content embedding index
+                update_event_embeddings()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Updating event embeddings failed; the previous index is served: {e}")
+
+    def replay_archive(self, providers=None, since=None):
+        """Re-run process_* and the upsert over archived payloads, without network access."""
+        if not self.archive:
+            raise ValueError("The raw archive is disabled (INGEST_RAW_ARCHIVE=0); nothing to replay.")
+        with app.app_context():
+            try:
+                totals = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+                pages = archived_pages(self.archive, providers, since)
+                total_processed, _ = self.run_pipeline(pages, datetime.min, totals)
+                logger.info(
+                    f"Replayed {total_processed} archived events: inserted {totals['inserted']}, "
+                    f"modified {totals['updated']}, skipped {totals['unchanged']} unchanged"
+                )
+                link_duplicate_events()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error during archive replay: {e}")
+                raise e
 
 def main():
-    service = EventIngestionService()
-    service.ingest_data()
+    parser = argparse.ArgumentParser(description="Ingest Las Vegas events from external providers")
+    parser.add_argument('--concurrent', action='store_true',
+                        help="fetch all providers in parallel with per-provider worker pools")
+    parser.add_argument('--replay', action='store_true',
+                        help="serve provider responses from the HTTP cache only, without network access")
+    parser.add_argument('--replay-archive', action='store_true',
+                        help="reprocess raw payloads from the raw archive instead of fetching")
+    parser.add_argument('--provider', action='append', choices=['ticketmaster', 'eventbrite', 'google_places'],
+                        help="with --replay-archive, only replay this provider (repeatable)")
+    parser.add_argument('--since', type=lambda value: datetime.strptime(value, '%Y-%m-%d'),
+                        help="with --replay-archive, only replay batches fetched on or after YYYY-MM-DD")
+    args = parser.parse_args()
+    load_dotenv()
+    http_client = CachedHttpClient.from_env()
+    if args.replay:
+        http_client.replay = True
+    service = EventIngestionService(http_client=http_client)
+    if args.replay_archive:
+        service.replay_archive(providers=args.provider, since=args.since)
+        return
+    service.ingest_data(concurrent=args.concurrent)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,291 @@
+"""Composable streaming stages for event ingestion.
+
+Page sources yield Page records; prefetch/merge overlap them with the
+consumer, archive_raw stores their raw payloads, normalize maps their events
+through process_*, and write_batches commits them. Each stage buffers a
+bounded number of pages.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from tenacity import RetryError
+
+logger = logging.getLogger(__name__)
+
+# Pages buffered between a background source and the consumer.
+PREFETCH_DEPTH = 4
+# Processed events accumulated before the sink writes and commits.
+BATCH_SIZE = 500
+
+_END = object()
+
+# One page of provider results. window is the (start, end) date range the
+# page belongs to, or None; cursor is what the source needs to fetch the page
+# after this one. A source ends with an empty page marked done once the
+# provider has nothing more; sources that stop on errors do not emit it.
+# refs holds the raw archive reference of each event once it is archived.
+Page = namedtuple('Page', ['provider', 'window', 'number', 'events', 'cursor', 'done', 'refs'],
+                  defaults=(None, False, None))
+
+
+def numbered_pages(provider, fetch_page, first_page, window=None, max_workers=1, prefetch_pages=1):
+    """Yield pages of a numbered API with up to prefetch_pages requests in flight.
+
+    fetch_page(page) returns (events, last_page). Only the first page is
+    requested until the provider has answered once; after that more requests
+    go out, bounded by last_page when the provider reports it. Pages are
+    yielded in order and the source stops at the first empty page.
+    """
+    in_flight = deque()
+    next_page = first_page
+    last_page = None
+    seen_response = False
+    page = first_page
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"fetch-{provider}")
+    try:
+        while True:
+            in_flight_limit = prefetch_pages if seen_response else 1
+            while len(in_flight) < in_flight_limit and (last_page is None or next_page <= last_page):
+                in_flight.append((next_page, executor.submit(fetch_page, next_page)))
+                next_page += 1
+            if not in_flight:
+                break
+            page, future = in_flight.popleft()
+            try:
+                events, reported_last_page = future.result()
+            except RetryError:
+                logger.warning(f"{provider}: Giving up on page {page} after retries; stopping this source.")
+                return
+            seen_response = True
+            if reported_last_page is not None:
+                last_page = reported_last_page
+            if not events:
+                logger.info(f"{provider}: No events on page {page}.")
+                break
+            logger.info(f"{provider}: Fetched {len(events)} events on page {page}")
+            yield Page(provider, window, page, events)
+        yield Page(provider, window, page, [], done=True)
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def planned_pages(provider, tasks, fetch_page, max_workers=1, prefetch_pages=1):
+    """Yield a known list of pages, fetching up to prefetch_pages of them at once.
+
+    tasks is a sequence of (window, page, last) tuples in the order pages
+    should be yielded; fetch_page(window, page) returns the page's events. A
+    page of None marks a window with nothing to fetch. A window is done after
+    its last page or its first empty one. A window whose fetch fails is
+    abandoned without a done marker, so a checkpointed run retries it later,
+    while the remaining windows carry on.
+    """
+    tasks = iter(tasks)
+    in_flight = deque()
+    closed_windows = set()
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"fetch-{provider}")
+    try:
+        while True:
+            while len(in_flight) < prefetch_pages:
+                task = next(tasks, None)
+                if task is None:
+                    break
+                window, page, last = task
+                future = executor.submit(fetch_page, window, page) if page is not None else None
+                in_flight.append((task, future))
+            if not in_flight:
+                return
+            (window, page, last), future = in_flight.popleft()
+            if window in closed_windows:
+                if future:
+                    future.cancel()
+                continue
+            events = []
+            if future:
+                try:
+                    events = future.result()
+                except RetryError:
+                    logger.warning(f"{provider}: Giving up on page {page} of window {window} after retries; "
+                                   f"it will be retried on the next run.")
+                    closed_windows.add(window)
+                    continue
+            if events:
+                logger.info(f"{provider}: Fetched {len(events)} events on page {page} of window {window}")
+                yield Page(provider, window, page, events)
+            if last or not events:
+                closed_windows.add(window)
+                yield Page(provider, window, page, [], done=True)
+    finally:
+        for _, future in in_flight:
+            if future:
+                future.cancel()
+        executor.shutdown(wait=False)
+
+
+def token_pages(provider, fetch_page, start_token=None, first_page=0, window=None, token_delay=2):
+    """Yield pages of an API that chains pages through a next-page token.
+
+    fetch_page(token) returns (events, next_token). Tokens take a moment to
+    become valid, so the source waits token_delay seconds before using one.
+    Each page carries the token for the page after it as its cursor.
+    """
+    token = start_token
+    page = first_page
+    while True:
+        try:
+            events, token = fetch_page(token)
+        except RetryError:
+            logger.warning(f"{provider}: Giving up on page {page} after retries; stopping this source.")
+            return
+        if not events:
+            logger.info(f"{provider}: No events on page {page}.")
+            break
+        logger.info(f"{provider}: Fetched {len(events)} events on page {page}")
+        yield Page(provider, window, page, events, cursor=token)
+        if not token:
+            break
+        page += 1
+        logger.info(f"{provider}: Waiting for next_page_token to become valid...")
+        time.sleep(token_delay)
+    yield Page(provider, window, page, [], done=True)
+
+
+def archived_pages(archive, providers=None, since=None):
+    """Yield archived raw batches as pages, so they can be processed again offline."""
+    for number, (provider, batch) in enumerate(archive.batches(providers, since)):
+        events = archive.read_batch(batch)
+        yield Page(provider, None, number, events,
+                   refs=[f"{batch}#{line}" for line in range(len(events))])
+
+
+def _put(out, item, stop):
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _drain(source, out, stop):
+    error = None
+    try:
+        for item in source:
+            if not _put(out, (None, item), stop):
+                break
+    except Exception as e:
+        error = e
+    finally:
+        close = getattr(source, 'close', None)
+        if close:
+            close()
+    _put(out, (_END, error), stop)
+
+
+def merge(sources, depth=PREFETCH_DEPTH):
+    """Run each source in its own thread and yield items as they arrive.
+
+    At most depth items wait in the buffer; producers block beyond that. An
+    exception in any source stops the others and is re-raised here.
+    """
+    out = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=_drain, args=(source, out, stop), daemon=True, name=f"ingest-source-{i}")
+        for i, source in enumerate(sources)
+    ]
+    for thread in threads:
+        thread.start()
+    remaining = len(threads)
+    try:
+        while remaining:
+            marker, value = out.get()
+            if marker is _END:
+                remaining -= 1
+                if value is not None:
+                    raise value
+                continue
+            yield value
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+def prefetch(source, depth=PREFETCH_DEPTH):
+    """Run source in a background thread so it keeps fetching while the consumer works."""
+    return merge([source], depth)
+
+
+def archive_raw(pages, archive):
+    """Write each page's raw events to a RawArchive batch and attach their refs."""
+    for page in pages:
+        if page.events and page.refs is None:
+            page = page._replace(refs=archive.write_batch(page.provider, page.events))
+        yield page
+
+
+def normalize(pages, processors):
+    """Map raw provider events to Event column dicts, dropping ones that fail to process.
+
+    Archived events get their reference in raw_ref.
+    """
+    for page in pages:
+        process = processors[page.provider]
+        refs = page.refs or [None] * len(page.events)
+        processed = []
+        for event, ref in zip(page.events, refs):
+            processed_event = process(event)
+            if processed_event:
+                if ref:
+                    processed_event['raw_ref'] = ref
+                processed.append(processed_event)
+        yield page._replace(events=processed, refs=None)
+
+
+def track_latest_start(pages, summary):
+    """Record the latest naive start_date seen in summary['max_event_date']."""
+    for page in pages:
+        for processed_event in page.events:
+            event_start = processed_event.get('start_date')
+            if event_start:
+                event_start_naive = event_start.replace(tzinfo=None)
+                if event_start_naive > summary['max_event_date']:
+                    summary['max_event_date'] = event_start_naive
+        yield page
+
+
+def write_batches(pages, write, batch_size=BATCH_SIZE, on_commit=None):
+    """Sink: hand accumulated events to write(events) every batch_size events.
+
+    write is expected to commit. After each batch on_commit, if given, is
+    called with the pages (without their events) that the batch covered.
+    Returns the number of events written.
+    """
+    batch = []
+    batch_pages = []
+    total_written = 0
+
+    def flush():
+        if batch:
+            counts = write(batch)
+            logger.info(f"Committed {len(batch)} events from {len(batch_pages)} pages: {counts}")
+        if on_commit:
+            on_commit(batch_pages)
+        return len(batch)
+
+    for page in pages:
+        batch.extend(page.events)
+        batch_pages.append(page._replace(events=None))
+        if len(batch) >= batch_size:
+            total_written += flush()
+            batch = []
+            batch_pages = []
+    if batch_pages:
+        total_written += flush()
+    return total_written
@@ -0,0 +1,99 @@
+"""Item-item collaborative filtering over user_interactions.
+
+Each event is a vector over users, weighted by how the user engaged with
+it (INTERACTION_WEIGHTS; a dislike drops the user's pair altogether). Two
+events are similar when the same users engaged with both: the cosine of
+their vectors, shrunk towards zero when they share few users so that one
+shared view does not make a strong neighbour.
+
+InteractionMatrix keeps the matrix compressed both ways (event -> users and
+user -> events) in NumPy arrays, so one event's neighbours take two
+gathers and a bincount. recommendation_job.py stores the top
+NEIGHBORS_PER_EVENT of every event in event_similarities, which the API
+reads by primary key.
+"""
+import numpy as np
+from scoring import top_k
+
+INTERACTION_WEIGHTS = {'like': 1.0, 'view': 0.25}
+# Similarity is scaled by shared / (shared + SHRINKAGE) users
+SHRINKAGE = 10.0
+NEIGHBORS_PER_EVENT = 50
+
+
+def _compressed(rows, columns, values, row_count):
+    """(indptr, columns, values) of a sparse matrix sorted by row, as in CSR."""
+    order = np.argsort(rows, kind='stable')
+    indptr = np.zeros(row_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=row_count), out=indptr[1:])
+    return indptr, columns[order], values[order]
+
+
+def _gather(indptr, rows):
+    """Positions of every entry of rows in a compressed matrix, row by row."""
+    starts, ends = indptr[rows], indptr[rows + 1]
+    lengths = ends - starts
+    # Each position is its row's start plus its offset within the row
+    row_offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return row_offsets + np.arange(lengths.sum()), lengths
+
+
+class InteractionMatrix:
+    """Sparse user x event engagement weights."""
+
+    def __init__(self, user_ids, event_ids, user_codes, event_codes, weights):
+        self.user_ids = user_ids
+        self.event_ids = event_ids
+        self.event_codes = {event_id: code for code, event_id in enumerate(event_ids.tolist())}
+        self.user_codes = {user_id: code for code, user_id in enumerate(user_ids)}
+        self.event_indptr, self.event_users, self.event_weights = _compressed(
+            event_codes, user_codes, weights, len(event_ids))
+        self.user_indptr, self.user_events, self.user_weights = _compressed(
+            user_codes, event_codes, weights, len(user_ids))
+        self.norms = np.sqrt(np.bincount(event_codes, weights=weights ** 2, minlength=len(event_ids)))
+
+    def __len__(self):
+        return len(self.event_ids)
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """Matrix from (user_id, event_id, weight) triples, one per user and event."""
+        user_codes, event_codes = {}, {}
+        users, events, weights = [], [], []
+        for user_id, event_id, weight in pairs:
+            users.append(user_codes.setdefault(user_id, len(user_codes)))
+            events.append(event_codes.setdefault(event_id, len(event_codes)))
+            weights.append(weight)
+        return cls(
+            list(user_codes),
+            np.array(list(event_codes), dtype=np.int64),
+            np.array(users, dtype=np.int64),
+            np.array(events, dtype=np.int64),
+            np.array(weights, dtype=np.float64),
+        )
+
+    def events_of(self, user_ids):
+        """Ids of every event the given users engaged with."""
+        codes = np.array([self.user_codes[user_id] for user_id in user_ids if user_id in self.user_codes],
+                         dtype=np.int64)
+        positions, _ = _gather(self.user_indptr, codes)
+        return self.event_ids[np.unique(self.user_events[positions])].tolist()
+
+    def neighbors(self, event_id, k=NEIGHBORS_PER_EVENT):
+        """(event_id, similarity) of up to k events most similar to event_id, best first."""
+        code = self.event_codes.get(event_id)
+        if code is None:
+            return []
+        users = self.event_users[self.event_indptr[code]:self.event_indptr[code + 1]]
+        user_weights = self.event_weights[self.event_indptr[code]:self.event_indptr[code + 1]]
+        # Every event those users engaged with, and the products of both weights
+        positions, lengths = _gather(self.user_indptr, users)
+        events = self.user_events[positions]
+        products = np.repeat(user_weights, lengths) * self.user_weights[positions]
+        candidates, inverse = np.unique(events, return_inverse=True)
+        dots = np.bincount(inverse, weights=products)
+        shared = np.bincount(inverse)
+        keep = candidates != code
+        candidates, dots, shared = candidates[keep], dots[keep], shared[keep]
+        similarity = dots / (self.norms[code] * self.norms[candidates]) * shared / (shared + SHRINKAGE)
+        return top_k(self.event_ids[candidates], similarity, k)
@@ -0,0 +1,110 @@
+"""Keyset (seek) pagination for event listings.
+
+Pages are ordered by a sort column plus the primary key as a tie-breaker,
+and the next page starts strictly after the last row of the previous one,
+so fetching page 500 costs the same index range scan as page one. Cursors
+are opaque URL-safe tokens carrying the sort mode and the last row's key.
+"""
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import and_, or_, tuple_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 100
+
+# column is an attribute name on the model; parse turns the cursor's JSON
+# value back into the column's type. NULLs always sort last.
+SortKey = namedtuple('SortKey', ['column', 'descending', 'parse'])
+
+EVENT_SORTS = {
+    'date': SortKey('start_date', False, datetime.fromisoformat),
+    'price-low': SortKey('price_range_min', False, Decimal),
+    'price-high': SortKey('price_range_min', True, Decimal),
+    'rating': SortKey('rating', True, Decimal),
+}
+DEFAULT_SORT = 'date'
+
+
+class InvalidCursor(ValueError):
+    """Raised for cursors that were not issued for this listing."""
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(sort, value, row_id):
+    payload = json.dumps([sort, _json_value(value), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, sort):
+    """Return (value, row_id) from a cursor issued for the given sort mode."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cursor_sort, value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if cursor_sort != sort or not isinstance(row_id, int):
+            raise InvalidCursor(f"Cursor does not belong to sort order '{sort}'")
+        if value is not None:
+            value = EVENT_SORTS[sort].parse(value)
+        return value, row_id
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError, ArithmeticError) as e:
+        raise InvalidCursor(f"Malformed cursor: {e}")
+
+
+def page_size(limit):
+    """limit clamped to 1..MAX_PAGE_SIZE, DEFAULT_PAGE_SIZE when unset."""
+    return max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+
+
+def order_query(query, model, sort=DEFAULT_SORT):
+    """Apply a sort mode's ORDER BY, id breaking ties in the same direction."""
+    key = EVENT_SORTS[sort]
+    column = getattr(model, key.column)
+    if key.descending:
+        return query.order_by(column.desc().nullslast(), model.id.desc())
+    return query.order_by(column.asc().nullslast(), model.id.asc())
+
+
+def paginate(query, model, sort=DEFAULT_SORT, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Return (rows, next_cursor) for one page of query in the given sort mode.
+
+    next_cursor is None on the last page. Raises InvalidCursor for unknown
+    sort modes or cursors that do not match them.
+    """
+    if sort not in EVENT_SORTS:
+        raise InvalidCursor(f"Unknown sort order '{sort}'")
+    key = EVENT_SORTS[sort]
+    column = getattr(model, key.column)
+    id_column = model.id
+    limit = page_size(limit)
+
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort)
+        if value is None:
+            # Already in the trailing NULL block: only the id decides
+            after_id = id_column < row_id if key.descending else id_column > row_id
+            query = query.filter(and_(column.is_(None), after_id))
+        else:
+            if key.descending:
+                after_key = tuple_(column, id_column) < (value, row_id)
+            else:
+                after_key = tuple_(column, id_column) > (value, row_id)
+            query = query.filter(or_(after_key, column.is_(None)))
+
+    rows = order_query(query, model, sort).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, getattr(last, key.column), last.id)
+    return rows, next_cursor
@@ -0,0 +1,216 @@
+"""Response cache for /api/events listings.
+
+Entries are keyed on the normalized filter tuple plus the events cache
+version, a counter the ingester bumps in the same transaction as every
+batch that changes events. A new version makes all older entries
+unreachable, so a cached page never outlives the ingest that changed it.
+
+Entries live in an in-process LRU with a TTL and, optionally, in a shared
+backend (Redis, or MemoryBackend as a local stand-in) so that several API
+workers can reuse each other's pages.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from event_filters import PARAM_ALIASES, canonical_value
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 60
+DEFAULT_MAX_ENTRIES = 1024
+# Coordinates are snapped to ~110 m cells (and radii to 100 m) before they
+# reach the query, so nearby requests share one entry.
+COORDINATE_DECIMALS = 3
+RADIUS_DECIMALS = 1
+
+# Parameter name -> normalizer; anything else does not affect the listing.
+LISTING_PARAMS = OrderedDict([
+    ('category', str),
+    ('priceRange', str),
+    ('timeframe', str),
+    ('source', lambda value: value.lower()),
+    ('min_rating', float),
+    ('latitude', lambda value: round(float(value), COORDINATE_DECIMALS)),
+    ('longitude', lambda value: round(float(value), COORDINATE_DECIMALS)),
+    ('radius', lambda value: round(float(value), RADIUS_DECIMALS)),
+    ('nearest', int),
+    ('sortBy', str),
+    ('cursor', str),
+    ('facets', lambda value: value.lower() in ('1', 'true', 'yes')),
+    ('limit', int),
+])
+
+CachedListing = namedtuple('CachedListing', ['body', 'next_cursor'])
+
+
+def normalize_listing_args(args):
+    """Known listing parameters in a fixed order, with aliases resolved and values normalized.
+
+    Values that do not parse are dropped, matching how the query builder
+    ignores them. The result is used both as the cache key and to build
+    the query, so an entry always matches the request it answers.
+    """
+    values = {PARAM_ALIASES.get(name, name): value for name, value in args.items()}
+    normalized = []
+    for name, normalize in LISTING_PARAMS.items():
+        value = canonical_value(name, values.get(name))
+        if value is None:
+            continue
+        try:
+            normalized.append((name, normalize(value)))
+        except (TypeError, ValueError):
+            continue
+    return tuple(normalized)
+
+
+class MemoryBackend:
+    """Dict-backed stand-in for a shared cache backend (get/set with TTL, delete)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl_seconds):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl_seconds, value)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class RedisBackend:
+    """Shared backend on Redis; needs the optional redis package."""
+
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl_seconds):
+        self.client.set(key, value, ex=max(1, int(ttl_seconds)))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+
+_warned_no_redis = False
+
+
+def shared_backend(url):
+    """The backend for a *_CACHE_BACKEND setting: None when empty, the local
+    stand-in for "memory", Redis for a redis:// URL."""
+    global _warned_no_redis
+    if url == 'memory':
+        return MemoryBackend()
+    if url and redis is None:
+        if not _warned_no_redis:
+            logger.warning("A Redis cache backend is configured but the redis package is not installed; "
+                           "caching in process only")
+            _warned_no_redis = True
+        return None
+    if url:
+        return RedisBackend(url)
+    return None
+
+
+class ListingCache:
+    """LRU + TTL cache of serialized listing responses, scoped by a version.
+
+    Callers read the events cache version once per request and pass it to
+    both get and put, so a page computed before an ingest committed is
+    never stored under the version that ingest created.
+    """
+
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES,
+                 backend=None, namespace='events'):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.backend = backend
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.stats = {'hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    @classmethod
+    def from_env(cls):
+        """Cache configured by LISTING_CACHE_* variables, or None when LISTING_CACHE=0.
+
+        LISTING_CACHE_BACKEND is empty for in-process only, "memory" for the
+        local stand-in, or a redis:// URL.
+        """
+        if os.environ.get('LISTING_CACHE', '1') == '0':
+            return None
+        return cls(
+            ttl_seconds=float(os.environ.get('LISTING_CACHE_TTL', DEFAULT_TTL_SECONDS)),
+            max_entries=int(os.environ.get('LISTING_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+            backend=shared_backend(os.environ.get('LISTING_CACHE_BACKEND', ''))
+        )
+
+    def _shared_key(self, version, key):
+        digest = hashlib.sha256(json.dumps(key).encode('utf-8')).hexdigest()
+        return f"listing:{self.namespace}:{version}:{digest}"
+
+    def get(self, key, version):
+        """The CachedListing for a normalized key at version, or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((version, key))
+            if entry and entry[0] > now:
+                self._entries.move_to_end((version, key))
+                self.stats['hits'] += 1
+                return entry[1]
+        if self.backend:
+            try:
+                raw = self.backend.get(self._shared_key(version, key))
+            except Exception as e:
+                logger.warning(f"Listing cache backend read failed: {e}")
+                raw = None
+            if raw:
+                data = json.loads(raw)
+                listing = CachedListing(data['body'].encode('utf-8'), data['next_cursor'])
+                self._store(version, key, listing, now)
+                self.stats['shared_hits'] += 1
+                return listing
+        self.stats['misses'] += 1
+        return None
+
+    def put(self, key, version, body, next_cursor=None):
+        """Cache a response body (bytes) computed at version."""
+        listing = CachedListing(body, next_cursor)
+        self._store(version, key, listing, time.monotonic())
+        if self.backend:
+            payload = json.dumps({'body': body.decode('utf-8'), 'next_cursor': next_cursor})
+            try:
+                self.backend.set(self._shared_key(version, key), payload, self.ttl_seconds)
+            except Exception as e:
+                logger.warning(f"Listing cache backend write failed: {e}")
+
+    def _store(self, version, key, listing, now):
+        with self._lock:
+            self._entries[(version, key)] = (now + self.ttl_seconds, listing)
+            self._entries.move_to_end((version, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -0,0 +1,26 @@
+"""Add content_hash to events for change detection during ingestion
+
+Revision ID: 4c2e8a1f7b3d
+Revises: new_schema_2025
+Create Date: 2026-10-18 09:12:41.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c2e8a1f7b3d'
+down_revision = 'new_schema_2025'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_column('content_hash')
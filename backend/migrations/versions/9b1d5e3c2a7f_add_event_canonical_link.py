@@ -0,0 +1,31 @@
+"""Add canonical_event_id to events for cross-source deduplication
+
+Revision ID: 9b1d5e3c2a7f
+Revises: 4c2e8a1f7b3d
+Create Date: 2026-10-18 11:47:05.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b1d5e3c2a7f'
+down_revision = '4c2e8a1f7b3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('canonical_event_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_events_canonical_event_id', 'events',
+                                    ['canonical_event_id'], ['id'], ondelete='SET NULL')
+        batch_op.create_index('ix_events_canonical_event_id', ['canonical_event_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_index('ix_events_canonical_event_id')
+        batch_op.drop_constraint('fk_events_canonical_event_id', type_='foreignkey')
+        batch_op.drop_column('canonical_event_id')
@@ -0,0 +1,41 @@
+"""Add indexes for the /api/events filter and sort paths
+
+Revision ID: a5c8e2d4f1b6
+Revises: d7a3f0b9e6c1
+Create Date: 2026-10-18 14:05:12.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5c8e2d4f1b6'
+down_revision = 'd7a3f0b9e6c1'
+branch_labels = None
+depends_on = None
+
+CANONICAL = sa.text('canonical_event_id IS NULL')
+
+
+def upgrade():
+    # Listings always filter start_date >= now on canonical events and sort by
+    # start_date, so start_date trails every composite index.
+    op.create_index('ix_events_upcoming_start_date', 'events', ['start_date'],
+                    postgresql_where=CANONICAL)
+    op.create_index('ix_events_category_start_date', 'events', ['category', 'start_date'],
+                    postgresql_where=CANONICAL)
+    op.create_index('ix_events_source_lower_start_date', 'events', [sa.text('lower(source)'), 'start_date'],
+                    postgresql_where=CANONICAL)
+    op.create_index('ix_events_rating_start_date', 'events', ['rating', 'start_date'],
+                    postgresql_where=CANONICAL)
+    op.create_index('ix_events_free_start_date', 'events', ['start_date'],
+                    postgresql_where=sa.text('price_range_min = 0 AND canonical_event_id IS NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_events_free_start_date', table_name='events')
+    op.drop_index('ix_events_rating_start_date', table_name='events')
+    op.drop_index('ix_events_source_lower_start_date', table_name='events')
+    op.drop_index('ix_events_category_start_date', table_name='events')
+    op.drop_index('ix_events_upcoming_start_date', table_name='events')
@@ -0,0 +1,30 @@
+"""Add cache_versions, the counters that invalidate cached listing responses
+
+Revision ID: b8d4e1a6c9f2
+Revises: f2b7c4e8a0d3
+Create Date: 2026-10-18 18:05:31.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d4e1a6c9f2'
+down_revision = 'f2b7c4e8a0d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    cache_versions = op.create_table(
+        'cache_versions',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(cache_versions, [{'name': 'events', 'version': 0}])
+
+
+def downgrade():
+    op.drop_table('cache_versions')
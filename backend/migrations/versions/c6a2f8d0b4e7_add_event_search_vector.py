@@ -0,0 +1,53 @@
+"""Add a generated full-text search vector and trigram index to events
+
+Revision ID: c6a2f8d0b4e7
+Revises: b8d4e1a6c9f2
+Create Date: 2026-10-18 19:12:47.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6a2f8d0b4e7'
+down_revision = 'b8d4e1a6c9f2'
+branch_labels = None
+depends_on = None
+
+CANONICAL = sa.text('canonical_event_id IS NULL')
+
+# array_to_string and concat_ws are only STABLE, so the document is built by
+# a function declared IMMUTABLE, which generated columns require. Weights:
+# A for the name, B for where it happens and its tags, C for the description.
+CREATE_DOCUMENT_FUNCTION = """
+CREATE OR REPLACE FUNCTION events_search_document(name text, description text, venue text, casino text, tags text[])
+RETURNS tsvector LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+           setweight(to_tsvector('english', concat_ws(' ', venue, casino, array_to_string(tags, ' '))), 'B') ||
+           setweight(to_tsvector('english', coalesce(description, '')), 'C')
+$$
+"""
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(CREATE_DOCUMENT_FUNCTION)
+    # Adding a stored generated column computes it for every existing row
+    op.add_column('events', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed('events_search_document(name, description, venue, casino, tags)', persisted=True)
+    ))
+    op.create_index('ix_events_search_vector', 'events', ['search_vector'],
+                    postgresql_using='gin', postgresql_where=CANONICAL)
+    op.create_index('ix_events_name_trgm', 'events', ['name'],
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+                    postgresql_where=CANONICAL)
+
+
+def downgrade():
+    op.drop_index('ix_events_name_trgm', table_name='events')
+    op.drop_index('ix_events_search_vector', table_name='events')
+    op.drop_column('events', 'search_vector')
+    op.execute("DROP FUNCTION events_search_document(text, text, text, text, text[])")
@@ -0,0 +1,26 @@
+"""Add raw_ref to events pointing at the raw payload archive
+
+Revision ID: d7a3f0b9e6c1
+Revises: 9b1d5e3c2a7f
+Create Date: 2026-10-18 13:20:36.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a3f0b9e6c1'
+down_revision = '9b1d5e3c2a7f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('raw_ref', sa.String(length=255), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_column('raw_ref')
@@ -0,0 +1,32 @@
+"""Add event_changes, the feed of written events that API hot sets replay
+
+Revision ID: d9e5b3a7f1c4
+Revises: c6a2f8d0b4e7
+Create Date: 2026-10-18 20:31:05.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9e5b3a7f1c4'
+down_revision = 'c6a2f8d0b4e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'event_changes',
+        sa.Column('seq', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('seq')
+    )
+    op.create_index('ix_event_changes_changed_at', 'event_changes', ['changed_at'])
+
+
+def downgrade():
+    op.drop_index('ix_event_changes_changed_at', table_name='event_changes')
+    op.drop_table('event_changes')
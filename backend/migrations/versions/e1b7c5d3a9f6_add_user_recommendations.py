@@ -0,0 +1,38 @@
+"""Add user_recommendations, the per-user lists recommendation_job.py precomputes
+
+Revision ID: e1b7c5d3a9f6
+Revises: d9e5b3a7f1c4
+Create Date: 2026-10-18 23:12:40.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1b7c5d3a9f6'
+down_revision = 'd9e5b3a7f1c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_recommendations',
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('event_ids', postgresql.ARRAY(sa.Integer()), nullable=False),
+        sa.Column('scores', postgresql.ARRAY(sa.Float()), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_user_recommendations_computed_at', 'user_recommendations', ['computed_at'])
+    # Incremental runs look up interactions since the latest run
+    op.create_index('ix_user_interactions_created_at', 'user_interactions', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_user_interactions_created_at', table_name='user_interactions')
+    op.drop_index('ix_user_recommendations_computed_at', table_name='user_recommendations')
+    op.drop_table('user_recommendations')
@@ -0,0 +1,63 @@
+"""Add a geohash column and index to events for radius and nearest searches
+
+Revision ID: e3f6a9c1d8b2
+Revises: a5c8e2d4f1b6
+Create Date: 2026-10-18 15:31:48.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3f6a9c1d8b2'
+down_revision = 'a5c8e2d4f1b6'
+branch_labels = None
+depends_on = None
+
+GEOHASH_PRECISION = 7
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+BACKFILL_BATCH_SIZE = 1000
+
+
+def geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    # Frozen copy of geo.geohash_encode so the migration does not depend on app code
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    bits, chars, even = [], [], True
+    while len(chars) < precision:
+        value, bounds = (longitude, lon_range) if even else (latitude, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        if value >= middle:
+            bits.append(1)
+            bounds[0] = middle
+        else:
+            bits.append(0)
+            bounds[1] = middle
+        even = not even
+        if len(bits) == 5:
+            chars.append(BASE32[int(''.join(map(str, bits)), 2)])
+            bits = []
+    return ''.join(chars)
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('geohash', sa.String(length=12, collation='C'), nullable=True))
+
+    connection = op.get_bind()
+    rows = connection.execute(sa.text(
+        "SELECT id, latitude, longitude FROM events WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+    )).fetchall()
+    updates = [{'id': row.id, 'geohash': geohash(row.latitude, row.longitude)} for row in rows]
+    for i in range(0, len(updates), BACKFILL_BATCH_SIZE):
+        connection.execute(sa.text("UPDATE events SET geohash = :geohash WHERE id = :id"),
+                           updates[i:i + BACKFILL_BATCH_SIZE])
+
+    op.create_index('ix_events_geohash', 'events', ['geohash'],
+                    postgresql_where=sa.text('canonical_event_id IS NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_events_geohash', table_name='events')
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_column('geohash')
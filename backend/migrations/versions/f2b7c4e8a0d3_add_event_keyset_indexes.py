@@ -0,0 +1,42 @@
+"""Add indexes matching the keyset pagination orders of /api/events
+
+Revision ID: f2b7c4e8a0d3
+Revises: e3f6a9c1d8b2
+Create Date: 2026-10-18 16:42:09.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b7c4e8a0d3'
+down_revision = 'e3f6a9c1d8b2'
+branch_labels = None
+depends_on = None
+
+CANONICAL = sa.text('canonical_event_id IS NULL')
+
+
+def upgrade():
+    # Pages seek on (sort column, id), so id joins every ordering index
+    op.drop_index('ix_events_upcoming_start_date', table_name='events')
+    op.create_index('ix_events_upcoming_start_date', 'events', ['start_date', 'id'],
+                    postgresql_where=CANONICAL)
+    op.create_index('ix_events_price_id', 'events', ['price_range_min', 'id'],
+                    postgresql_where=CANONICAL)
+    op.create_index('ix_events_price_desc_id', 'events',
+                    [sa.text('price_range_min DESC NULLS LAST'), sa.text('id DESC')],
+                    postgresql_where=CANONICAL)
+    op.create_index('ix_events_rating_desc_id', 'events',
+                    [sa.text('rating DESC NULLS LAST'), sa.text('id DESC')],
+                    postgresql_where=CANONICAL)
+
+
+def downgrade():
+    op.drop_index('ix_events_rating_desc_id', table_name='events')
+    op.drop_index('ix_events_price_desc_id', table_name='events')
+    op.drop_index('ix_events_price_id', table_name='events')
+    op.drop_index('ix_events_upcoming_start_date', table_name='events')
+    op.create_index('ix_events_upcoming_start_date', 'events', ['start_date'],
+                    postgresql_where=CANONICAL)
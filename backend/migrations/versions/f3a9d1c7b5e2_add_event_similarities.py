@@ -0,0 +1,35 @@
+"""Add event_similarities, the item-item neighbours recommendation_job.py precomputes
+
+Revision ID: f3a9d1c7b5e2
+Revises: e1b7c5d3a9f6
+Create Date: 2026-10-19 10:05:12.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9d1c7b5e2'
+down_revision = 'e1b7c5d3a9f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'event_similarities',
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('neighbor_ids', postgresql.ARRAY(sa.Integer()), nullable=False),
+        sa.Column('scores', postgresql.ARRAY(sa.Float()), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('event_id')
+    )
+    op.create_index('ix_event_similarities_computed_at', 'event_similarities', ['computed_at'])
+
+
+def downgrade():
+    op.drop_index('ix_event_similarities_computed_at', table_name='event_similarities')
+    op.drop_table('event_similarities')
@@ -0,0 +1,233 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import requests
+from tenacity import wait_exponential
+
+logger = logging.getLogger(__name__)
+
+# Per-provider ceilings. provider_rps caps the provider as a whole and
+# key_rps each API key, so adding keys raises throughput up to the provider
+# cap. Ticketmaster allows 5 requests/second per key, Eventbrite's default
+# quota is 2000/hour per token.
+PROVIDER_RATE_LIMITS = {
+    'ticketmaster': {'provider_rps': 8.0, 'key_rps': 4.5, 'burst': 5},
+    'eventbrite': {'provider_rps': 1.0, 'key_rps': 0.5, 'burst': 2},
+    'google_places': {'provider_rps': 5.0, 'key_rps': 5.0, 'burst': 5},
+}
+DEFAULT_RATE_LIMIT = {'provider_rps': 1.0, 'key_rps': 1.0, 'burst': 1}
+
+RATE_LIMITED_STATUSES = (403, 429)
+# Cooldown for a key that was throttled without a Retry-After header;
+# doubles with every consecutive rejection up to MAX_COOLDOWN_SECONDS.
+BASE_COOLDOWN_SECONDS = 2.0
+MAX_COOLDOWN_SECONDS = 60.0
+# Adaptive rate: halve a key's rate when throttled, win back 5% of its
+# ceiling on every success, never dropping below MIN_RATE_FRACTION of it.
+MIN_RATE_FRACTION = 0.1
+RECOVERY_FRACTION = 0.05
+
+
+class TokenBucket:
+    """Thread-safe token bucket that hands out reservations.
+
+    reserve() always takes a token, letting the balance go negative, and
+    returns how long the caller has to wait for it, so callers queue up in
+    order without holding the lock while they sleep.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = max(1.0, float(capacity))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now=None):
+        """Seconds until a token is available, without taking it."""
+        with self._lock:
+            now = now or time.monotonic()
+            self._refill(now)
+            return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def reserve(self, now=None):
+        with self._lock:
+            now = now or time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def slow_down(self):
+        with self._lock:
+            self.rate = max(self.max_rate * MIN_RATE_FRACTION, self.rate / 2)
+
+    def speed_up(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * RECOVERY_FRACTION)
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class ProviderThrottle:
+    """Rate limiting, key rotation and backoff for one outbound API.
+
+    acquire() blocks until both the provider bucket and one of the API keys
+    have capacity and returns that key; the key whose bucket frees up
+    first is chosen, so load spreads over the pool and keys that are
+    cooling down are skipped. observe() feeds each response back: 429/403
+    put the key on a cooldown (honouring Retry-After) and halve its rate,
+    successes slowly restore it. apply_key(key, params, headers) writes the
+    key into a request.
+    """
+
+    def __init__(self, name, keys=None, provider_rps=1.0, key_rps=1.0, burst=1, apply_key=None):
+        self.name = name
+        self.keys = list(keys) if keys else [None]
+        self.apply_key = apply_key
+        self.bucket = TokenBucket(provider_rps, burst)
+        self.key_buckets = {key: TokenBucket(key_rps, burst) for key in self.keys}
+        self.cooldown_until = {key: 0.0 for key in self.keys}
+        self.failures = {key: 0 for key in self.keys}
+        self._lock = threading.Lock()
+        self._last_key = None
+        self.stats = {
+            'requests': 0,
+            'rate_limited': 0,
+            'key_switches': 0,
+            'throttled_seconds': 0.0,
+        }
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            key = min(
+                self.keys,
+                key=lambda k: max(self.cooldown_until[k] - now, self.key_buckets[k].wait_time(now))
+            )
+            delay = max(
+                self.cooldown_until[key] - now,
+                self.key_buckets[key].reserve(now),
+                self.bucket.reserve(now),
+            )
+            if self._last_key is not None and key != self._last_key:
+                self.stats['key_switches'] += 1
+            self._last_key = key
+            self.stats['requests'] += 1
+            self.stats['throttled_seconds'] += delay
+        if delay > 0:
+            time.sleep(delay)
+        return key
+
+    def sign(self, key, params=None, headers=None):
+        params = dict(params or {})
+        headers = dict(headers or {})
+        if self.apply_key and key is not None:
+            self.apply_key(key, params, headers)
+        return params, headers
+
+    def observe(self, key, response):
+        if response.status_code in RATE_LIMITED_STATUSES:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            with self._lock:
+                self.failures[key] += 1
+                if retry_after is None:
+                    retry_after = min(MAX_COOLDOWN_SECONDS,
+                                      BASE_COOLDOWN_SECONDS * 2 ** (self.failures[key] - 1))
+                self.cooldown_until[key] = time.monotonic() + retry_after
+                self.stats['rate_limited'] += 1
+            self.key_buckets[key].slow_down()
+            logger.warning(f"{self.name}: HTTP {response.status_code}; cooling key down for {retry_after:.1f}s")
+        elif response.status_code < 400:
+            with self._lock:
+                self.failures[key] = 0
+            self.key_buckets[key].speed_up()
+
+    def metrics(self):
+        with self._lock:
+            metrics = dict(self.stats)
+            metrics['keys'] = len(self.keys)
+            metrics['keys_cooling_down'] = sum(
+                1 for until in self.cooldown_until.values() if until > time.monotonic()
+            )
+        metrics['throttled_seconds'] = round(metrics['throttled_seconds'], 3)
+        return metrics
+
+
+_throttles = {}
+_throttles_lock = threading.Lock()
+
+
+def get_throttle(name, keys=None, apply_key=None):
+    """Process-wide throttle for an API, created on first use.
+
+    Every client talking to the same API shares it, so the limits hold no
+    matter how many threads or service instances are running.
+    """
+    with _throttles_lock:
+        throttle = _throttles.get(name)
+        if throttle is None:
+            limits = PROVIDER_RATE_LIMITS.get(name, DEFAULT_RATE_LIMIT)
+            throttle = ProviderThrottle(name, keys=keys, apply_key=apply_key, **limits)
+            _throttles[name] = throttle
+        return throttle
+
+
+def throttle_metrics():
+    with _throttles_lock:
+        throttles = list(_throttles.values())
+    return {throttle.name: throttle.metrics() for throttle in throttles}
+
+
+def keys_from_env(prefix):
+    """API keys from PREFIX_API_KEYS (comma separated), falling back to PREFIX_API_KEY."""
+    keys = [key.strip() for key in os.environ.get(f"{prefix}_API_KEYS", '').split(',') if key.strip()]
+    if not keys and os.environ.get(f"{prefix}_API_KEY"):
+        keys = [os.environ[f"{prefix}_API_KEY"]]
+    return keys
+
+
+def query_param_key(param):
+    def apply_key(key, params, headers):
+        params[param] = key
+    return apply_key
+
+
+def bearer_key(key, params, headers):
+    headers['Authorization'] = f"Bearer {key}"
+
+
+_error_backoff = wait_exponential(multiplier=1, min=4, max=10)
+
+
+def throttled_wait(retry_state):
+    """tenacity wait: rate-limit rejections are already paced by the throttle
+    cooldown, anything else backs off exponentially."""
+    outcome = retry_state.outcome
+    error = outcome.exception() if outcome else None
+    if (isinstance(error, requests.HTTPError) and error.response is not None
+            and error.response.status_code in RATE_LIMITED_STATUSES):
+        return 0
+    return _error_backoff(retry_state)
@@ -0,0 +1,98 @@
+"""Raw provider payloads archived on local disk for replay and reprocessing.
+
+Batches are gzip-compressed JSON Lines rather than zstd or a columnar
+format such as Parquet: gzip is in the standard library, so the archive
+adds no dependency, and payloads stay in the providers' own nested shape.
+"""
+import gzip
+import json
+import logging
+import os
+import tempfile
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.dirname(__file__), '.raw_archive')
+BATCH_SUFFIX = '.jsonl.gz'
+DATE_PARTITION_FORMAT = '%Y-%m-%d'
+
+
+class RawArchive:
+    """Append-only archive of raw provider payloads on local disk.
+
+    Every fetched page becomes one gzip-compressed JSONL batch, one raw event
+    per line, partitioned by provider and fetch date:
+
+        <directory>/<provider>/<YYYY-MM-DD>/<HHMMSS>-<id>.jsonl.gz
+
+    Batches are written atomically and never modified afterwards. Events
+    refer to their payload with "<provider>/<date>/<file>#<line>".
+    """
+
+    def __init__(self, directory=DEFAULT_ARCHIVE_DIR, compresslevel=6):
+        self.directory = directory
+        self.compresslevel = compresslevel
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """The archive configured by INGEST_RAW_ARCHIVE*, or None when disabled."""
+        if os.environ.get('INGEST_RAW_ARCHIVE', '1') == '0':
+            return None
+        return cls(os.environ.get('INGEST_RAW_ARCHIVE_DIR', DEFAULT_ARCHIVE_DIR))
+
+    def write_batch(self, provider, events, fetched_at=None):
+        """Archive one page of raw events; returns a reference for each event."""
+        fetched_at = fetched_at or datetime.utcnow()
+        partition = os.path.join(provider, fetched_at.strftime(DATE_PARTITION_FORMAT))
+        directory = os.path.join(self.directory, partition)
+        os.makedirs(directory, exist_ok=True)
+        name = f"{fetched_at.strftime('%H%M%S')}-{uuid.uuid4().hex[:12]}{BATCH_SUFFIX}"
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw_file:
+                with gzip.GzipFile(fileobj=raw_file, mode='wb', compresslevel=self.compresslevel) as f:
+                    for event in events:
+                        f.write(json.dumps(event, separators=(',', ':')).encode('utf-8'))
+                        f.write(b'\n')
+            os.replace(tmp_path, os.path.join(directory, name))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        batch = f"{provider}/{fetched_at.strftime(DATE_PARTITION_FORMAT)}/{name}"
+        return [f"{batch}#{line}" for line in range(len(events))]
+
+    def batches(self, providers=None, since=None):
+        """Yield (provider, batch) for archived batches in fetch order.
+
+        providers limits the providers read; since (a date) skips partitions
+        fetched before it.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        for provider in sorted(os.listdir(self.directory)):
+            if providers and provider not in providers:
+                continue
+            provider_dir = os.path.join(self.directory, provider)
+            if not os.path.isdir(provider_dir):
+                continue
+            for date in sorted(os.listdir(provider_dir)):
+                if since and date < since.strftime(DATE_PARTITION_FORMAT):
+                    continue
+                date_dir = os.path.join(provider_dir, date)
+                for name in sorted(os.listdir(date_dir)):
+                    if name.endswith(BATCH_SUFFIX):
+                        yield provider, f"{provider}/{date}/{name}"
+
+    def read_batch(self, batch):
+        with gzip.open(os.path.join(self.directory, *batch.split('/')), 'rb') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def load(self, ref):
+        """The raw payload an event's raw_ref points at."""
+        batch, line = ref.rsplit('#', 1)
+        return self.read_batch(batch)[int(line)]
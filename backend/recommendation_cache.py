@@ -0,0 +1,126 @@
+"""Per-user cache of personalized recommendations.
+
+Entries hold a user's recommended event ids and scores rather than Event
+rows, so they are small, serializable and never keep ORM objects alive. An
+entry lasts RECOMMENDATION_CACHE_TTL seconds or until the user records an
+interaction, whichever comes first.
+
+With a shared backend every worker reads and evicts the same entries and
+nothing is kept in process, so an eviction on one worker is seen by all;
+without one each worker keeps its own LRU. A recommendation computed while
+the user's interaction was being recorded can still be stored after the
+eviction, which the TTL bounds.
+
+Each worker counts its own hits, misses and evictions and logs them every
+RECOMMENDATION_CACHE_STATS_INTERVAL seconds.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from listing_cache import shared_backend
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_STATS_INTERVAL_SECONDS = 600
+
+
+class RecommendationCache:
+    """TTL cache of [(event_id, score), ...] per user id, best first."""
+
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES, backend=None,
+                 stats_interval_seconds=DEFAULT_STATS_INTERVAL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.backend = backend
+        self.stats_interval_seconds = stats_interval_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._stats_logged_at = time.monotonic()
+
+    @classmethod
+    def from_env(cls):
+        """Cache configured by RECOMMENDATION_CACHE_* variables, or None when RECOMMENDATION_CACHE=0.
+
+        RECOMMENDATION_CACHE_BACKEND is empty for in-process only, "memory"
+        for the local stand-in, or a redis:// URL.
+        """
+        if os.environ.get('RECOMMENDATION_CACHE', '1') == '0':
+            return None
+        return cls(
+            ttl_seconds=float(os.environ.get('RECOMMENDATION_CACHE_TTL', DEFAULT_TTL_SECONDS)),
+            max_entries=int(os.environ.get('RECOMMENDATION_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+            backend=shared_backend(os.environ.get('RECOMMENDATION_CACHE_BACKEND', '')),
+            stats_interval_seconds=float(os.environ.get('RECOMMENDATION_CACHE_STATS_INTERVAL',
+                                                        DEFAULT_STATS_INTERVAL_SECONDS))
+        )
+
+    def _shared_key(self, user_id):
+        return f"recommendations:{user_id}"
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+            now = time.monotonic()
+            if now - self._stats_logged_at < self.stats_interval_seconds:
+                return
+            self._stats_logged_at = now
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        hit_rate = stats['hits'] / lookups if lookups else 0.0
+        logger.info(f"Recommendation cache: {stats}, hit rate {hit_rate:.1%}")
+
+    def get(self, user_id):
+        """The cached [(event_id, score), ...] for user_id, or None."""
+        user_id = str(user_id)
+        scored = None
+        if self.backend:
+            try:
+                raw = self.backend.get(self._shared_key(user_id))
+            except Exception as e:
+                logger.warning(f"Recommendation cache backend read failed: {e}")
+                raw = None
+            if raw:
+                scored = [tuple(pair) for pair in json.loads(raw)]
+        else:
+            with self._lock:
+                entry = self._entries.get(user_id)
+                if entry and entry[0] > time.monotonic():
+                    self._entries.move_to_end(user_id)
+                    scored = entry[1]
+        self._count('misses' if scored is None else 'hits')
+        return scored
+
+    def put(self, user_id, scored):
+        """Cache user_id's recommendations as (event_id, score) pairs."""
+        user_id = str(user_id)
+        scored = [(int(event_id), float(score)) for event_id, score in scored]
+        if self.backend:
+            try:
+                self.backend.set(self._shared_key(user_id), json.dumps(scored), self.ttl_seconds)
+            except Exception as e:
+                logger.warning(f"Recommendation cache backend write failed: {e}")
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, scored)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def evict(self, user_id):
+        """Drop user_id's entry, after they record an interaction."""
+        user_id = str(user_id)
+        if self.backend:
+            try:
+                self.backend.delete(self._shared_key(user_id))
+            except Exception as e:
+                logger.warning(f"Recommendation cache backend delete failed: {e}")
+        else:
+            with self._lock:
+                self._entries.pop(user_id, None)
+        self._count('evictions')
@@ -0,0 +1,226 @@
+"""Precompute every active user's recommendations into user_recommendations,
+and every event's most similar events into event_similarities.
+
+/api/recommendations reads a user's row by primary key; the online engine
+only serves users without one (new or inactive users, and users whose row
+was dropped when they recorded an interaction).
+
+A full run, after each ingestion, recomputes every user active within
+ACTIVE_USER_DAYS and drops the rows of everyone else. An incremental run
+(--changed) recomputes only users with likes or dislikes since the latest
+run, and is cheap enough to schedule every few minutes.
+
+Event neighbours (item_similarity.py) are rebuilt from all interactions by
+--similarities and daily by scheduled_tasks.py. An incremental run first
+recomputes the neighbours of every event engaged with by users who
+interacted since the latest run, so users' lists blend in fresh ones;
+events sharing no user with them keep their scores until the next rebuild.
+
+    python recommendation_job.py [--changed | --similarities]
+"""
+import argparse
+import heapq
+import itertools
+import logging
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+from app import (
+    app, db, Event, EventSimilarity, UserInteraction, UserPreference, UserRecommendation, RecommendationEngine,
+    SCORING_COLUMNS, RECOMMENDATION_CANDIDATES, SCORED_INTERACTIONS, load_user_profiles
+)
+from event_filters import EventFilters, filter_clauses
+from item_similarity import INTERACTION_WEIGHTS, NEIGHBORS_PER_EVENT, InteractionMatrix
+from keyset import order_query
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_USER_DAYS = 90
+# Kept per user; more than a response shows, so that events starting before
+# the next run still leave a full list
+RECOMMENDATIONS_PER_USER = 50
+# Users whose profiles are loaded and rows written per transaction
+USER_BATCH_SIZE = 500
+# Events whose neighbours are written per transaction
+EVENT_BATCH_SIZE = 1000
+
+
+def active_user_ids(now):
+    """Users with an interaction within ACTIVE_USER_DAYS or any stated interest."""
+    since = now - timedelta(days=ACTIVE_USER_DAYS)
+    interacted = db.session.query(UserInteraction.user_id).filter(UserInteraction.created_at >= since)
+    stated = db.session.query(UserPreference.user_id)
+    return [row.user_id for row in interacted.union(stated)]
+
+
+def changed_user_ids():
+    """Users with scored interactions since the latest stored run, or None when no rows are stored."""
+    last_run = db.session.query(db.func.max(UserRecommendation.computed_at)).scalar()
+    if last_run is None:
+        return None
+    query = db.session.query(UserInteraction.user_id).filter(
+        UserInteraction.created_at >= last_run, UserInteraction.interaction_type.in_(SCORED_INTERACTIONS)
+    ).distinct()
+    return [row.user_id for row in query]
+
+
+def interaction_matrix():
+    """InteractionMatrix of every user's strongest engagement per event.
+
+    A user's (user, event) pair is left out when they disliked the event.
+    """
+    weight = db.func.max(db.case(
+        *[(UserInteraction.interaction_type == name, value) for name, value in INTERACTION_WEIGHTS.items()],
+        else_=0.0
+    ))
+    disliked = db.func.max(db.case((UserInteraction.interaction_type == 'dislike', 1), else_=0))
+    pairs = db.session.query(UserInteraction.user_id, UserInteraction.event_id, weight).group_by(
+        UserInteraction.user_id, UserInteraction.event_id
+    ).having(disliked == 0).having(weight > 0)
+    return InteractionMatrix.from_pairs(pairs)
+
+
+def refresh_event_similarities(changed_only=False):
+    """Recompute and store event neighbours; returns the number of events computed.
+
+    With changed_only, only events engaged with by users who interacted
+    since the latest stored run, unless no rows are stored. A full run also
+    deletes the rows of events no one engages with any more.
+    """
+    started = datetime.utcnow()
+    last_run = db.session.query(db.func.max(EventSimilarity.computed_at)).scalar() if changed_only else None
+    matrix = interaction_matrix()
+    if last_run is None:
+        event_ids = matrix.event_ids.tolist()
+    else:
+        recent = db.session.query(UserInteraction.user_id, UserInteraction.event_id).filter(
+            UserInteraction.created_at >= last_run
+        ).distinct().all()
+        # The events themselves too: one whose only user disliked it has no neighbours now
+        event_ids = sorted(set(matrix.events_of({row.user_id for row in recent})) | {row.event_id for row in recent})
+    logger.info(f"Computing neighbours of {len(event_ids)} of {len(matrix)} events")
+
+    for start in range(0, len(event_ids), EVENT_BATCH_SIZE):
+        batch = event_ids[start:start + EVENT_BATCH_SIZE]
+        rows = []
+        for event_id in batch:
+            neighbors = matrix.neighbors(event_id, NEIGHBORS_PER_EVENT)
+            if neighbors:
+                rows.append({
+                    'event_id': event_id,
+                    'neighbor_ids': [neighbor_id for neighbor_id, _ in neighbors],
+                    'scores': [round(score, 4) for _, score in neighbors],
+                    'computed_at': started,
+                })
+        EventSimilarity.query.filter(EventSimilarity.event_id.in_(batch)).delete(synchronize_session=False)
+        if rows:
+            db.session.execute(db.insert(EventSimilarity), rows)
+        db.session.commit()
+
+    if last_run is None:
+        EventSimilarity.query.filter(EventSimilarity.computed_at < started).delete(synchronize_session=False)
+        db.session.commit()
+    logger.info(f"Stored neighbours of {len(event_ids)} events in "
+                f"{(datetime.utcnow() - started).total_seconds():.1f}s")
+    return len(event_ids)
+
+
+class CandidatePool:
+    """Upcoming events loaded once per run, by start date, with per-category lists.
+
+    candidates() gives the same events the online engine would load for a
+    profile: the first RECOMMENDATION_CANDIDATES upcoming events in the
+    user's categories, or of all categories without stated interests.
+    """
+
+    def __init__(self, now):
+        query = Event.query.filter(*filter_clauses(EventFilters(), Event, now))
+        self.rows = order_query(query.with_entities(*SCORING_COLUMNS), Event, 'date').all()
+        self.by_category = defaultdict(list)
+        for position, row in enumerate(self.rows):
+            self.by_category[row.category].append((position, row))
+
+    def candidates(self, profile):
+        if not profile.category_weights:
+            return self.rows[:RECOMMENDATION_CANDIDATES]
+        lists = [self.by_category.get(category, []) for category in profile.category_weights]
+        merged = heapq.merge(*lists, key=lambda pair: pair[0])
+        return [row for _, row in itertools.islice(merged, RECOMMENDATION_CANDIDATES)]
+
+
+def refresh_recommendations(user_ids=None, engine=None):
+    """Recompute and store the recommendations of user_ids (all active users when None).
+
+    A run over all active users also deletes the rows of users no longer
+    active. Returns the number of users computed.
+    """
+    engine = engine or RecommendationEngine()
+    started = datetime.utcnow()
+    full = user_ids is None
+    if full:
+        user_ids = active_user_ids(started)
+    if not user_ids:
+        return 0
+    pool = CandidatePool(started)
+    logger.info(f"Computing recommendations for {len(user_ids)} users over {len(pool.rows)} upcoming events")
+
+    for start in range(0, len(user_ids), USER_BATCH_SIZE):
+        batch = user_ids[start:start + USER_BATCH_SIZE]
+        rows = []
+        for user_id, profile in load_user_profiles(batch).items():
+            best = engine.rank(profile, pool.candidates(profile), RECOMMENDATIONS_PER_USER)
+            rows.append({
+                'user_id': user_id,
+                'event_ids': [event.id for event, _ in best],
+                'scores': [round(score, 4) for _, score in best],
+                'computed_at': started,
+            })
+        UserRecommendation.query.filter(UserRecommendation.user_id.in_(batch)).delete(synchronize_session=False)
+        if rows:
+            db.session.execute(db.insert(UserRecommendation), rows)
+        db.session.commit()
+
+    if full:
+        UserRecommendation.query.filter(UserRecommendation.computed_at < started).delete(synchronize_session=False)
+        db.session.commit()
+    logger.info(f"Stored recommendations for {len(user_ids)} users in "
+                f"{(datetime.utcnow() - started).total_seconds():.1f}s")
+    return len(user_ids)
+
+
+def refresh_changed_recommendations():
+    """Recompute neighbours touched by new interactions, then users with new likes or dislikes;
+    a full run of either when it has no rows stored."""
+    with app.app_context():
+        refresh_event_similarities(changed_only=True)
+        return refresh_recommendations(changed_user_ids())
+
+
+def rebuild_event_similarities():
+    """Recompute every event's neighbours from all interactions."""
+    with app.app_context():
+        return refresh_event_similarities()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute per-user recommendations")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--changed', action='store_true',
+                      help="only users with likes or dislikes since the latest run")
+    mode.add_argument('--similarities', action='store_true',
+                      help="rebuild every event's neighbours instead of users' lists")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+    if args.changed:
+        refresh_changed_recommendations()
+        return 0
+    if args.similarities:
+        rebuild_event_similarities()
+        return 0
+    with app.app_context():
+        refresh_recommendations()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
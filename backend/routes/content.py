@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, request
 from datetime import datetime
 from app import db
+from serialization import serialize, serialize_all
 from app import (
     Review, Tip, LocalGuide, PhotoGallery, VirtualTour, Deal,
     SavedItem, Itinerary, ItineraryItem, WeatherForecast
@@ -37,17 +38,7 @@ def get_reviews():
     reviews = query.paginate(page=page, per_page=per_page, error_out=False)
     
     return jsonify({
-        'reviews': [{
-            'id': r.id,
-            'rating': r.rating,
-            'title': r.title,
-            'content': r.content,
-            'visit_date': r.visit_date.isoformat() if r.visit_date else None,
-            'photos': r.photos,
-            'helpful_votes': r.helpful_votes,
-            'verified_purchase': r.verified_purchase,
-            'created_at': r.created_at.isoformat()
-        } for r in reviews.items],
+        'reviews': serialize_all(reviews.items, Review),
         'total': reviews.total,
         'pages': reviews.pages,
         'current_page': reviews.page
@@ -95,15 +86,7 @@ def get_tips():
     tips = query.paginate(page=page, per_page=per_page, error_out=False)
     
     return jsonify({
-        'tips': [{
-            'id': t.id,
-            'category': t.category,
-            'title': t.title,
-            'content': t.content,
-            'tags': t.tags,
-            'helpful_votes': t.helpful_votes,
-            'created_at': t.created_at.isoformat()
-        } for t in tips.items],
+        'tips': serialize_all(tips.items, Tip),
         'total': tips.total,
         'pages': tips.pages,
         'current_page': tips.page
@@ -132,17 +115,7 @@ def get_guides():
     guides = query.paginate(page=page, per_page=per_page, error_out=False)
     
     return jsonify({
-        'guides': [{
-            'id': g.id,
-            'title': g.title,
-            'content': g.content,
-            'category': g.category,
-            'featured_image': g.featured_image,
-            'tags': g.tags,
-            'views': g.views,
-            'likes': g.likes,
-            'created_at': g.created_at.isoformat()
-        } for g in guides.items],
+        'guides': serialize_all(guides.items, LocalGuide),
         'total': guides.total,
         'pages': guides.pages,
         'current_page': guides.page
@@ -167,17 +140,7 @@ def get_virtual_tours():
         query = query.order_by(desc(VirtualTour.created_at))
 
     tours = query.all()
-    return jsonify([{
-        'id': t.id,
-        'title': t.title,
-        'description': t.description,
-        'venue_name': t.venue_name,
-        'tour_type': t.tour_type,
-        'media_url': t.media_url,
-        'thumbnail_url': t.thumbnail_url,
-        'duration': t.duration,
-        'views': t.views
-    } for t in tours])
+    return jsonify(serialize_all(tours, VirtualTour))
 
 # Deals
 @content.route('/deals', methods=['GET'])
@@ -198,19 +161,7 @@ def get_deals():
     query = query.order_by(desc(Deal.created_at))
     deals = query.all()
     
-    return jsonify([{
-        'id': d.id,
-        'title': d.title,
-        'description': d.description,
-        'deal_type': d.deal_type,
-        'venue': d.venue,
-        'start_date': d.start_date.isoformat() if d.start_date else None,
-        'end_date': d.end_date.isoformat() if d.end_date else None,
-        'promo_code': d.promo_code,
-        'discount_amount': float(d.discount_amount),
-        'discount_type': d.discount_type,
-        'affiliate_link': d.affiliate_link
-    } for d in deals])
+    return jsonify(serialize_all(deals, Deal))
 
 # Itineraries
 @content.route('/itineraries', methods=['GET'])
@@ -227,23 +178,14 @@ def get_itineraries():
     query = query.order_by(desc(Itinerary.created_at))
     itineraries = query.all()
     
-    return jsonify([{
-        'id': i.id,
-        'title': i.title,
-        'description': i.description,
-        'start_date': i.start_date.isoformat() if i.start_date else None,
-        'end_date': i.end_date.isoformat() if i.end_date else None,
-        'is_public': i.is_public,
-        'likes': i.likes,
-        'items': [{
-            'day_number': item.day_number,
-            'start_time': item.start_time.strftime('%H:%M') if item.start_time else None,
-            'duration': item.duration,
-            'notes': item.notes,
-            'item_type': item.item_type,
-            'item_id': item.item_id
-        } for item in ItineraryItem.query.filter_by(itinerary_id=i.id).order_by(ItineraryItem.day_number, ItineraryItem.start_time).all()]
-    } for i in itineraries])
+    return jsonify([
+        serialize(i, items=serialize_all(
+            ItineraryItem.query.filter_by(itinerary_id=i.id)
+            .order_by(ItineraryItem.day_number, ItineraryItem.start_time).all(),
+            ItineraryItem
+        ))
+        for i in itineraries
+    ])
 
 @content.route('/itineraries', methods=['POST'])
 def create_itinerary():
@@ -278,14 +220,7 @@ def create_itinerary():
 @content.route('/weather', methods=['GET'])
 def get_weather():
     forecasts = WeatherForecast.query.order_by(WeatherForecast.date).all()
-    return jsonify([{
-        'date': f.date.isoformat(),
-        'temperature_high': f.temperature_high,
-        'temperature_low': f.temperature_low,
-        'conditions': f.conditions,
-        'precipitation_chance': f.precipitation_chance,
-        'wind_speed': f.wind_speed
-    } for f in forecasts])
+    return jsonify(serialize_all(forecasts, WeatherForecast))
 
 # Saved Items
 @content.route('/saved-items', methods=['GET'])
@@ -295,13 +230,7 @@ def get_saved_items():
         return jsonify({'error': 'User ID is required'}), 400
 
     items = SavedItem.query.filter_by(user_id=user_id).order_by(desc(SavedItem.created_at)).all()
-    return jsonify([{
-        'id': item.id,
-        'item_type': item.item_type,
-        'item_id': item.item_id,
-        'notes': item.notes,
-        'created_at': item.created_at.isoformat()
-    } for item in items])
+    return jsonify(serialize_all(items, SavedItem))
 
 @content.route('/saved-items', methods=['POST'])
 def save_item():
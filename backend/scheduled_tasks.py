@@ -3,6 +3,7 @@ import time
 from fetcher import fetch_data
 from scraper import scrape_page
 from alerts import generate_hourly_summary
+from recommendation_job import refresh_changed_recommendations, rebuild_event_similarities
 
 API_URLS = [
     "https://api.example.com/places",
@@ -26,6 +27,10 @@ def scrape_web_data():
 schedule.every(1).hours.do(fetch_api_data)
 schedule.every(6).hours.do(scrape_web_data)
 schedule.every(1).hours.do(generate_hourly_summary)
+# Users who liked or disliked events since the last run
+schedule.every(5).minutes.do(refresh_changed_recommendations)
+# Incremental runs leave some neighbour scores stale; rebuild them nightly
+schedule.every().day.at("04:00").do(rebuild_event_similarities)
 
 # Run scheduled tasks
 while True:
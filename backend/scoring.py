@@ -0,0 +1,222 @@
+"""Vectorized scoring of recommendation candidates.
+
+Candidates are held as feature matrices (category one-hot, tag multi-hot,
+price, rating, distance, time until start, popularity) and a user as
+preference vectors over the same categories and tags, so a few thousand
+candidates are scored with a handful of NumPy operations instead of a
+Python loop per event. Each feature is scaled to [0, 1] before weighting,
+so the weights read as relative importance.
+
+    features = CandidateFeatures.from_rows(rows, now)
+    scores = score_candidates(features, profile, ScoringWeights())
+    best = top_k(features.ids, scores, 20)
+"""
+import logging
+from collections import namedtuple
+from datetime import datetime
+from itertools import chain, repeat
+import numpy as np
+from geo import EARTH_RADIUS_KM
+
+logger = logging.getLogger(__name__)
+
+# Price at which the cheapness term reaches zero; free events score 1
+PRICE_SCALE = 200.0
+MAX_RATING = 5.0
+# Distance and start time at which their terms fall to 1/e
+DISTANCE_SCALE_KM = 10.0
+RECENCY_SCALE_HOURS = 7 * 24.0
+EPOCH = datetime(1970, 1, 1)
+
+# The defaults keep category preference, once the whole score, the
+# strongest term. collaborative weighs events similar to those the user
+# liked (item_similarity.py). liked_boost multiplies the score of events
+# the user has liked, doubling it as before.
+ScoringWeights = namedtuple(
+    'ScoringWeights',
+    ['category', 'tags', 'price', 'rating', 'distance', 'recency', 'popularity', 'collaborative', 'liked_boost'],
+    defaults=(1.0, 0.5, 0.1, 0.2, 0.2, 0.3, 0.2, 0.5, 2.0)
+)
+
+# category_weights and tag_weights map names to the user's preference
+# weights; liked_ids are events the user has liked; neighbor_scores maps
+# event ids to their summed similarity to those events.
+UserProfile = namedtuple('UserProfile', ['category_weights', 'tag_weights', 'liked_ids', 'neighbor_scores'],
+                         defaults=({},))
+
+
+def scoring_weights(spec):
+    """ScoringWeights from a "name=value,..." string; unset weights keep their defaults."""
+    weights = {}
+    for part in (spec or '').split(','):
+        if not part.strip():
+            continue
+        name, _, value = part.partition('=')
+        name = name.strip()
+        if name not in ScoringWeights._fields:
+            logger.warning(f"Ignoring unknown scoring weight '{name}'")
+            continue
+        weights[name] = float(value)
+    return ScoringWeights(**weights)
+
+
+def _float_array(values):
+    # NumPy reads None as NaN and converts Decimals itself
+    return np.array(values, dtype=np.float64)
+
+
+def _columns(rows, names):
+    """{name: values} for rows, transposed in one pass when they are named tuples or result rows."""
+    fields = getattr(rows[0], '_fields', None) if rows else None
+    if fields and all(name in fields for name in names):
+        transposed = list(zip(*rows))
+        return {name: transposed[fields.index(name)] for name in names}
+    return {name: [getattr(row, name) for row in rows] for name in names}
+
+
+def _codes(values, codes):
+    """Integer code of each value in codes, -1 for values without one."""
+    return np.fromiter(map(codes.get, values, repeat(-1)), dtype=np.int64, count=len(values))
+
+
+class CandidateFeatures:
+    """Feature matrices of recommendation candidates, one row per event.
+
+    category is an (n, len(categories)) one-hot matrix; tags is an
+    (n, len(tag_names)) multi-hot matrix. Missing numbers are NaN and add
+    nothing to a score.
+    """
+
+    def __init__(self, ids, category, categories, tags, tag_names, tag_counts, price, rating,
+                 distance_km, hours_until, popularity):
+        self.ids = ids
+        self.category = category
+        self.categories = categories
+        self.tags = tags
+        self.tag_names = tag_names
+        self.tag_counts = tag_counts
+        self.price = price
+        self.rating = rating
+        self.distance_km = distance_km
+        self.hours_until = hours_until
+        self.popularity = popularity
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows, now, location=None, tag_names=None):
+        """Features from rows with id, category, tags, price_range_min, rating,
+        latitude, longitude, start_epoch and popularity_score attributes.
+
+        start_epoch is the start in seconds since the Unix epoch (UTC), as
+        SCORING_COLUMNS selects it, so no datetime is handled per row; now
+        is a naive UTC datetime. location is the user's (latitude,
+        longitude), if known. Only tag_names get a column of the tag
+        matrix; a user's score ignores other tags anyway.
+        """
+        rows = list(rows)
+        n = len(rows)
+        columns = _columns(rows, ('id', 'category', 'tags', 'price_range_min', 'rating', 'latitude', 'longitude',
+                                  'start_epoch', 'popularity_score'))
+        categories = sorted(set(columns['category']) - {None})
+        codes = _codes(columns['category'], {name: code for code, name in enumerate(categories)})
+        category = np.zeros((n, len(categories)), dtype=np.float32)
+        has_category = codes >= 0
+        category[np.flatnonzero(has_category), codes[has_category]] = 1.0
+
+        tag_names = list(tag_names or [])
+        tags = np.zeros((n, len(tag_names)), dtype=np.float32)
+        row_tags = [event_tags or () for event_tags in columns['tags']]
+        tag_counts = np.fromiter(map(len, row_tags), dtype=np.int64, count=n)
+        if tag_names:
+            tag_codes = _codes(list(chain.from_iterable(row_tags)), {name: code for code, name in enumerate(tag_names)})
+            tag_rows = np.repeat(np.arange(n), tag_counts)
+            known = tag_codes >= 0
+            tags[tag_rows[known], tag_codes[known]] = 1.0
+
+        distance_km = np.full(n, np.nan)
+        if location is not None:
+            distance_km = _haversine_km(location[0], location[1], _float_array(columns['latitude']),
+                                        _float_array(columns['longitude']))
+        hours_until = (_float_array(columns['start_epoch']) - (now - EPOCH).total_seconds()) / 3600
+        return cls(
+            np.array(columns['id'], dtype=np.int64),
+            category, categories, tags, tag_names, tag_counts.astype(np.float32),
+            _float_array(columns['price_range_min']),
+            _float_array(columns['rating']),
+            distance_km,
+            hours_until,
+            _float_array(columns['popularity_score']),
+        )
+
+
+def _haversine_km(latitude, longitude, latitudes, longitudes):
+    lat1, lon1 = np.radians(latitude), np.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _preference_vector(names, weights, default):
+    return np.array([weights.get(name, default) for name in names], dtype=np.float32)
+
+
+def score_candidates(features, profile, weights):
+    """Score of every candidate for profile, as a float64 array aligned with features.ids."""
+    # Without stated preferences every category counts fully
+    category_default = 0.0 if profile.category_weights else 1.0
+    category_preference = _preference_vector(features.categories, profile.category_weights, category_default)
+    if category_preference.size and category_preference.max() > 0:
+        category_preference /= category_preference.max()
+    score = weights.category * (features.category @ category_preference).astype(np.float64)
+
+    if features.tags.shape[1]:
+        tag_preference = _preference_vector(features.tag_names, profile.tag_weights, 0.0)
+        if tag_preference.max() > 0:
+            tag_preference /= tag_preference.max()
+        # Share of the event's tags the user likes, weighted by how much
+        affinity = (features.tags @ tag_preference) / np.maximum(features.tag_counts, 1.0)
+        score += weights.tags * affinity
+
+    with np.errstate(invalid='ignore'):
+        terms = (
+            (weights.price, 1.0 - np.clip(features.price / PRICE_SCALE, 0.0, 1.0)),
+            (weights.rating, np.clip(features.rating / MAX_RATING, 0.0, 1.0)),
+            (weights.distance, np.exp(-features.distance_km / DISTANCE_SCALE_KM)),
+            (weights.recency, np.exp(-np.maximum(features.hours_until, 0.0) / RECENCY_SCALE_HOURS)),
+        )
+    for weight, term in terms:
+        if weight:
+            score += weight * np.nan_to_num(term, nan=0.0)
+
+    if weights.popularity and len(features):
+        popularity = np.nan_to_num(features.popularity, nan=0.0)
+        top = popularity.max()
+        if top > 0:
+            score += weights.popularity * np.clip(popularity / top, 0.0, 1.0)
+
+    if weights.collaborative and profile.neighbor_scores and len(features):
+        neighbor_ids = np.fromiter(profile.neighbor_scores.keys(), dtype=np.int64, count=len(profile.neighbor_scores))
+        neighbor_scores = np.fromiter(profile.neighbor_scores.values(), dtype=np.float64,
+                                      count=len(profile.neighbor_scores))
+        order = np.argsort(neighbor_ids)
+        neighbor_ids, neighbor_scores = neighbor_ids[order], neighbor_scores[order]
+        positions = np.minimum(np.searchsorted(neighbor_ids, features.ids), len(neighbor_ids) - 1)
+        affinity = np.where(neighbor_ids[positions] == features.ids, neighbor_scores[positions], 0.0)
+        score += weights.collaborative * affinity / neighbor_scores.max()
+
+    if profile.liked_ids:
+        liked = np.isin(features.ids, np.fromiter(profile.liked_ids, dtype=np.int64))
+        score[liked] *= weights.liked_boost
+    return score
+
+
+def top_k(ids, scores, k):
+    """(id, score) of the k best-scoring ids, best first; ties go to the lower id."""
+    if len(ids) > k:
+        # Only candidates scoring at least the kth best can make the list
+        keep = scores >= np.partition(scores, len(scores) - k)[len(scores) - k]
+        ids, scores = ids[keep], scores[keep]
+    order = np.lexsort((ids, -scores))[:k]
+    return [(int(ids[i]), float(scores[i])) for i in order]
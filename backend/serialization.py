@@ -0,0 +1,185 @@
+"""JSON encoding and response shapes for the API.
+
+Each model's response shape is registered once, as a list of fields, and
+routes build items with serialize() instead of writing dicts by hand.
+Values reach the encoder as they come from the database: orjson writes
+datetimes, dates, times and UUIDs natively and Decimals through its default
+hook, so no route calls isoformat() or float() itself. FastJSONProvider
+makes jsonify and request.get_json use the same encoder; without orjson the
+stdlib encoder is used with the same conversions.
+
+init_compression compresses large JSON and text responses with brotli
+(when installed) or gzip for clients that accept them.
+"""
+import gzip
+import json
+import logging
+import os
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+from operator import attrgetter
+from flask import request
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this gain little from compression and cost a round of
+# CPU on every request, so they are sent as they are.
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain')
+
+
+def _default(value):
+    """Encodes the types orjson (or json) does not handle itself."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """obj as compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider on dumps/loads; install with app.json = FastJSONProvider(app)."""
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
+class Serializer:
+    """Builds response dicts from objects or rows with a fixed list of fields.
+
+    A field is an attribute name, or a (name, function) pair whose function
+    gets the object.
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(
+            (field, attrgetter(field)) if isinstance(field, str) else field
+            for field in fields
+        )
+        names = tuple(name for name, _ in self.fields)
+        # Rows of exactly these columns are zipped with the names, which is
+        # several times faster than attribute access on SQLAlchemy rows.
+        self.row_fields = names if all(isinstance(field, str) for field in fields) else None
+
+    def _zips(self, obj):
+        return self.row_fields is not None and getattr(obj, '_fields', None) == self.row_fields
+
+    def __call__(self, obj, **extra):
+        if self._zips(obj):
+            item = dict(zip(self.row_fields, obj))
+        else:
+            item = {name: get(obj) for name, get in self.fields}
+        if extra:
+            item.update(extra)
+        return item
+
+    def all(self, objs):
+        """Dicts for objs, which are all model instances or all rows of the same columns."""
+        if objs and self._zips(objs[0]):
+            names = self.row_fields
+            return [dict(zip(names, obj)) for obj in objs]
+        fields = self.fields
+        return [{name: get(obj) for name, get in fields} for obj in objs]
+
+
+_serializers = {}
+
+
+def register(model, fields, view='default'):
+    """Registers model's response shape for view; returns its Serializer."""
+    serializer = Serializer(fields)
+    _serializers[(model, view)] = serializer
+    return serializer
+
+
+def serializer_for(model, view='default'):
+    try:
+        return _serializers[(model, view)]
+    except KeyError:
+        raise LookupError(f"No '{view}' serializer registered for {model.__name__}") from None
+
+
+def serialize(obj, model=None, view='default', **extra):
+    """obj's response dict. model is needed for column rows, which are not model instances."""
+    return serializer_for(model or type(obj), view)(obj, **extra)
+
+
+def serialize_all(objs, model=None, view='default'):
+    """Response dicts for objs, all of one model (or rows of its columns)."""
+    objs = list(objs)
+    if not objs:
+        return []
+    return serializer_for(model or type(objs[0]), view).all(objs)
+
+
+def _compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def init_compression(app):
+    """Compress responses of app above RESPONSE_COMPRESSION_MIN_BYTES; RESPONSE_COMPRESSION=0 disables."""
+    if os.environ.get('RESPONSE_COMPRESSION', '1') == '0':
+        return
+    min_bytes = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', COMPRESS_MIN_BYTES))
+    if brotli is None:
+        logger.info("The brotli package is not installed; compressing responses with gzip only")
+
+    @app.after_request
+    def compress_response(response):
+        if (response.direct_passthrough or not 200 <= response.status_code < 300 or
+                'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br']:
+            encoding = 'br'
+        elif accepted['gzip']:
+            encoding = 'gzip'
+        else:
+            return response
+        body = response.get_data()
+        if len(body) < min_bytes:
+            return response
+        response.set_data(_compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
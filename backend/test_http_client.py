@@ -0,0 +1,112 @@
+import json
+import os
+import shutil
+import time
+import pytest
+import requests
+from http_client import CachedHttpClient, ReplayMiss, ResponseCache
+
+RECORDED_CACHE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'http_cache')
+RECORDED_URL = 'https://app.ticketmaster.com/discovery/v2/events.json'
+RECORDED_PARAMS = {'city': 'Las Vegas', 'page': 0}
+
+
+class FakeSession:
+    """Stands in for requests.Session: answers every GET with the queued responses, in order."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.requests.append({'url': url, 'params': params, 'headers': dict(headers or {})})
+        return self.responses.pop(0)
+
+
+def make_response(status_code, body='', headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = body.encode('utf-8')
+    response.encoding = 'utf-8'
+    response.headers.update(headers or {})
+    return response
+
+
+@pytest.fixture
+def recorded_cache(tmp_path):
+    directory = tmp_path / 'http_cache'
+    shutil.copytree(RECORDED_CACHE_DIR, directory)
+    return ResponseCache(str(directory))
+
+
+def test_replay_returns_recorded_body(recorded_cache):
+    client = CachedHttpClient(cache=recorded_cache, replay=True)
+    client.session = FakeSession()
+    # The API key is not part of the cache key, so any key replays
+    response = client.get(RECORDED_URL, params=dict(RECORDED_PARAMS, apikey='another-key'))
+    assert response.status_code == 200
+    assert response.json()['_embedded']['events'][0]['name'] == 'Recorded Show'
+    assert client.session.requests == []
+
+
+def test_replay_miss_raises(recorded_cache):
+    client = CachedHttpClient(cache=recorded_cache, replay=True)
+    client.session = FakeSession()
+    with pytest.raises(ReplayMiss):
+        client.get(RECORDED_URL, params=dict(RECORDED_PARAMS, page=1))
+    assert client.session.requests == []
+
+
+def test_replay_without_cache_raises():
+    with pytest.raises(ReplayMiss):
+        CachedHttpClient(cache=None, replay=True).get(RECORDED_URL)
+
+
+def test_fresh_entry_is_served_without_network(tmp_path):
+    client = CachedHttpClient(cache=ResponseCache(str(tmp_path)), ttl_seconds=60)
+    client.session = FakeSession(make_response(200, '{"n": 1}'))
+    assert client.get(RECORDED_URL).json() == {'n': 1}
+    assert client.get(RECORDED_URL).json() == {'n': 1}
+    assert len(client.session.requests) == 1
+
+
+def test_stale_entry_revalidates_and_304_refreshes_ttl(recorded_cache):
+    # The recorded entry is long past any TTL
+    client = CachedHttpClient(cache=recorded_cache, ttl_seconds=60)
+    client.session = FakeSession(make_response(304))
+    response = client.get(RECORDED_URL, params=RECORDED_PARAMS)
+    assert client.session.requests[0]['headers']['If-None-Match'] == '"tm-page-0"'
+    assert response.json()['_embedded']['events'][0]['name'] == 'Recorded Show'
+
+    entry = recorded_cache.get(recorded_cache.key_for(RECORDED_URL, RECORDED_PARAMS))
+    assert time.time() - entry['stored_at'] < 60
+    # Fresh again, so the next request does not reach the network
+    client.get(RECORDED_URL, params=RECORDED_PARAMS)
+    assert len(client.session.requests) == 1
+
+
+def test_stale_entry_sends_if_modified_since(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    client = CachedHttpClient(cache=cache, ttl_seconds=0)
+    last_modified = 'Wed, 15 Oct 2025 07:28:00 GMT'
+    client.session = FakeSession(make_response(200, '{"n": 1}', {'Last-Modified': last_modified}),
+                                 make_response(200, '{"n": 2}'))
+    client.get(RECORDED_URL)
+    assert client.get(RECORDED_URL).json() == {'n': 2}
+    assert client.session.requests[1]['headers']['If-Modified-Since'] == last_modified
+
+
+def test_eviction_keeps_cache_under_byte_limit(tmp_path):
+    entry = {'status_code': 200, 'headers': {}, 'body': 'x' * 500, 'stored_at': time.time()}
+    entry_bytes = len(json.dumps(entry).encode('utf-8'))
+    cache = ResponseCache(str(tmp_path), max_bytes=3 * entry_bytes)
+    for page in range(10):
+        cache.put(cache.key_for(RECORDED_URL, {'page': page}), entry)
+        on_disk = sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+        assert on_disk <= cache.max_bytes
+
+    # Least recently used entries go first
+    assert cache.get(cache.key_for(RECORDED_URL, {'page': 0})) is None
+    assert cache.get(cache.key_for(RECORDED_URL, {'page': 9})) is not None
+    # A reopened cache accounts for what is already on disk
+    assert ResponseCache(str(tmp_path), max_bytes=cache.max_bytes)._total_bytes <= cache.max_bytes
@@ -0,0 +1,21 @@
+import os
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app import app, db
+from check_query_plans import DEFAULT_ROWS, plan_failures
+
+# Seeded rows; plans only match production's at a realistic table size
+QUERY_PLAN_ROWS = int(os.environ.get('QUERY_PLAN_ROWS', DEFAULT_ROWS))
+
+
+def test_event_queries_use_indexes():
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            pytest.skip("Query plans can only be checked against PostgreSQL; set DATABASE_URL")
+        try:
+            db.session.execute(text("SELECT 1"))
+        except OperationalError as e:
+            pytest.skip(f"PostgreSQL is not reachable: {e}")
+        failures, checked = plan_failures(QUERY_PLAN_ROWS)
+    assert not failures, f"{len(failures)} of {checked} queries scan events sequentially: {failures}"